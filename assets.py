@@ -0,0 +1,106 @@
+#
+# pylint: disable=missing-docstring
+#
+# The logo and style sheet shared by every page the publishing scripts
+# write. By default both are inlined into each page: the style sheet
+# goes in a <style> element, with the logo in it as a data URI. That
+# makes each page stand on its own, but every page carries its own copy
+# of both (about 30KB).
+#
+# Alternatively, the logo and style sheet can be written once to an
+# assets directory, with the first 12 hex digits of a SHA-256 of their
+# content in their names (e.g., mac-logo-small.0123456789ab.png), and
+# the pages link to the style sheet there. As the names change whenever
+# the content does, they can be cached forever and only need uploading
+# once.
+#
+# Either way, the logo is only read and encoded once per process, and
+# again only if the file changes.
+#
+
+import base64
+import hashlib
+import mimetypes
+import os
+
+import pystache
+
+from template_cache import file_stamps, load_template
+
+
+LOGO_FILENAME = 'templates/mac-logo-small.png'
+STYLE_FILENAME = 'templates/style.css'
+
+# {filename: (file stamps, content hash, data URI)}
+_data_uris = {}
+
+
+def hash_content(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def get_image_data_uri(filename):
+    return get_image_asset(filename)[1]
+
+
+# Returns (content hash, data URI) for an image.
+def get_image_asset(filename):
+    stamps = file_stamps([filename])
+    cached = _data_uris.get(filename)
+    if not cached or cached[0] != stamps:
+        with open(filename, 'rb') as in_file:
+            raw_data = in_file.read()
+        mime_type = mimetypes.guess_type(filename)[0] or 'image/png'
+        data_uri = 'data:%s;base64,%s' % (
+            mime_type, base64.b64encode(raw_data).decode('utf-8'))
+        cached = (stamps, hash_content(raw_data), data_uri)
+        _data_uris[filename] = cached
+    return cached[1], cached[2]
+
+
+# Returns the template options for the logo and style sheet of a page
+# written to output_filename. If assets_dir is set, the logo and style
+# sheet are written there and the page links to them. Otherwise, they
+# are inlined.
+def page_assets(output_filename, assets_dir=None, use_logo=True):
+    if not assets_dir:
+        if not use_logo:
+            return {}
+        return {'logoDataUri': get_image_data_uri(LOGO_FILENAME)}
+
+    logo_url = ''
+    if use_logo:
+        logo_hash, _ = get_image_asset(LOGO_FILENAME)
+        with open(LOGO_FILENAME, 'rb') as in_file:
+            logo_url = write_asset(assets_dir, LOGO_FILENAME, in_file.read(),
+                                   logo_hash)
+    # The style sheet is a template itself, for the logo. The logo is
+    # next to it.
+    style = pystache.Renderer(file_extension=False, partials={}).render(
+        load_template(STYLE_FILENAME), {'logoDataUri': logo_url})
+    style_data = style.encode('utf-8')
+    style_path = os.path.join(
+        assets_dir,
+        write_asset(assets_dir, STYLE_FILENAME, style_data,
+                    hash_content(style_data)))
+
+    page_dir = os.path.dirname(os.path.abspath(output_filename or 'page'))
+    style_href = os.path.relpath(os.path.abspath(style_path), page_dir)
+    return {'styleHref': style_href.replace(os.sep, '/')}
+
+
+# Writes an asset to assets_dir, named for its content, unless it is
+# already there. Returns its name.
+def write_asset(assets_dir, filename, data, content_hash):
+    base, ext = os.path.splitext(os.path.basename(filename))
+    asset_name = '%s.%s%s' % (base, content_hash[:12], ext)
+    asset_filename = os.path.join(assets_dir, asset_name)
+    if not os.path.exists(asset_filename):
+        print('Writing asset: %s' % asset_filename)
+        os.makedirs(assets_dir, exist_ok=True)
+        # Other builds may be writing the same asset.
+        temp_filename = '%s.%d.tmp' % (asset_filename, os.getpid())
+        with open(temp_filename, 'wb') as out_file:
+            out_file.write(data)
+        os.replace(temp_filename, asset_filename)
+    return asset_name
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+#
+# pylint: disable=missing-docstring
+#
+# This script rebuilds several events or whole seasons at once,
+# spreading the work across a pool of worker processes. It uses the
+# same build graph as build_season.py (read from each season's
+# commands.txt), so:
+#  - Each step starts as soon as the steps making its inputs are done,
+#    so compute_results.py, publish_event.py and fin_to_base_html.py
+#    for different events run side by side, and the DOTY and series
+#    standings run once all of their JSONs are ready.
+#  - Only stale steps are rebuilt (unless -f is given), and the build
+#    state is shared with build_season.py.
+#  - Each worker imports pandas and the scripts once, and then runs
+#    many steps.
+#
+# A target is either a season directory, which builds everything in
+# its commands.txt, or an event file (e.g., its CSV), which builds
+# everything downstream of it. Seasons without a commands.txt (2018 to
+# 2022 only have their commands in README.md) are skipped, with a
+# warning.
+#
+# The output of each step is held back, and only shown if the step
+# fails. On the first failure, no more steps are started.
+#
+# Invoke this as:
+#
+# ./batch_build.py 2023 2024 2025 2026
+# ./batch_build.py 2026/2026-mowog6.csv 2026/2026-mowog7.csv
+#
+
+import argparse
+import concurrent.futures
+import contextlib
+import io
+import os
+import sys
+import time
+
+from build_season import (FileHashes, chdir_to_repo, load_state, load_steps,
+                          record_step, run_step, save_state, season_filenames,
+                          stale_reason, step_inputs)
+
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-j',
+                        dest='num_workers',
+                        default=os.cpu_count(),
+                        type=int,
+                        help='The number of worker processes. Defaults to ' +
+                        'the number of CPUs.')
+    parser.add_argument('-f',
+                        dest='force',
+                        default=False,
+                        action='store_true',
+                        help='If set, rebuild everything that is selected.')
+    parser.add_argument('targets',
+                        nargs='+',
+                        help='Season directories (e.g., 2026), or event ' +
+                        'files (e.g., 2026/2026-mowog1.csv).')
+    config = parser.parse_args(args)
+
+    seasons = load_seasons(config.targets, config.force)
+    if not seasons:
+        print('ERROR: None of the targets has a commands.txt')
+        return 1
+    jobs = [(season, step) for season in seasons for step in season['steps']]
+    print('Selected %d steps from %d seasons' % (len(jobs), len(seasons)))
+
+    start = time.perf_counter()
+    timings, ok = run_jobs(jobs, config.num_workers)
+    for season in seasons:
+        save_state(season['state'], season['state_filename'])
+
+    print_timings(timings, time.perf_counter() - start)
+    return 0 if ok else 1
+
+
+# ------------------------------------------------------------
+# Selecting the steps
+
+def load_seasons(targets, force):
+    # Sort the targets by season, before we leave the current
+    # directory.
+    season_targets = {}
+    # {season directory: its name, for messages}
+    season_names = {}
+    for target in targets:
+        if os.path.isdir(target):
+            season_dir, target = target, None
+        else:
+            season_dir = os.path.dirname(target) or '.'
+            target = os.path.abspath(target)
+        season_name = os.path.normpath(season_dir)
+        season_dir = os.path.abspath(season_dir)
+        season_names.setdefault(season_dir, season_name)
+        season_targets.setdefault(season_dir, []).append(target)
+
+    chdir_to_repo()
+    seasons = []
+    for season_dir, season_targets in season_targets.items():
+        commands_filename, state_filename = season_filenames(season_dir)
+        if not os.path.exists(commands_filename):
+            print('WARNING: Skipping %s, it has no %s' %
+                  (season_names[season_dir],
+                   os.path.basename(commands_filename)))
+            continue
+        steps = load_steps(commands_filename)
+        if None not in season_targets:
+            steps = downstream_steps(steps, [os.path.relpath(target)
+                                             for target in season_targets])
+        state = load_state(state_filename)
+        if force:
+            for step in steps:
+                state['steps'].pop(step.outputs[0], None)
+        seasons.append({
+            'state_filename': state_filename,
+            'state': state,
+            'steps': steps,
+        })
+    return seasons
+
+
+# Returns the steps that make any of the targets, or that depend on
+# them. The steps are already in build order, so one pass will do.
+def downstream_steps(steps, targets):
+    affected = set(targets)
+    selected = []
+    for step in steps:
+        if affected.intersection(step.inputs + step.outputs):
+            affected.update(step.outputs)
+            selected.append(step)
+    return selected
+
+
+# ------------------------------------------------------------
+# Running the steps
+
+def run_jobs(jobs, num_workers):
+    producers = {}
+    for job_num, (_, step) in enumerate(jobs):
+        for output in step.outputs:
+            producers[output] = job_num
+    dependencies = [set(producers[f] for f in step.inputs if f in producers)
+                    for _, step in jobs]
+
+    hashes = FileHashes()
+    waiting = list(range(len(jobs)))
+    done = set()
+    running = {}
+    timings = []
+    ok = True
+    with concurrent.futures.ProcessPoolExecutor(num_workers) as executor:
+        while ok:
+            # Start everything whose inputs are ready. Steps that turn
+            # out to be up to date may make more steps ready, so keep
+            # going until nothing changes.
+            started = True
+            while started:
+                started = False
+                for job_num in list(waiting):
+                    if not dependencies[job_num] <= done:
+                        continue
+                    waiting.remove(job_num)
+                    season, step = jobs[job_num]
+                    inputs = step_inputs(step)
+                    if not stale_reason(step, inputs, season['state'],
+                                        hashes, set()):
+                        done.add(job_num)
+                        started = True
+                        continue
+                    print('Starting %s' % step.outputs[0])
+                    future = executor.submit(run_job, step)
+                    running[future] = (job_num, inputs)
+
+            if not running:
+                break
+
+            finished, _ = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                job_num, inputs = running.pop(future)
+                season, step = jobs[job_num]
+                try:
+                    step_ok, seconds, log = future.result()
+                except Exception as e: # pylint: disable=broad-except
+                    step_ok, seconds, log = False, 0.0, '%r\n' % e
+                record_step(season['state'], step, inputs, hashes, step_ok)
+                timings.append((seconds, step))
+                if step_ok:
+                    print('  %6.2fs  %s' % (seconds, step.outputs[0]))
+                    done.add(job_num)
+                else:
+                    print('ERROR: %s failed after %.2fs:' %
+                          (step.outputs[0], seconds))
+                    sys.stdout.write(log)
+                    ok = False
+
+        if not ok:
+            # Fail fast. Let anything already running finish, but don't
+            # start anything else.
+            executor.shutdown(wait=True, cancel_futures=True)
+            for future, (job_num, inputs) in running.items():
+                season, step = jobs[job_num]
+                step_ok = not future.cancelled() and \
+                  future.exception() is None and future.result()[0]
+                record_step(season['state'], step, inputs, hashes, step_ok)
+    return timings, ok
+
+
+def run_job(step):
+    log = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        ok = run_step(step)
+    return ok, time.perf_counter() - start, log.getvalue()
+
+
+def print_timings(timings, wall_seconds):
+    if timings:
+        print('Slowest steps:')
+        for seconds, step in sorted(timings, key=lambda t: -t[0])[:10]:
+            print('  %6.2fs  %-22s %s' % (seconds, step.script, step.outputs[0]))
+    print('Ran %d steps, %.2fs of work in %.2fs' %
+          (len(timings), sum(seconds for seconds, _ in timings), wall_seconds))
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
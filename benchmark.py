@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+#
+# pylint: disable=missing-docstring
+#
+# This script measures how the pipeline holds up as events and seasons
+# grow. It generates synthetic events, laid out exactly like the CSVs
+# AXti.me exports (see 2026/*.csv), and runs every stage on them:
+#  - compute_results.py, publish_event.py, fin_to_base_html.py and
+#    transform_results.py for each event
+#  - publish_doty.py, publish_doty_raw.py and publish_series.py for the
+#    season
+#
+# Each scenario is a number of drivers per event, a number of runs per
+# driver and a number of events in the season. Every stage is run as
+# its own process, just as it would be by hand, and we record its wall
+# time and peak memory (RSS). Per-event stages are totalled over the
+# season.
+#
+# The measurements can be saved as a baseline and later runs compared
+# against it, so that a change that makes a stage slower or hungrier
+# shows up. The baseline only means something on the machine that
+# recorded it.
+#
+# The synthetic drivers, cars and classes are drawn from the real
+# events, so the class mix (indexed classes, Pro, Consolidated, ...)
+# and the names look like a real season. The same seed always
+# generates the same events.
+#
+# Invoke this as:
+#
+# ./benchmark.py                      # The default scenarios.
+# ./benchmark.py -d 150,1000 -r 9,18 -e 7,20
+# ./benchmark.py --save               # Record a new baseline.
+#
+
+import argparse
+import csv
+import glob
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from pax_factors import load_pax_table
+
+
+# The real events the synthetic ones are modelled on.
+SAMPLE_CSV_PATTERN = '2026/2026-mowog*.csv'
+
+DEFAULT_BASELINE_FILENAME = 'benchmark-baseline.json'
+
+EVENT_STAGES = ['compute_results', 'publish_event', 'fin_to_base_html',
+                'transform_results']
+SEASON_STAGES = ['publish_doty', 'publish_doty_raw', 'publish_series']
+
+# The fraction of the season's drivers that show up to any one event.
+TURNOUT = 0.75
+
+# Starting Python and pandas alone takes most of a second, and varies
+# by a tenth or two from run to run. Differences smaller than these
+# are noise, not regressions.
+MIN_DIFFS = {'wall': 0.2, 'max_rss_mb': 5.0}
+
+# How often a run has each penalty.
+PENALTY_WEIGHTS = [
+    ('', 82),
+    ('1', 8),
+    ('2', 3),
+    ('3', 1),
+    ('DNF', 3),
+    ('OFF', 1),
+    ('RERUN', 2),
+]
+
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-d',
+                        dest='driver_counts',
+                        default='150,600',
+                        help='The numbers of drivers per event, ' +
+                        'comma separated.')
+    parser.add_argument('-r',
+                        dest='run_counts',
+                        default='9,18',
+                        help='The numbers of runs per driver, comma ' +
+                        'separated.')
+    parser.add_argument('-e',
+                        dest='event_counts',
+                        default='7',
+                        help='The numbers of events in the season, comma ' +
+                        'separated.')
+    parser.add_argument('-n',
+                        dest='repeat',
+                        default=1,
+                        type=int,
+                        help='How many times to run each scenario. The ' +
+                        'fastest run of each stage is kept.')
+    parser.add_argument('-s',
+                        dest='seed',
+                        default=2026,
+                        type=int,
+                        help='The seed for generating the events.')
+    parser.add_argument('-b',
+                        dest='baseline_filename',
+                        default=DEFAULT_BASELINE_FILENAME,
+                        help='The baseline to compare against (or save).')
+    parser.add_argument('-t',
+                        dest='tolerance',
+                        default=0.25,
+                        type=float,
+                        help='How much slower (or bigger) than the ' +
+                        'baseline a stage may get before it counts as a ' +
+                        'regression, e.g., 0.25 for 25%%.')
+    parser.add_argument('--save',
+                        dest='save_baseline',
+                        default=False,
+                        action='store_true',
+                        help='Save the measurements as the new baseline.')
+    parser.add_argument('-k',
+                        dest='work_dir',
+                        default=None,
+                        help='Generate the events in this directory and ' +
+                        'keep them, rather than in a temporary directory.')
+    config = parser.parse_args(args)
+
+    # The scripts expect to run from the top of the repository.
+    baseline_filename = os.path.abspath(config.baseline_filename)
+    if config.work_dir:
+        config.work_dir = os.path.abspath(config.work_dir)
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    samples = load_samples(SAMPLE_CSV_PATTERN)
+
+    scenarios = [(num_drivers, num_runs, num_events)
+                 for num_drivers in parse_counts(config.driver_counts)
+                 for num_runs in parse_counts(config.run_counts)
+                 for num_events in parse_counts(config.event_counts)]
+
+    measurements = {}
+    for num_drivers, num_runs, num_events in scenarios:
+        name = scenario_name(num_drivers, num_runs, num_events)
+        print('%s: %d drivers, %d runs, %d events' %
+              (name, num_drivers, num_runs, num_events))
+        work_dir = config.work_dir or tempfile.mkdtemp(prefix='benchmark-')
+        scenario_dir = os.path.join(work_dir, name)
+        try:
+            os.makedirs(scenario_dir, exist_ok=True)
+            generate_season(scenario_dir, samples, num_drivers, num_runs,
+                            num_events, random.Random(config.seed))
+            stages = None
+            for _ in range(config.repeat):
+                stages = keep_fastest(stages,
+                                      run_season(scenario_dir, num_runs,
+                                                 num_events))
+        finally:
+            if not config.work_dir:
+                shutil.rmtree(work_dir, ignore_errors=True)
+        if stages is None:
+            return 1
+        print_stages(stages)
+        measurements[name] = stages
+
+    baseline = load_baseline(baseline_filename)
+    num_regressions = 0
+    if baseline:
+        num_regressions = compare_to_baseline(measurements, baseline,
+                                              config.tolerance)
+    if config.save_baseline:
+        save_baseline(measurements, baseline_filename)
+        print('Saved the baseline to %s' % baseline_filename)
+        return 0
+    return 1 if num_regressions else 0
+
+
+def parse_counts(counts):
+    return [int(count) for count in counts.split(',') if count.strip()]
+
+
+def scenario_name(num_drivers, num_runs, num_events):
+    return 'd%d-r%d-e%d' % (num_drivers, num_runs, num_events)
+
+
+# ------------------------------------------------------------
+# Generating events
+
+# Collects what the real events have in them: the column layout, the
+# names, the cars and how often each class shows up.
+def load_samples(pattern):
+    samples = {'first_names': set(), 'last_names': set(), 'cars': set(),
+               'classes': [], 'header': None}
+    filenames = sorted(glob.glob(pattern))
+    if not filenames:
+        raise FileNotFoundError('No sample events match %s' % pattern)
+    for filename in filenames:
+        with open(filename, newline='') as csv_file:
+            reader = csv.DictReader(csv_file)
+            samples['header'] = samples['header'] or reader.fieldnames
+            for row in reader:
+                if row['Class'].startswith('INVALID'):
+                    continue
+                samples['first_names'].add(row['FirstName'].strip())
+                samples['last_names'].add(row['LastName'].strip())
+                samples['cars'].add(row['Car'].strip())
+                samples['classes'].append(row['Class'].strip())
+    for key in ('first_names', 'last_names', 'cars'):
+        samples[key] = sorted(samples[key] - {''})
+    return samples
+
+
+# The columns of an event with num_runs runs. The columns before the
+# runs are the same as in the real events.
+def event_header(samples, num_runs):
+    header = [col for col in samples['header'] if not col.startswith('Run ')]
+    for run_num in range(1, num_runs + 1):
+        header.extend(['Run %d' % run_num, 'Run %d Pen' % run_num])
+    return header
+
+
+# Makes up the season's drivers: enough of them that each event has
+# num_drivers, with some coming and going. A driver keeps the same
+# name, car, class and (more or less) pace all season.
+def generate_drivers(samples, num_drivers, num_events, rng):
+    num_season_drivers = num_drivers if num_events == 1 else \
+      int(num_drivers / TURNOUT)
+    names = set()
+    while len(names) < num_season_drivers:
+        first_name = rng.choice(samples['first_names'])
+        last_name = rng.choice(samples['last_names'])
+        if len(names) >= len(samples['first_names']) * \
+           len(samples['last_names']) // 2:
+            # We have run short of names, so make some up.
+            last_name = '%s%d' % (last_name, len(names))
+        names.add((first_name, last_name))
+    drivers = []
+    for num, (first_name, last_name) in enumerate(sorted(names)):
+        drivers.append({
+            'FirstName': first_name,
+            'LastName': last_name,
+            'CarNumber': str(num + 1),
+            'Car': rng.choice(samples['cars']),
+            'Class': rng.choice(samples['classes']),
+            'Rookie': 'R' if rng.random() < 0.1 else '',
+            'pace': rng.gauss(1.0, 0.05),
+        })
+    return drivers
+
+
+def generate_event(samples, drivers, num_drivers, num_runs, pax_table, rng):
+    course_time = rng.uniform(35.0, 55.0)
+    rows = []
+    for driver in rng.sample(drivers, num_drivers):
+        row = dict((col, driver[col])
+                   for col in ('FirstName', 'LastName', 'CarNumber', 'Car',
+                               'Class', 'Rookie'))
+        row['MemberNumber'] = ''
+        # A few drivers leave early.
+        num_taken = num_runs if rng.random() < 0.95 else \
+          rng.randint(1, num_runs)
+        best = None
+        for run_num in range(1, num_runs + 1):
+            if run_num > num_taken:
+                row['Run %d' % run_num] = ''
+                row['Run %d Pen' % run_num] = ''
+                continue
+            # Drivers get a bit quicker over the day.
+            scratch = course_time * driver['pace'] * \
+              (1.0 + abs(rng.gauss(0.0, 0.03))) * (1.0 - 0.003 * run_num)
+            penalty = rng.choices([pen for pen, _ in PENALTY_WEIGHTS],
+                                  [weight for _, weight in PENALTY_WEIGHTS])[0]
+            row['Run %d' % run_num] = '%.3f' % scratch
+            row['Run %d Pen' % run_num] = penalty
+            if penalty in ('', '1', '2', '3'):
+                raw = scratch + 2.0 * int(penalty or 0)
+                best = raw if best is None else min(best, raw)
+        class_name = driver['Class'].split('-')[-1]
+        row['Best'] = '%.3f' % best if best else ''
+        row['Best Indexed'] = '%.3f' % (best * pax_table.get(class_name, 1.0)) \
+          if best else ''
+        rows.append(row)
+    add_ranks(rows)
+    return rows
+
+
+# The timing software's own ranks. We don't use them, but they are in
+# the real exports, so they are in ours.
+def add_ranks(rows):
+    def rank_key(col):
+        return lambda row: float(row[col]) if row[col] else float('inf')
+    for rank_col, time_col in (('OverallRank', 'Best'),
+                               ('IndexRank', 'Best Indexed')):
+        for rank, row in enumerate(sorted(rows, key=rank_key(time_col))):
+            row[rank_col] = str(rank + 1)
+    class_ranks = {}
+    for row in sorted(rows, key=rank_key('Best')):
+        class_ranks[row['Class']] = class_ranks.get(row['Class'], 0) + 1
+        row['ClassRank'] = str(class_ranks[row['Class']])
+    rows.sort(key=rank_key('Best'))
+
+
+def write_event_csv(filename, header, rows):
+    with open(filename, 'w', newline='') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=header,
+                                quoting=csv.QUOTE_ALL)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def event_basename(scenario_dir, event_num):
+    return os.path.join(scenario_dir, 'event%d' % event_num)
+
+
+def generate_season(scenario_dir, samples, num_drivers, num_runs, num_events,
+                    rng):
+    start = time.perf_counter()
+    pax_table = load_pax_table()
+    header = event_header(samples, num_runs)
+    drivers = generate_drivers(samples, num_drivers, num_events, rng)
+    for event_num in range(1, num_events + 1):
+        rows = generate_event(samples, drivers, num_drivers, num_runs,
+                              pax_table, rng)
+        write_event_csv(event_basename(scenario_dir, event_num) + '.csv',
+                        header, rows)
+
+    series_config = {
+        'output_filename': os.path.join(scenario_dir, 'series.html'),
+        'results_filenames': [event_basename(scenario_dir, event_num) +
+                              '.json'
+                              for event_num in range(1, num_events + 1)],
+        'event_labels': ['E%d' % event_num
+                         for event_num in range(1, num_events + 1)],
+        'title': 'Benchmark Series',
+        'num_events': num_events,
+        'num_btp_events': max(1, num_events * 6 // 10),
+    }
+    with open(os.path.join(scenario_dir, 'series-conf.json'), 'w') as out_file:
+        json.dump(series_config, out_file, indent=2)
+    print('  Generated %d events in %.2fs' %
+          (num_events, time.perf_counter() - start))
+
+
+# ------------------------------------------------------------
+# Running the stages
+
+# Returns the commands for each stage of the season, as (stage,
+# arguments).
+def season_commands(scenario_dir, num_runs, num_events):
+    commands = []
+    json_filenames = []
+    for event_num in range(1, num_events + 1):
+        base = event_basename(scenario_dir, event_num)
+        json_filenames.append(base + '.json')
+        commands.extend([
+            ('compute_results', ['-m', str(num_runs // 3), base + '.csv',
+                                 base + '.json']),
+            ('publish_event', ['-n', 'Event %d' % event_num,
+                               '-d', 'Saturday, 1 August, 2026',
+                               '-l', 'Benchmark', base + '.json',
+                               base + '-fin.html']),
+            ('fin_to_base_html', [base + '-fin.html', base + '.html']),
+            ('transform_results', [base + '.html', base + '-simple.html']),
+        ])
+    num_btp_events = str(max(1, num_events * 6 // 10))
+    commands.extend([
+        ('publish_doty', ['-t', 'Benchmark DOTY', '-n', str(num_events),
+                          '-b', num_btp_events,
+                          '-o', os.path.join(scenario_dir, 'doty.html')] +
+         json_filenames),
+        ('publish_doty_raw', ['-t', 'Benchmark DOTY RAW', '-n',
+                              str(num_events), '-b', num_btp_events,
+                              '-o', os.path.join(scenario_dir,
+                                                 'doty_raw.html')] +
+         json_filenames),
+        ('publish_series', ['-c', os.path.join(scenario_dir,
+                                               'series-conf.json')]),
+    ])
+    return commands
+
+
+# Runs every stage of the season. Returns {stage: {'calls': N, 'wall':
+# seconds, 'max_rss_mb': MB}}, or None if a stage failed.
+def run_season(scenario_dir, num_runs, num_events):
+    stages = dict((stage, {'calls': 0, 'wall': 0.0, 'max_rss_mb': 0.0})
+                  for stage in EVENT_STAGES + SEASON_STAGES)
+    log_filename = os.path.join(scenario_dir, 'benchmark.log')
+    with open(log_filename, 'w') as log_file:
+        for stage, stage_args in season_commands(scenario_dir, num_runs,
+                                                 num_events):
+            wall, max_rss_mb, exit_code = run_stage(stage, stage_args,
+                                                    log_file)
+            if exit_code:
+                print('ERROR: %s.py failed with exit code %d, see %s' %
+                      (stage, exit_code, log_filename))
+                return None
+            stages[stage]['calls'] += 1
+            stages[stage]['wall'] += wall
+            stages[stage]['max_rss_mb'] = max(stages[stage]['max_rss_mb'],
+                                              max_rss_mb)
+    return stages
+
+
+# Runs one stage in its own process. Returns (wall time, peak RSS in
+# MB, exit code).
+def run_stage(stage, stage_args, log_file):
+    log_file.write('$ %s.py %s\n' % (stage, ' '.join(stage_args)))
+    log_file.flush()
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, stage + '.py'] + stage_args,
+                            stdout=log_file, stderr=subprocess.STDOUT)
+    # Wait for it ourselves, so that we get its resource usage.
+    _, status, rusage = os.wait4(proc.pid, 0)
+    wall = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    # Linux reports KB, macOS reports bytes.
+    max_rss = rusage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+    return wall, max_rss / (1024.0 * 1024.0), proc.returncode
+
+
+def keep_fastest(stages, new_stages):
+    if stages is None or new_stages is None:
+        return new_stages or stages
+    for stage, measurement in new_stages.items():
+        if measurement['wall'] < stages[stage]['wall']:
+            stages[stage] = measurement
+    return stages
+
+
+def print_stages(stages):
+    print('  %-18s %5s %9s %9s %9s' %
+          ('stage', 'calls', 'total s', 'mean s', 'peak MB'))
+    total = 0.0
+    for stage, measurement in stages.items():
+        total += measurement['wall']
+        print('  %-18s %5d %9.2f %9.3f %9.1f' %
+              (stage, measurement['calls'], measurement['wall'],
+               measurement['wall'] / max(measurement['calls'], 1),
+               measurement['max_rss_mb']))
+    print('  %-18s %5s %9.2f' % ('total', '', total))
+
+
+# ------------------------------------------------------------
+# The baseline
+
+def load_baseline(filename):
+    if not os.path.exists(filename):
+        return None
+    with open(filename) as json_file:
+        return json.load(json_file)
+
+
+def save_baseline(measurements, filename):
+    baseline = {
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'recorded': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'scenarios': measurements,
+    }
+    with open(filename, 'w') as out_file:
+        json.dump(baseline, out_file, indent=2, sort_keys=True)
+        out_file.write('\n')
+
+
+# Prints how each stage compares to the baseline. Returns the number of
+# regressions.
+def compare_to_baseline(measurements, baseline, tolerance):
+    print('Compared to the baseline recorded %s (Python %s):' %
+          (baseline.get('recorded'), baseline.get('python')))
+    num_regressions = 0
+    for name, stages in measurements.items():
+        baseline_stages = baseline['scenarios'].get(name)
+        if not baseline_stages:
+            print('  %s: not in the baseline' % name)
+            continue
+        for stage, measurement in stages.items():
+            if stage not in baseline_stages:
+                continue
+            for key, label in (('wall', 'time'), ('max_rss_mb', 'memory')):
+                old_value = baseline_stages[stage][key]
+                new_value = measurement[key]
+                if not old_value:
+                    continue
+                ratio = new_value / old_value
+                flag = ''
+                significant = abs(new_value - old_value) >= MIN_DIFFS[key]
+                if significant and ratio > 1.0 + tolerance:
+                    flag = '  REGRESSION'
+                    num_regressions += 1
+                elif significant and ratio < 1.0 - tolerance:
+                    flag = '  improved'
+                print('  %-14s %-18s %-6s %9.2f -> %9.2f (%+.0f%%)%s' %
+                      (name, stage, label, old_value, new_value,
+                       (ratio - 1.0) * 100.0, flag))
+    if num_regressions:
+        print('%d regressions' % num_regressions)
+    return num_regressions
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
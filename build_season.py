@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+#
+# pylint: disable=missing-docstring
+#
+# This script rebuilds a season directory, but only the parts of it
+# that are out of date. It reads the season's commands.txt (the same
+# lines we would otherwise run by hand) and works out the build graph:
+#  - CSV -> compute_results.py -> JSON
+#  - JSON -> publish_event.py -> fin.html -> fin_to_base_html.py -> HTML
+#  - all of the JSONs -> publish_doty.py, publish_doty_raw.py and
+#    publish_series.py -> season HTML
+#  - every HTML page -> compress_pages.py -> .html.gz (and .html.br)
+#
+# A step is rebuilt when any of its inputs changed since it last ran.
+# The inputs are the files named on its command line, the script
+# itself (and the local modules it imports), and the data files the
+# script reads, like pax-factors.json, aliases.json and the templates.
+# Changes are detected by content hash, not by timestamp, and the
+# hashes from the last successful build are kept in
+# <season>/.build-state.json. If a rebuilt file comes out exactly the
+# same, nothing downstream of it is rebuilt.
+#
+# The steps are run in this interpreter, by calling each script's
+# main(), rather than starting a new Python for every step.
+#
+# Invoke this as:
+#
+# ./build_season.py 2026
+# ./build_season.py -n 2026   # Only show what would be rebuilt.
+#
+
+import argparse
+import ast
+import collections
+import functools
+import hashlib
+import importlib
+import json
+import os
+import shlex
+import sys
+import time
+import traceback
+
+from compress_pages import compressed_filenames
+from pax_factors import pax_factor_filenames, year_of
+
+
+STATE_FILENAME = '.build-state.json'
+
+STATE_FORMAT_VERSION = 1
+
+ALIASES_FILENAME = 'aliases.json'
+
+# The data files each script reads, other than those named on its
+# command line. fin_to_base_html.py also borrows its CSS from whatever
+# base HTML it finds first, but that is not something we can track.
+SCRIPT_DATA_FILES = {
+    'compute_results.py': [],
+    'publish_event.py': [
+        'templates/style.css',
+        'templates/event-class-result.html',
+        'templates/raw-result.html',
+        'templates/pax-result.html',
+        'templates/mac-logo-small.png',
+        'templates/event-results.html',
+    ],
+    'publish_doty.py': [
+        ALIASES_FILENAME,
+        'templates/style.css',
+        'templates/mac-logo-small.png',
+        'templates/doty-results.html',
+    ],
+    'publish_doty_raw.py': [
+        ALIASES_FILENAME,
+        'templates/style.css',
+        'templates/mac-logo-small.png',
+        'templates/doty-results.html',
+    ],
+    'publish_series.py': [
+        ALIASES_FILENAME,
+        'templates/style.css',
+        'templates/series-class-result.html',
+        'templates/mac-logo-small.png',
+        'templates/series-results.html',
+    ],
+    'fin_to_base_html.py': [],
+    'compress_pages.py': [],
+}
+
+Step = collections.namedtuple('Step', ['script', 'args', 'inputs', 'outputs'])
+
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-c',
+                        dest='commands_filename',
+                        help='The commands to build the season from. ' +
+                        'Defaults to commands.txt in the season directory.')
+    parser.add_argument('-n',
+                        dest='dry_run',
+                        default=False,
+                        action='store_true',
+                        help='If set, only show what would be rebuilt.')
+    parser.add_argument('-f',
+                        dest='force',
+                        default=False,
+                        action='store_true',
+                        help='If set, rebuild everything.')
+    parser.add_argument('season_dir',
+                        help='The season directory, e.g., 2026.')
+    config = parser.parse_args(args)
+
+    commands_filename, state_filename = \
+      season_filenames(config.season_dir, config.commands_filename)
+    chdir_to_repo()
+
+    steps = load_steps(commands_filename)
+    print('Read %d steps from %s' % (len(steps), commands_filename))
+
+    state = load_state(state_filename)
+    if config.force:
+        state['steps'] = {}
+
+    ok = build(steps, state, config.dry_run)
+    if not config.dry_run:
+        save_state(state, state_filename)
+    return 0 if ok else 1
+
+
+def season_filenames(season_dir, commands_filename=None):
+    commands_filename = os.path.abspath(
+        commands_filename or os.path.join(season_dir, 'commands.txt'))
+    state_filename = os.path.abspath(os.path.join(season_dir, STATE_FILENAME))
+    return commands_filename, state_filename
+
+
+# The commands are written relative to the top of the repository, and
+# the scripts expect to be run from there too.
+def chdir_to_repo():
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ------------------------------------------------------------
+# The build graph
+
+def load_steps(commands_filename):
+    steps = []
+    with open(commands_filename) as in_file:
+        for line in in_file:
+            words = shlex.split(line, comments=True)
+            if words[:2] == ['poetry', 'run']:
+                words = words[2:]
+            if not words:
+                continue
+            script = os.path.basename(words[0])
+            if script not in STEP_BUILDERS:
+                # poetry install, and the like.
+                continue
+            steps.extend(STEP_BUILDERS[script](script, words[1:]))
+    return order_steps(steps + list(compress_pages_steps(steps)))
+
+
+def compute_results_steps(script, args):
+    csv_filenames = path_args(args, ('.csv',))
+    yield Step(script, args,
+               csv_filenames + season_pax_filenames(csv_filenames),
+               path_args(args, ('.json',)))
+
+
+def publish_event_steps(script, args):
+    json_filenames = path_args(args, ('.json',))
+    step = Step(script, args,
+                json_filenames + season_pax_filenames(json_filenames),
+                path_args(args, ('.html',)))
+    yield step
+
+    # We always follow publish_event.py with fin_to_base_html.py.
+    for fin_filename in step.outputs:
+        if fin_filename.endswith('-fin.html'):
+            base_filename = fin_filename[:-len('-fin.html')] + '.html'
+            yield Step('fin_to_base_html.py', [fin_filename, base_filename],
+                       [fin_filename] + json_filenames, [base_filename])
+
+
+def publish_doty_steps(script, args):
+    # Each -s adds another set of standings: points column, title and
+    # output file.
+    more_outputs = [values[2] for values in option_values(args, '-s', 3)]
+    yield Step(script, args,
+               path_args(args, ('.json',)),
+               [option_value(args, '-o')] + more_outputs)
+
+
+def publish_series_steps(script, args):
+    results_filenames = path_args(args, ('.json', '.xlsx'))
+    config_filenames = []
+    output_filename = option_value(args, '-o')
+    config_filename = option_value(args, '-c')
+    if config_filename:
+        # Anything in the config overrides the command line.
+        results_filenames.remove(config_filename)
+        config_filenames.append(config_filename)
+        with open(config_filename) as json_data:
+            json_config = json.load(json_data)
+        results_filenames = json_config.get('results_filenames',
+                                            results_filenames)
+        output_filename = json_config.get('output_filename', output_filename)
+    yield Step(script, args,
+               config_filenames + results_filenames +
+               season_pax_filenames(results_filenames),
+               [output_filename])
+
+
+# Every page is compressed, ready to upload, once it is built.
+def compress_pages_steps(steps):
+    for step in steps:
+        for page_filename in step.outputs:
+            if page_filename and page_filename.endswith('.html'):
+                yield Step('compress_pages.py', [page_filename],
+                           [page_filename], compressed_filenames(page_filename))
+
+
+STEP_BUILDERS = {
+    'compute_results.py': compute_results_steps,
+    'publish_event.py': publish_event_steps,
+    'publish_doty.py': publish_doty_steps,
+    'publish_doty_raw.py': publish_doty_steps,
+    'publish_series.py': publish_series_steps,
+}
+
+
+# Orders the steps so that every step comes after the steps that make
+# its inputs, but otherwise keeps them in the order of the commands. If
+# two steps make the same file, the later one wins.
+def order_steps(steps):
+    producers = {}
+    for step in steps:
+        for output in step.outputs:
+            producers[output] = step
+    steps = [step for step in steps
+             if all(producers[output] is step for output in step.outputs)]
+
+    ordered = []
+    visited = set()
+
+    def visit(step, path):
+        if id(step) in visited:
+            return
+        if id(step) in path:
+            raise ValueError('Build cycle through %s' % ', '.join(step.outputs))
+        path.add(id(step))
+        for input_filename in step.inputs:
+            if input_filename in producers:
+                visit(producers[input_filename], path)
+        path.discard(id(step))
+        visited.add(id(step))
+        ordered.append(step)
+
+    for step in steps:
+        visit(step, set())
+    return ordered
+
+
+# The PAX factor files used for the season of the first file.
+def season_pax_filenames(filenames):
+    if not filenames:
+        return []
+    return pax_factor_filenames(year_of(filenames[0]))
+
+
+def path_args(args, extensions):
+    return [arg for arg in args if arg.endswith(extensions)]
+
+
+def option_value(args, flag):
+    if flag in args[:-1]:
+        return args[args.index(flag) + 1]
+    return None
+
+
+# Returns the values of every use of a flag that takes num_values.
+def option_values(args, flag, num_values):
+    return [args[num + 1:num + 1 + num_values]
+            for num, arg in enumerate(args[:-num_values])
+            if arg == flag]
+
+
+# ------------------------------------------------------------
+# Building
+
+def build(steps, state, dry_run=False):
+    hashes = FileHashes()
+    pending = set()
+    failed = set()
+    num_built = 0
+    num_failed = 0
+    for step in steps:
+        blocked = [f for f in step.inputs if f in failed]
+        if blocked:
+            print('Skipping %s, %s failed' % (step.outputs[0], blocked[0]))
+            failed.update(step.outputs)
+            num_failed += 1
+            continue
+
+        inputs = step_inputs(step)
+        reason = stale_reason(step, inputs, state, hashes, pending)
+        if not reason:
+            continue
+
+        print('Building %s (%s)' % (', '.join(step.outputs), reason))
+        if dry_run:
+            pending.update(step.outputs)
+            num_built += 1
+            continue
+
+        start = time.perf_counter()
+        ok = run_step(step)
+        record_step(state, step, inputs, hashes, ok)
+        if not ok:
+            failed.update(step.outputs)
+            num_failed += 1
+            continue
+        num_built += 1
+        print('  %.2fs' % (time.perf_counter() - start))
+
+    if dry_run:
+        print('Would build %d of %d steps' % (num_built, len(steps)))
+    else:
+        print('Built %d of %d steps, %d failed' %
+              (num_built, len(steps), num_failed))
+    return not failed
+
+
+# Returns why the step needs to be rebuilt, or None if it doesn't.
+def stale_reason(step, inputs, state, hashes, pending):
+    record = state['steps'].get(step.outputs[0])
+    if record is None:
+        return 'never built'
+    if record['command'] != [step.script] + step.args:
+        return 'command changed'
+    for input_filename in inputs:
+        if input_filename in pending:
+            return '%s will be rebuilt' % input_filename
+        if record['inputs'].get(input_filename) != hashes.get(input_filename):
+            return '%s changed' % input_filename
+    for output_filename in step.outputs:
+        if record['outputs'].get(output_filename) != hashes.get(output_filename):
+            return '%s changed' % output_filename
+    return None
+
+
+# Records the hashes a step was built from, once it has run.
+def record_step(state, step, inputs, hashes, ok):
+    hashes.forget(step.outputs)
+    if not ok:
+        # Make sure it is retried next time, whatever it left behind.
+        state['steps'].pop(step.outputs[0], None)
+        return
+    state['steps'][step.outputs[0]] = {
+        'command': [step.script] + step.args,
+        'inputs': dict((f, hashes.get(f)) for f in inputs),
+        'outputs': dict((f, hashes.get(f)) for f in step.outputs),
+    }
+
+
+def step_inputs(step):
+    return step.inputs + list(script_files(step.script)) + \
+      SCRIPT_DATA_FILES[step.script]
+
+
+def run_step(step):
+    module = importlib.import_module(os.path.splitext(step.script)[0])
+    try:
+        result = module.main(step.args)
+    except SystemExit as e:
+        result = e.code
+    except Exception: # pylint: disable=broad-except
+        traceback.print_exc()
+        result = 1
+    if result:
+        print('ERROR: %s failed: %s' % (step.script, result))
+        return False
+    return True
+
+
+# Returns the script, and any of our modules it imports, directly or
+# not.
+@functools.lru_cache(maxsize=None)
+def script_files(script):
+    return tuple(find_script_files(script, []))
+
+
+def find_script_files(script, found):
+    found.append(script)
+    with open(script) as in_file:
+        tree = ast.parse(in_file.read(), script)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            names = [node.module]
+        else:
+            continue
+        for name in names:
+            filename = name + '.py'
+            if os.path.exists(filename) and filename not in found:
+                find_script_files(filename, found)
+    return found
+
+
+class FileHashes:
+
+    def __init__(self):
+        self.hashes = {}
+
+    def get(self, filename):
+        if filename not in self.hashes:
+            if os.path.exists(filename):
+                with open(filename, 'rb') as in_file:
+                    self.hashes[filename] = \
+                      hashlib.sha256(in_file.read()).hexdigest()
+            else:
+                self.hashes[filename] = None
+        return self.hashes[filename]
+
+    def forget(self, filenames):
+        for filename in filenames:
+            self.hashes.pop(filename, None)
+
+
+# ------------------------------------------------------------
+# Build state
+
+def load_state(state_filename):
+    if os.path.exists(state_filename):
+        with open(state_filename) as json_data:
+            state = json.load(json_data)
+        if state.get('format_version') == STATE_FORMAT_VERSION:
+            return state
+    return {'format_version': STATE_FORMAT_VERSION, 'steps': {}}
+
+
+def save_state(state, state_filename):
+    with open(state_filename, 'wt') as out_file:
+        json.dump(state, out_file, indent=2, sort_keys=True)
+        out_file.write('\n')
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+#
+# pylint: disable=missing-docstring
+#
+# This script gets the pages ready to upload. Each page inlines the
+# style sheet and the logo, and the base pages carry a style sheet of
+# their own, so they are bigger than they need to be. For each page,
+# e.g., 2026/doty.html, this writes:
+#
+#   2026/doty.html.gz  The page, minified and gzipped.
+#   2026/doty.html.br  The same, with brotli, if the brotli module is
+#                      installed.
+#
+# The page itself is left as it is, so that it still reads (and diffs)
+# as it always has. A web server set up to serve precompressed files
+# sends whichever the browser accepts.
+#
+# Minifying only drops what the browser would ignore anyway: comments,
+# indentation, and runs of spaces and newlines (which become a single
+# space or newline). The contents of <pre>, <textarea> and <script> are
+# left alone, and <style> is minified as CSS.
+#
+# It prints the sizes of each page. If the gzipped page is bigger than
+# the budget (-b, in KB), it fails, and build_season.py (which runs
+# this after every page it builds) reports the page as failed.
+#
+# Invoke this as:
+#
+# ./compress_pages.py 2026
+# ./compress_pages.py -b 64 2026/doty.html 2026/mowog-series.html
+# ./compress_pages.py -n 2026   # Only report the sizes.
+#
+
+import argparse
+import glob
+import gzip
+import os
+import re
+import sys
+
+try:
+    import brotli
+except ImportError:
+    # .br files are optional.
+    brotli = None
+
+
+# The most a gzipped page may be, in KB.
+PAGE_BUDGET_KB = 80
+
+RAW_TEXT_RE = re.compile(r'<(pre|textarea|script|style)\b[^>]*>(.*?)</\1\s*>',
+                         re.I | re.S)
+TAG_RE = re.compile(r'(<!--.*?-->|<[^>]*>)', re.S)
+# Only what HTML counts as whitespace: not &nbsp;.
+SPACES_RE = re.compile(r'[ \t\r\n\f]+')
+# Whitespace that is not already a single space.
+EXTRA_SPACES_RE = re.compile(r'[\t\r\n\f]|  ')
+QUOTED_RE = re.compile(r'("[^"]*"|\'[^\']*\')')
+CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+CSS_PUNCTUATION_RE = re.compile(r' ?([{};,]) ?')
+
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-b',
+                        dest='budget_kb',
+                        default=PAGE_BUDGET_KB,
+                        type=float,
+                        help='The most a gzipped page may be, in KB.')
+    parser.add_argument('-n',
+                        dest='report_only',
+                        default=False,
+                        action='store_true',
+                        help='If set, only report the sizes.')
+    parser.add_argument('pages',
+                        nargs='+',
+                        help='HTML pages, or season directories to do ' +
+                        'every page of.')
+    config = parser.parse_args(args)
+
+    totals = PageSizes(0, 0, 0, 0 if brotli else None)
+    over_budget = []
+    for filename in page_filenames(config.pages):
+        sizes = compress_page(filename, not config.report_only)
+        over = sizes.gzip > config.budget_kb * 1024
+        print('%s%s' % (format_sizes(filename, sizes),
+                        '  OVER BUDGET' if over else ''))
+        if over:
+            over_budget.append(filename)
+        totals = totals.add(sizes)
+    if len(config.pages) > 1 or os.path.isdir(config.pages[0]):
+        print(format_sizes('Total', totals))
+
+    if over_budget:
+        print('ERROR: %d pages are over the %gKB budget: %s' %
+              (len(over_budget), config.budget_kb, ', '.join(over_budget)))
+        return 1
+    return 0
+
+
+def page_filenames(pages):
+    filenames = []
+    for page in pages:
+        if os.path.isdir(page):
+            filenames.extend(sorted(glob.glob(os.path.join(page, '*.html'))))
+        else:
+            filenames.append(page)
+    return filenames
+
+
+# The files written for a page.
+def compressed_filenames(filename):
+    filenames = [filename + '.gz']
+    if brotli:
+        filenames.append(filename + '.br')
+    return filenames
+
+
+class PageSizes:
+
+    def __init__(self, raw, minified, gzip_size, brotli_size):
+        self.raw = raw
+        self.minified = minified
+        self.gzip = gzip_size
+        self.brotli = brotli_size
+
+    def add(self, other):
+        return PageSizes(
+            self.raw + other.raw, self.minified + other.minified,
+            self.gzip + other.gzip,
+            None if self.brotli is None else self.brotli + other.brotli)
+
+
+def format_sizes(name, sizes):
+    text = '%s: %s, %s minified, %s gzip' % (
+        name, format_kb(sizes.raw), format_kb(sizes.minified),
+        format_kb(sizes.gzip))
+    if sizes.brotli is not None:
+        text += ', %s brotli' % format_kb(sizes.brotli)
+    return text
+
+
+def format_kb(num_bytes):
+    return '%.1fKB' % (num_bytes / 1024.0)
+
+
+# ------------------------------------------------------------
+# Compressing
+
+# Writes the compressed files for a page, and returns its sizes.
+def compress_page(filename, write=True):
+    with open(filename, 'rb') as in_file:
+        raw = in_file.read()
+    minified = minify_html(raw.decode('utf-8')).encode('utf-8')
+    # No timestamp, so the same page always compresses the same.
+    gzipped = gzip.compress(minified, 9, mtime=0)
+    brotlied = brotli.compress(minified) if brotli else None
+    if write:
+        write_file(filename + '.gz', gzipped)
+        if brotlied is not None:
+            write_file(filename + '.br', brotlied)
+    return PageSizes(len(raw), len(minified), len(gzipped),
+                     None if brotlied is None else len(brotlied))
+
+
+def write_file(filename, data):
+    temp_filename = filename + '.tmp'
+    with open(temp_filename, 'wb') as out_file:
+        out_file.write(data)
+    os.replace(temp_filename, filename)
+
+
+# ------------------------------------------------------------
+# Minifying
+
+def minify_html(text):
+    pieces = []
+    pos = 0
+    for match in RAW_TEXT_RE.finditer(text):
+        pieces.append(minify_markup(text[pos:match.start()]))
+        if match.group(1).lower() == 'style':
+            pieces.append(text[match.start():match.start(2)])
+            pieces.append(minify_css(match.group(2)))
+            pieces.append(text[match.end(2):match.end()])
+        else:
+            pieces.append(match.group(0))
+        pos = match.end()
+    pieces.append(minify_markup(text[pos:]))
+    return ''.join(pieces)
+
+
+# Minifies markup with no raw text elements in it. Attribute values are
+# left alone, as they may have spaces that matter.
+def minify_markup(markup):
+    pieces = []
+    # The text since the last tag we kept: dropping a comment can leave
+    # two runs of spaces side by side.
+    text = []
+    for num, piece in enumerate(TAG_RE.split(markup)):
+        if num % 2 == 0:
+            text.append(piece)
+        elif not piece.startswith('<!--') or piece.startswith('<!--[if'):
+            pieces.append(SPACES_RE.sub(collapse_spaces, ''.join(text)))
+            pieces.append(minify_tag(piece))
+            text = []
+    pieces.append(SPACES_RE.sub(collapse_spaces, ''.join(text)))
+    return ''.join(pieces)
+
+
+def minify_tag(tag):
+    if tag.startswith('<!--') or not EXTRA_SPACES_RE.search(tag):
+        return tag
+    parts = QUOTED_RE.split(tag)
+    for num in range(0, len(parts), 2):
+        parts[num] = SPACES_RE.sub(collapse_spaces, parts[num])
+    return ''.join(parts)
+
+
+def collapse_spaces(match):
+    return '\n' if '\n' in match.group(0) else ' '
+
+
+def minify_css(css):
+    css = SPACES_RE.sub(' ', CSS_COMMENT_RE.sub('', css))
+    css = CSS_PUNCTUATION_RE.sub(r'\1', css).replace(';}', '}')
+    return css.strip()
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
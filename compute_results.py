@@ -19,17 +19,22 @@
 #
 
 import argparse
-import json
-import math
-import re
+import itertools
 import sys
 
+import numpy as np
 import pandas as pd
+from pandas.api.types import infer_dtype, union_categoricals
 
+from driver_history import record_event
+from event_cache import write_event_cache
+from pax_factors import pax_table_for
+from run_matrix import (INVALID_TIME, PEN_CONES, PEN_DNF, PEN_RERUN,
+                        RunMatrix, identify_run_cols, sidecar_filename)
 
-INVALID_TIME = 9999.999
 
-RUN_COL_RE = re.compile(r'^run\s+(\d+)$', re.IGNORECASE)
+# The number of rows of the event CSV to parse at a time.
+READ_CHUNK_ROWS = 1000
 
 
 def main(args):
@@ -47,6 +52,13 @@ def main(args):
                         help='If set, do not compute split times for ' +
                         'the pro class. This is useful if the event was ' +
                         'canceled after morning runs.')
+    parser.add_argument('--history',
+                        dest='history_filename',
+                        default=None,
+                        metavar='DB',
+                        help='Also record who drove in this driver history ' +
+                        'database (see driver_history.py), e.g., ' +
+                        'driver-history.sqlite.')
     parser.add_argument('results_filename',
                         help='The input file. Will extract results from ' +
                         'this file.')
@@ -70,189 +82,198 @@ def main(args):
     print('Columns with runs in them:')
     print(config.run_cols)
 
-    # Compute the scratch and raw times. Skips reruns and such.
-    event_results = event_results.apply(add_scored_times, axis=1, args=[config])
-    event_results = event_results.apply(add_run_stats, axis=1, args=[config])
-
-    # Only keep rows with valid times. This prevents us from dealing
-    # with rows for drivers who registered but did not show.
-    event_results['has_valid_time'] = \
-      event_results.apply(has_valid_time, axis=1)
-    event_results = event_results.loc[event_results['has_valid_time']]
+    # Score every driver. Only rows with valid times are kept. This
+    # prevents us from dealing with rows for drivers who registered but
+    # did not show.
+    event_results, runs = score_event(event_results, config)
     print('  kept %d rows with valid times' % len(event_results))
     print('  %d runs, %d of these were dirty' %
           (event_results['num_runs'].sum(), event_results['num_dirty_runs'].sum()))
 
-    # Split up the index and classes.
-    event_results = event_results.apply(add_class_names_and_indexes, axis=1)
-
-    # Merge the PAX factors into the data.
-    event_results = event_results.apply(add_pax_factors, axis=1, args=[config])
-
-    # And add PAX times.
-    event_results = event_results.apply(add_pax_times, axis=1)
-
-    # Compute the best times. For indexed classes, these are PAX
-    # times, otherwise these are raw. For the Pro class, we compute
-    # both a morning and afternoon time.
-    if config.num_morning_times < 1:
-        config.compute_split_pro_times = False
-    
-    event_results = event_results.apply(add_best_times, axis=1, args=[config])
-    event_results['doty_points'] = \
-        event_results['best_pax_time'].min() / event_results['best_pax_time'] * 100.0
-    event_results.loc[event_results['best_pax_time'] >= INVALID_TIME, 'doty_points'] = 0.0
-    event_results['doty_raw_points'] = \
-        event_results['best_raw_time'].min() / event_results['best_raw_time'] * 100.0
-    event_results.loc[event_results['best_raw_time'] >= INVALID_TIME, 'doty_raw_points'] = 0.0
+    # The DOTY points depend on the whole field, so these come last.
+    event_results = add_doty_points(event_results)
 
     # For debugging, print out what we found.
     # summarize_classes(event_results)
 
     if config.output_filename:
-        write_results(event_results, config.output_filename)
+        write_results(event_results, runs, config.output_filename,
+                      [config.results_filename] + config.pax_factors.filenames)
+        if config.history_filename:
+            # And who drove, for the drivers' history across seasons.
+            record_event(config.output_filename,
+                         event_results.to_dict('records'),
+                         db_filename=config.history_filename)
 
 
 # ------------------------------------------------------------
 # Main functionality
 
 def load_pax_factors(config):
-    with open('pax-factors.json') as json_file:
-        pax_data = json.load(json_file)
-
-        print('PAX factors')
-        config.pax_factors = {}
-        for obj in pax_data:
-            name = obj['name']
-            factor = obj['factor']
-
-            config.pax_factors[name] = factor
-            print('  %10s => %0.3f' % (name, factor))
+    config.pax_factors = pax_table_for(config.results_filename)
+    print('Using %d PAX factors from %s' %
+          (len(config.pax_factors), ', '.join(config.pax_factors.filenames)))
 
 
 def read_event_results(config):
     print('Reading event results from:')
     print('  %s' % config.results_filename)
-    results = pd.read_csv(config.results_filename)
-
-    # Strip whitespace wherever possible.
-    # https://stackoverflow.com/a/40950485
-    #
-    # str_df = results.select_dtypes(['object'])
-    # results[str_df.columns] = str_df.apply(lambda x: x.str.strip())
-    #
-    # Improved answer:
-    # https://stackoverflow.com/a/45270483
-    results = results.applymap(lambda x: x.strip() if isinstance(x, str) else x)
-
+    results = load_event_csv(config.results_filename)
     print(results.head())
     return results
 
 
-def strip_str(x):
-    print(x)
-    return
+def load_event_csv(filename):
+    # Peek at the header, so that we can tell pandas up front that the
+    # run times are numbers and the penalties are a handful of
+    # repeated strings.
+    header = pd.read_csv(filename, nrows=0)
+    run_cols = identify_run_cols(header)
+    dtypes = {}
+    for run_col, pen_col in run_cols:
+        dtypes[run_col] = 'float64'
+        dtypes[pen_col] = 'str'
+
+    # Read the file a chunk at a time, tidying up each chunk as it
+    # comes in.
+    chunks = []
+    with pd.read_csv(filename, dtype=dtypes,
+                     chunksize=READ_CHUNK_ROWS) as reader:
+        for chunk in reader:
+            chunks.append(tidy_event_chunk(chunk, run_cols))
+    return numeric_penalties(concat_event_chunks(chunks, run_cols), run_cols)
+
+
+# Strips whitespace from every string, and makes the penalty columns
+# categorical.
+def tidy_event_chunk(chunk, run_cols):
+    for col in chunk.columns[chunk.dtypes == object]:
+        if infer_dtype(chunk[col]) not in ('string', 'mixed'):
+            # Nothing to strip, e.g., all True or NaN.
+            continue
+        stripped = chunk[col].str.strip()
+        # Leave anything that isn't a string alone.
+        chunk[col] = stripped.where(stripped.notna(), chunk[col])
+    for _, pen_col in run_cols:
+        chunk[pen_col] = chunk[pen_col].astype('category')
+    return chunk
+
+
+def concat_event_chunks(chunks, run_cols):
+    if len(chunks) == 1:
+        return chunks[0]
+    results = pd.concat(chunks, ignore_index=True)
+    # Each chunk found its own penalty categories, so combine those
+    # rather than falling back to plain objects.
+    for _, pen_col in run_cols:
+        results[pen_col] = union_categoricals(
+            [chunk[pen_col] for chunk in chunks])
+    return results
 
 
-def identify_run_cols(results):
-    run_cols = []
-    for col in results.columns:
-        match = RUN_COL_RE.match(col)
-        if match:
-            pen_col = '%s Pen' % match.group(0)
-            run_cols.append((col, pen_col))
-    return run_cols
+# Makes the penalty columns that only hold numbers (cone counts, or
+# nothing at all) numbers again, as pandas would have read them, so
+# that the JSON results still carry 1.0 rather than "1".
+def numeric_penalties(results, run_cols):
+    for _, pen_col in run_cols:
+        penalties = results[pen_col].astype(object)
+        numbers = pd.to_numeric(penalties, errors='coerce')
+        if numbers.notna().sum() == penalties.notna().sum():
+            results[pen_col] = pd.to_numeric(penalties)
+    return results
 
 
-def add_scored_times(row, config):
-    # print('row? ' + str(row))
-    times = []
+# Scores the drivers in the event results, returning the results for
+# the drivers with valid times and their run matrix. Each driver is
+# scored on their own runs alone, so this works just as well on a few
+# rows of the event as on the whole thing.
+def score_event(event_results, config):
+    # Parse the run columns into (drivers x runs) arrays once. All of
+    # the scoring below works on these arrays rather than row by row.
+    runs = RunMatrix.from_columns(event_results, config.run_cols)
 
-    # print('run_cols? ' + str(config.run_cols))
-    for run_col, pen_col in config.run_cols:
-        scratch_time = row[run_col]
-        if not scratch_time or math.isnan(scratch_time):
-            continue
+    # Compute the scratch and raw times. Skips reruns and such.
+    event_results = add_scored_times(event_results, runs)
+    event_results = add_run_stats(event_results, runs)
 
-        penalty = row[pen_col]
-        # print('scratch: ' + str(scratch_time) + ' pen? ' + str(penalty))
-
-        # Start with the scratch time.
-        raw_time = scratch_time
-
-        # Handle penalties, add time for cones or nullify time for
-        # DNFs and reruns.
-        if penalty:
-            if isinstance(penalty, float) and math.isnan(penalty):
-                # No penalty.
-                penalty = int(0)
-
-            if penalty in ('DNF', 'OFF', 'DQ'):
-                # This is a valid run, but a useless time.
-                raw_time = INVALID_TIME
-            elif str(penalty).startswith('RERUN'):
-                # This is not a valid time.
-                raw_time = None
-            else:
-                # Has cones, add two seconds for each.
-                penalty = int(penalty)
-                raw_time = raw_time + 2.0 * penalty
+    # Only keep rows with valid times.
+    event_results['has_valid_time'] = has_valid_time(runs)
+    runs = runs.select(event_results['has_valid_time'].to_numpy())
+    event_results = event_results.loc[event_results['has_valid_time']].copy()
 
-        if raw_time:
-            times.append((scratch_time, penalty, raw_time))
+    # Split up the index and classes.
+    event_results = add_class_names_and_indexes(event_results)
 
-    # print('times: ' + str(times))
-    row['times'] = times
-    return row
+    # Merge the PAX factors into the data.
+    event_results = add_pax_factors(event_results, config)
 
+    # And add PAX times.
+    event_results = add_pax_times(event_results, runs)
+
+    # Compute the best times. For indexed classes, these are PAX
+    # times, otherwise these are raw. For the Pro class, we compute
+    # both a morning and afternoon time.
+    if config.num_morning_times < 1:
+        config.compute_split_pro_times = False
+
+    event_results = add_best_times(event_results, runs, config)
+    return event_results, runs
+
+
+def add_doty_points(results):
+    results['doty_points'] = \
+        results['best_pax_time'].min() / results['best_pax_time'] * 100.0
+    results.loc[results['best_pax_time'] >= INVALID_TIME, 'doty_points'] = 0.0
+    results['doty_raw_points'] = \
+        results['best_raw_time'].min() / results['best_raw_time'] * 100.0
+    results.loc[results['best_raw_time'] >= INVALID_TIME, 'doty_raw_points'] = 0.0
+    return results
+
+
+def split_rows(values, counts):
+    iterator = iter(values)
+    return [list(itertools.islice(iterator, count)) for count in counts]
 
-def has_valid_time(row):
-    times = row['times']
-    return len(times) > 0
-
-
-def add_run_stats(row, config):
-    num_runs = 0
-    num_dnfs = 0
-    num_reruns = 0
-    num_cones = 0
-    num_dirty_runs = 0
-    for run_col, pen_col in config.run_cols:
-        scratch_time = row[run_col]
-        if not scratch_time or math.isnan(scratch_time):
-            continue
 
-        num_runs = num_runs + 1
-
-        penalty = row[pen_col]
-        if penalty == 'DNF':
-            num_dnfs = num_dnfs + 1
-            num_dirty_runs = num_dirty_runs + 1
-        elif str(penalty).startswith('RERUN'):
-            num_reruns = num_reruns + 1
-        else:
-            try:
-                cone_count = int(penalty)
-                if cone_count > 0:
-                    num_cones = num_cones + cone_count
-                    num_dirty_runs = num_dirty_runs + 1
-            except ValueError:
-                # We see this if penalty was NaN.
-                pass
-
-    row['num_runs'] = num_runs
-    row['num_dnfs'] = num_dnfs
-    row['num_reruns'] = num_reruns
-    row['num_cones'] = num_cones
-    row['num_dirty_runs'] = num_dirty_runs
-    return row
-
-def add_class_names_and_indexes(row):
-    class_spec = row['Class']
-    class_name, class_index = get_class_name_and_index(class_spec)
-    row['class_name'] = class_name
-    row['class_index'] = class_index
-    return row
+# The JSON results still carry the scored times as lists of
+# (scratch, penalty, raw) tuples, for anything reading them directly.
+def add_scored_times(results, runs):
+    scored = runs.scored
+    times = zip(runs.scratch[scored].tolist(),
+                runs.penalties[scored].tolist(),
+                runs.raw[scored].tolist())
+    results['times'] = pd.Series(split_rows(times, runs.num_scored),
+                                 index=results.index, dtype=object)
+    return results
+
+
+def has_valid_time(runs):
+    return runs.num_scored > 0
+
+
+def add_run_stats(results, runs):
+    present = runs.present
+    codes = runs.codes
+    is_dnf = present & (codes == PEN_DNF)
+    has_cones = present & (codes == PEN_CONES)
+
+    results['num_runs'] = present.sum(axis=1)
+    results['num_dnfs'] = is_dnf.sum(axis=1)
+    results['num_reruns'] = (present & (codes == PEN_RERUN)).sum(axis=1)
+    results['num_cones'] = np.where(has_cones, runs.cones, 0).sum(axis=1)
+    results['num_dirty_runs'] = (is_dnf | has_cones).sum(axis=1)
+    return results
+
+
+def add_class_names_and_indexes(results):
+    class_codes, class_specs = pd.factorize(results['Class'],
+                                            use_na_sentinel=False)
+    parsed = [get_class_name_and_index(class_spec) for class_spec in class_specs]
+    class_names = np.array([name for name, _ in parsed], dtype=object)
+    class_indexes = np.array([index for _, index in parsed], dtype=object)
+    results['class_name'] = class_names[class_codes]
+    results['class_index'] = class_indexes[class_codes]
+    return results
 
 
 def get_class_name_and_index(class_spec):
@@ -264,133 +285,103 @@ def get_class_name_and_index(class_spec):
     raise ValueError('Could not determine class for "%s"' % str(class_spec))
 
 
-def add_pax_factors(row, config):
-    class_name = row['class_name']
-    pax_factor = config.pax_factors[class_name]
-    row['pax_factor'] = pax_factor
-    return row
+def add_pax_factors(results, config):
+    class_codes, class_names = pd.factorize(results['class_name'])
+    # Leave the dtype to NumPy, so that an event where every factor is
+    # an integer keeps writing them as integers.
+    pax_factors = np.array([config.pax_factors.factor(class_name)
+                            for class_name in class_names])
+    results['pax_factor'] = pax_factors[class_codes]
+    return results
 
 
-def add_pax_times(row):
-    pax_factor = row['pax_factor']
-    times = row['times']
+def add_pax_times(results, runs):
+    runs.pax_factor = results['pax_factor'].to_numpy()
+    pax_times = runs.scored_pax[runs.scored_valid].tolist()
+    results['pax_times'] = pd.Series(split_rows(pax_times, runs.num_scored),
+                                     index=results.index, dtype=object)
+    return results
 
-    pax_times = []
-    for _, _, raw_time in times:
-        pax_time = raw_time
-        if raw_time and raw_time < INVALID_TIME:
-            pax_time = raw_time * pax_factor
-
-        pax_times.append(pax_time)
-
-    row['pax_times'] = pax_times
-    return row
-
-
-def add_best_times(row, config):
-    pax_factor = row['pax_factor']
-    split = None
-    if row['class_index'] == 'P' and config.compute_split_pro_times:
-        split = config.num_morning_times
-        # print('times split')
-        # print(config.compute_split_pro_times)
-        # print(config.num_morning_times)
-    # else:
-    #     print('notimes split')
-    #     print(config.compute_split_pro_times)
-    #     print(config.num_morning_times)
-    all_times = row['times']
-    best_time_nums, best_times = identify_best_times(all_times, split)
-    row['best_time_nums'] = best_time_nums
-
-    final_time = INVALID_TIME
-    best_raw_time = INVALID_TIME
-    best_pax_time = INVALID_TIME
-    if best_times:
-        for time in best_times:
-            if time < best_raw_time:
-                best_raw_time = time
-                best_pax_time = time * pax_factor
-
-        # This is an indexed class, use PAX times.
-        if row['class_index']:
-            best_times = [time * pax_factor for time in best_times]
-
-        # If this is the pro class and we only have one time, leave
-        # the final time as INVALID.
-        if row['class_index'] == 'P' and config.compute_split_pro_times and len(best_times) < 2:
-            pass
-        else:
-            final_time = 0.0
-            for time in best_times:
-                final_time = final_time + time
-
-    if final_time > INVALID_TIME:
-        final_time = INVALID_TIME
-
-    row['final_time'] = final_time
-    row['best_raw_time'] = best_raw_time
-    row['best_pax_time'] = best_pax_time
-    return row
-
-
-# If we never reach split_time_count (e.g., because it is None), we'll
-# put the single best run in the first return value.
-def identify_best_times(times, split_time_count):
-    best_time_1_count = None
-    best_time_1 = None
-    best_time_2_count = None
-    best_time_2 = None
 
-    time_count = 0
-    best_time_count = None
-    best_time = None
-    for _, _, raw_time in times:
-        if raw_time:
-            time_count = time_count + 1
-            if not best_time_count or raw_time < best_time:
-                best_time_count = time_count
-                best_time = raw_time
-
-            # If we're done with the morning, record it and reset to
-            # find the next time.
-            if time_count == split_time_count:
-                best_time_1_count = best_time_count
-                best_time_1 = best_time
-                # Reset
-                best_time_count = None
-                best_time = None
-
-    # Now record the best time. If we never got to the split, just
-    # record this best time in the first spot and leave the second
-    # as None.
-    if not best_time_1_count:
-        best_time_1_count = best_time_count
-        best_time_1 = best_time
-    else:
-        best_time_2_count = best_time_count
-        best_time_2 = best_time
-
-    # Return the counts and times.
-    best_counts = []
-    best_times = []
-    if best_time_1_count:
-        best_counts.append(best_time_1_count)
-        best_times.append(best_time_1)
-        if best_time_2_count:
-            best_counts.append(best_time_2_count)
-            best_times.append(best_time_2)
-
-    return best_counts, best_times
-
-
-def write_results(results, output_filename):
+def add_best_times(results, runs, config):
+    scored_raw = runs.scored_raw
+    scored_valid = runs.scored_valid
+    num_scored = runs.num_scored
+    pax_factors = results['pax_factor'].to_numpy()
+    class_indexes = results['class_index'].to_numpy(dtype=object)
+    is_indexed = np.array([bool(class_index) for class_index in class_indexes],
+                          dtype=bool)
+    is_split = (class_indexes == 'P') & config.compute_split_pro_times
+
+    # Pro drivers who made it past the morning get a best time from
+    # each half. Everybody else gets a single best time. If we never
+    # reach the split, the single best time is in the first spot.
+    split = config.num_morning_times
+    reached_split = is_split & (num_scored >= split)
+    columns = np.arange(scored_raw.shape[1])
+    first_half = scored_valid & \
+      (columns < np.where(reached_split, split, scored_raw.shape[1])[:, None])
+    second_half = scored_valid & reached_split[:, None] & (columns >= split)
+
+    # argmin picks the earliest run on ties, just like a strict
+    # less-than scan would.
+    rows = np.arange(len(scored_raw))
+    best_1 = np.argmin(np.where(first_half, scored_raw, np.inf), axis=1)
+    best_2 = np.argmin(np.where(second_half, scored_raw, np.inf), axis=1)
+    has_best_2 = second_half.any(axis=1)
+    best_time_1 = scored_raw[rows, best_1]
+    best_time_2 = scored_raw[rows, best_2]
+    runs.best_runs = np.stack([best_1, np.where(has_best_2, best_2, -1)],
+                              axis=1).astype(np.int8)
+
+    results['best_time_nums'] = pd.Series(
+        [[num_1, num_2] if has_2 else [num_1]
+         for num_1, num_2, has_2 in zip((best_1 + 1).tolist(),
+                                        (best_2 + 1).tolist(),
+                                        has_best_2.tolist())],
+        index=results.index, dtype=object)
+
+    best_raw_time = np.where(best_time_1 < INVALID_TIME, best_time_1, INVALID_TIME)
+    best_raw_time = np.where(has_best_2 & (best_time_2 < best_raw_time),
+                             best_time_2, best_raw_time)
+    best_pax_time = np.where(best_raw_time < INVALID_TIME,
+                             best_raw_time * pax_factors, INVALID_TIME)
+
+    # This is an indexed class, use PAX times.
+    best_time_1 = np.where(is_indexed, best_time_1 * pax_factors, best_time_1)
+    best_time_2 = np.where(is_indexed, best_time_2 * pax_factors, best_time_2)
+
+    final_time = 0.0 + best_time_1
+    final_time = np.where(has_best_2, final_time + best_time_2, final_time)
+
+    # If this is the pro class and we only have one time, leave the
+    # final time as INVALID.
+    final_time = np.where(is_split & ~has_best_2, INVALID_TIME, final_time)
+    final_time = np.where(final_time > INVALID_TIME, INVALID_TIME, final_time)
+
+    results['final_time'] = final_time
+    results['best_raw_time'] = best_raw_time
+    results['best_pax_time'] = best_pax_time
+    return results
+
+
+def write_results(results, runs, output_filename, source_filenames):
     print('Will write results to:')
     print('  %s' % output_filename)
     json_string = results.to_json(orient='records', lines=True)
     with open(output_filename, 'wt') as out_file:
         out_file.write(json_string)
 
+    # And the runs, in a form the publishing scripts can load
+    # directly.
+    runs_filename = sidecar_filename(output_filename)
+    print('  %s' % runs_filename)
+    runs.save(runs_filename)
+
+    # And the results themselves, decoded, for the publishing scripts
+    # that read them over and over.
+    write_event_cache(output_filename, json_string, source_filenames)
+
 
 # ------------------------------------------------------------
 # Summary/printing functions
@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+#
+# pylint: disable=missing-docstring
+#
+# The drivers' history across seasons, kept in an SQLite database
+# (driver-history.sqlite) so that questions like "who drove their first
+# season this year?" are a query rather than a scrape of every season's
+# doty.html.
+#
+# The database has two tables:
+#
+#   entries    Every driver at every event: the season, the event (the
+#              name of its results file, e.g., 2026-mowog1), the
+#              driver, their class and their DOTY points. These are
+#              recorded by compute_results.py --history as it writes
+#              the event results.
+#   standings  Every driver in every set of season standings: the
+#              season, the standings (the name of the page, e.g., doty
+#              or doty_raw), the driver, their place, and how many
+#              events they drove and had scored. These are recorded by
+#              publish_doty.py --history as it writes the standings.
+#
+# Drivers are identified by their canonical ID (see driver_identity.py),
+# after dealiasing, and both tables are indexed by it. The season is the
+# directory the results are in, e.g., 2026/2026-mowog1.json is in 2026.
+# Results outside a season directory are not recorded.
+#
+# The database (at the top of the repository, wherever this is run
+# from) is a local build artifact and is not checked in. To fill it in,
+# or bring it up to date, load the seasons that have a commands.txt
+# (this records the JSON results and the DOTY standings, without
+# writing any pages) and import the published DOTY pages of the
+# seasons before that:
+#
+# ./driver_history.py -l 2023 -l 2024 -l 2025 -l 2026
+# ./driver_history.py -i 2018/doty.html -i 2019/doty.html -i 2020/doty.html -i 2021/doty.html -i 2022/doty.html
+#
+# Then ask it about a season or a driver:
+#
+# ./driver_history.py rookies 2026
+# ./driver_history.py improved 2026
+# ./driver_history.py driver 'Jeffrey Rye'
+#
+
+import argparse
+import contextlib
+import json
+import os
+import sqlite3
+import sys
+
+from driver_identity import ALIASES_FILENAME, dealias_name, driver_id
+from pax_factors import year_of
+
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DRIVER_HISTORY_FILENAME = os.path.join(REPO_DIR, 'driver-history.sqlite')
+
+DOTY_STANDINGS = 'doty'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS entries (
+    season INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    driver_id TEXT NOT NULL,
+    driver TEXT NOT NULL,
+    class_name TEXT,
+    doty_points REAL,
+    doty_raw_points REAL
+);
+CREATE INDEX IF NOT EXISTS entries_by_driver
+    ON entries (driver_id, season);
+CREATE INDEX IF NOT EXISTS entries_by_event
+    ON entries (season, event);
+CREATE INDEX IF NOT EXISTS entries_by_class
+    ON entries (season, class_name);
+
+CREATE TABLE IF NOT EXISTS standings (
+    season INTEGER NOT NULL,
+    standings TEXT NOT NULL,
+    driver_id TEXT NOT NULL,
+    driver TEXT NOT NULL,
+    place INTEGER NOT NULL,
+    num_events INTEGER NOT NULL,
+    num_kept_events INTEGER NOT NULL,
+    total_points REAL,
+    PRIMARY KEY (season, standings, driver_id)
+);
+CREATE INDEX IF NOT EXISTS standings_by_driver
+    ON standings (driver_id, standings, season);
+CREATE INDEX IF NOT EXISTS standings_by_place
+    ON standings (season, standings, place);
+'''
+
+# A driver had a complete season if they had as many events scored as
+# anyone.
+FULL_SEASONS = '''
+full_seasons AS (
+    SELECT season, standings, MAX(num_kept_events) AS num_kept_events
+    FROM standings
+    GROUP BY season, standings
+)
+'''
+
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('query',
+                        nargs='?',
+                        choices=['rookies', 'improved', 'driver'],
+                        help='What to report: the drivers in their first ' +
+                        'season, the drivers who moved up the most since ' +
+                        'the season before, or one driver\'s seasons.')
+    parser.add_argument('subject',
+                        nargs='?',
+                        help='The season (for rookies and improved) or ' +
+                        'the driver.')
+    parser.add_argument('-d',
+                        dest='db_filename',
+                        default=DRIVER_HISTORY_FILENAME,
+                        help='The driver history database.')
+    parser.add_argument('-s',
+                        dest='standings',
+                        default=DOTY_STANDINGS,
+                        help='The standings to report on.')
+    parser.add_argument('-l',
+                        dest='season_dirs',
+                        action='append',
+                        default=[],
+                        help='Record the results and DOTY standings of a ' +
+                        'season, from its commands.txt. May be given more ' +
+                        'than once.')
+    parser.add_argument('-i',
+                        dest='doty_filenames',
+                        action='append',
+                        default=[],
+                        help='Record the standings in a published DOTY ' +
+                        'page. May be given more than once.')
+    config = parser.parse_args(args)
+    if config.query and not config.subject:
+        parser.error('%s needs a %s' %
+                     (config.query,
+                      'driver' if config.query == 'driver' else 'season'))
+
+    config.aliases = load_aliases()
+
+    for season_dir in config.season_dirs:
+        load_season(season_dir, config.db_filename)
+    for doty_filename in config.doty_filenames:
+        import_doty_page(doty_filename, config.aliases, config.db_filename)
+
+    if config.query == 'rookies':
+        print_rookies(config)
+    elif config.query == 'improved':
+        print_improved(config)
+    elif config.query == 'driver':
+        print_driver(config)
+
+
+# ------------------------------------------------------------
+# The database
+
+def connect(db_filename=DRIVER_HISTORY_FILENAME):
+    # Other scripts may be recording at the same time.
+    connection = sqlite3.connect(db_filename, timeout=30.0)
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def event_name(results_filename):
+    return os.path.splitext(os.path.basename(results_filename))[0]
+
+
+def standings_name(output_filename):
+    return os.path.splitext(os.path.basename(output_filename))[0]
+
+
+def driver_name(record, aliases):
+    names = [record.get(col) for col in ('FirstName', 'LastName')]
+    name = ' '.join(name if isinstance(name, str) else '' for name in names)
+    return dealias_name(name.strip(), aliases)
+
+
+def load_aliases():
+    with open(os.path.join(REPO_DIR, ALIASES_FILENAME), 'rt',
+              encoding='utf-8') as json_data:
+        return json.load(json_data)
+
+
+# Records the drivers in an event's results (a list of dicts, as
+# written by compute_results.py), replacing any recorded before.
+def record_event(results_filename, records, aliases=None,
+                 db_filename=DRIVER_HISTORY_FILENAME):
+    season = year_of(results_filename)
+    if season is None:
+        return
+    if aliases is None:
+        try:
+            aliases = load_aliases()
+        except (OSError, ValueError) as e:
+            print('WARNING: Could not record driver history, no aliases: %s'
+                  % e)
+            return
+    event = event_name(results_filename)
+    rows = []
+    for record in records:
+        name = driver_name(record, aliases)
+        if not name:
+            continue
+        rows.append((season, event, driver_id(name), name,
+                     record.get('class_name'), record.get('doty_points'),
+                     record.get('doty_raw_points')))
+    replace_rows(db_filename,
+                 'DELETE FROM entries WHERE season = ? AND event = ?',
+                 (season, event),
+                 'INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+
+
+# Records a season's standings, replacing any recorded before.
+# place_rows is [(place, driver, num_events, num_kept_events,
+# total_points)]. A driver listed twice keeps their best place.
+def record_standings(output_filename, place_rows,
+                     db_filename=DRIVER_HISTORY_FILENAME):
+    season = year_of(output_filename)
+    if season is None:
+        return
+    standings = standings_name(output_filename)
+    rows = [(season, standings, driver_id(driver), driver, int(place),
+             int(num_events), int(num_kept_events), total_points)
+            for place, driver, num_events, num_kept_events, total_points
+            in sorted(place_rows)]
+    replace_rows(db_filename,
+                 'DELETE FROM standings WHERE season = ? AND standings = ?',
+                 (season, standings),
+                 'INSERT OR IGNORE INTO standings ' +
+                 'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+
+# Deletes the old rows and inserts the new ones in one transaction. The
+# history is only a record, so if it cannot be written we carry on
+# without it.
+def replace_rows(db_filename, delete_sql, delete_args, insert_sql, rows):
+    try:
+        with contextlib.closing(connect(db_filename)) as connection:
+            with connection:
+                connection.execute(delete_sql, delete_args)
+                connection.executemany(insert_sql, rows)
+    except sqlite3.Error as e:
+        print('WARNING: Could not record driver history in %s: %s' %
+              (db_filename, e))
+
+
+# ------------------------------------------------------------
+# Filling in past seasons
+
+def load_season(season_dir, db_filename=DRIVER_HISTORY_FILENAME):
+    # These import most of the scripts, so only when they are needed.
+    # pylint: disable=import-outside-toplevel
+    import publish_doty
+    from build_season import load_steps, season_filenames
+    from event_cache import read_records
+
+    commands_filename, _ = season_filenames(season_dir)
+    for step in load_steps(commands_filename):
+        if step.script not in ('publish_doty.py', 'publish_doty_raw.py'):
+            continue
+        args = step.args
+        if step.script == 'publish_doty_raw.py':
+            args = ['-p', 'doty_raw_points'] + args
+        config = publish_doty.get_config(args)
+        for results_filename in config.results_filenames:
+            print('Recording %s' % results_filename)
+            record_event(results_filename, read_records(results_filename),
+                         config.aliases, db_filename)
+        standings = publish_doty.get_standings(config)
+        results_by_col = publish_doty.load_results(
+            config, [points_col for points_col, _, _ in standings])
+        publish_doty.record_history(standings, results_by_col, db_filename)
+
+
+# Records the standings in a published DOTY page, for the seasons we no
+# longer have the results for.
+def import_doty_page(doty_filename, aliases,
+                     db_filename=DRIVER_HISTORY_FILENAME):
+    # pylint: disable=import-outside-toplevel
+    from bs4 import BeautifulSoup
+
+    print('Importing %s' % doty_filename)
+    with open(doty_filename, 'rt', encoding='utf-8') as in_file:
+        soup = BeautifulSoup(in_file.read(), 'html.parser')
+    place_rows = []
+    for row in soup.find_all('tr'):
+        cells = [cell.get_text().strip() for cell in row.find_all('td')]
+        if len(cells) < 5:
+            continue
+        place_rows.append((len(place_rows) + 1,
+                           dealias_name(cells[1], aliases),
+                           int(cells[2]), int(cells[3]),
+                           parse_score(cells[4])))
+    record_standings(doty_filename, place_rows, db_filename)
+
+
+def parse_score(text):
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+# ------------------------------------------------------------
+# Queries
+
+# Returns [(driver, place, complete season)] for the drivers in their
+# first season, by place.
+def find_rookies(connection, season, standings=DOTY_STANDINGS):
+    return connection.execute('WITH ' + FULL_SEASONS + '''
+        SELECT this.driver, this.place,
+               this.num_kept_events >= full_seasons.num_kept_events
+        FROM standings AS this
+        JOIN full_seasons USING (season, standings)
+        WHERE this.season = ? AND this.standings = ?
+          AND NOT EXISTS (SELECT 1 FROM standings AS before
+                          WHERE before.driver_id = this.driver_id
+                            AND before.standings = this.standings
+                            AND before.season < this.season)
+          AND NOT EXISTS (SELECT 1 FROM entries AS before
+                          WHERE before.driver_id = this.driver_id
+                            AND before.season < this.season)
+        ORDER BY this.place''', (season, standings)).fetchall()
+
+
+def previous_season(connection, season, standings=DOTY_STANDINGS):
+    return connection.execute(
+        'SELECT MAX(season) FROM standings WHERE standings = ? AND season < ?',
+        (standings, season)).fetchone()[0]
+
+
+# Returns [(driver, place, previous place, places gained)] for the
+# drivers with a complete season this season and the one before, most
+# improved first.
+def find_improved(connection, season, standings=DOTY_STANDINGS):
+    before = previous_season(connection, season, standings)
+    if before is None:
+        return []
+    return connection.execute('WITH ' + FULL_SEASONS + '''
+        SELECT this.driver, this.place, before.place,
+               before.place - this.place AS gained
+        FROM standings AS this
+        JOIN standings AS before
+          ON before.driver_id = this.driver_id
+         AND before.standings = this.standings
+         AND before.season = ?
+        JOIN full_seasons AS this_full
+          ON this_full.season = this.season
+         AND this_full.standings = this.standings
+        JOIN full_seasons AS before_full
+          ON before_full.season = before.season
+         AND before_full.standings = before.standings
+        WHERE this.season = ? AND this.standings = ?
+          AND this.num_kept_events >= this_full.num_kept_events
+          AND before.num_kept_events >= before_full.num_kept_events
+        ORDER BY gained DESC, this.place''',
+                              (before, season, standings)).fetchall()
+
+
+# Returns [(season, place, events, classes)] for each season the driver
+# drove.
+def find_driver_seasons(connection, driver, aliases,
+                        standings=DOTY_STANDINGS):
+    return connection.execute('''
+        WITH seasons AS (
+            SELECT season FROM standings WHERE driver_id = :id
+            UNION SELECT season FROM entries WHERE driver_id = :id
+        )
+        SELECT seasons.season, standings.place,
+               COALESCE(standings.num_events,
+                        (SELECT COUNT(DISTINCT event) FROM entries
+                         WHERE driver_id = :id
+                           AND season = seasons.season)),
+               (SELECT GROUP_CONCAT(class_name, ', ') FROM (
+                    SELECT DISTINCT class_name FROM entries
+                    WHERE driver_id = :id AND season = seasons.season
+                    ORDER BY class_name))
+        FROM seasons
+        LEFT JOIN standings
+          ON standings.season = seasons.season
+         AND standings.standings = :standings
+         AND standings.driver_id = :id
+        ORDER BY seasons.season''',
+                              {'id': driver_id(dealias_name(driver, aliases)),
+                               'standings': standings}).fetchall()
+
+
+def print_rookies(config):
+    with contextlib.closing(connect(config.db_filename)) as connection:
+        rookies = find_rookies(connection, int(config.subject),
+                               config.standings)
+    print('New drivers: (%d)' % len(rookies))
+    print('Name - Place -- Complete Season')
+    for driver, place, complete in rookies:
+        print('  %s - %d -- %s' % (driver, place, bool(complete)))
+
+
+def print_improved(config):
+    with contextlib.closing(connect(config.db_filename)) as connection:
+        improved = find_improved(connection, int(config.subject),
+                                 config.standings)
+    print('DOTY place changes: (%d)' % len(improved))
+    print('Name - Place - Previous Place -- Places Gained')
+    for driver, place, previous_place, gained in improved:
+        print('  %s - %d - %d -- %d' % (driver, place, previous_place, gained))
+
+
+def print_driver(config):
+    with contextlib.closing(connect(config.db_filename)) as connection:
+        seasons = find_driver_seasons(connection, config.subject,
+                                      config.aliases, config.standings)
+    print('%s: (%d seasons)' % (config.subject, len(seasons)))
+    for season, place, num_events, classes in seasons:
+        print('  %d: %s, %d events, %s' %
+              (season, 'place %d' % place if place else 'unplaced',
+               num_events or 0, classes or 'no classes recorded'))
+
+
+# ------------------------------------------------------------
+# This is the magic that runs the main function when this is invoked
+# as a script.
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
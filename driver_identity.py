@@ -0,0 +1,340 @@
+#
+# pylint: disable=missing-docstring
+#
+# Who the drivers are. The same driver turns up under different names:
+# "Jeff Rye" one event and "Jeffrey Rye" the next, "rye, jeff" in a
+# spreadsheet, or just a typo. aliases.json maps the names we know about
+# to one canonical name; this module helps with the rest.
+#
+# DriverIndex is every driver we have seen: the canonical names in
+# aliases.json and every name in the results of every season. Each
+# driver has a canonical ID (their canonical name as a key, e.g.,
+# jeffrey-rye), the names they have been seen under, and the seasons
+# they drove. It is built from aliases.json and the season directories,
+# and saved to .driver-index.json. That is a local build artifact (it
+# is not checked in), and is rebuilt whenever any of the files it was
+# built from change.
+#
+# To find names that are probably the same driver, without comparing
+# every name with every other, each name is broken into trigrams of its
+# words ("jeff" is " je", "jef", "eff", "ff "). Only names that share
+# enough trigrams are compared, and those are scored from 0 to 1 by
+# name_similarity().
+#
+# SeasonNames is the names seen so far in a season, which later events
+# are matched against (case-insensitively) as they are read.
+#
+
+import difflib
+import glob
+import json
+import os
+import re
+
+from event_cache import read_records
+from pax_factors import PAX_FACTORS_FILENAME
+from template_cache import file_stamps
+
+
+FORMAT_VERSION = 1
+
+ALIASES_FILENAME = 'aliases.json'
+DRIVER_INDEX_FILENAME = '.driver-index.json'
+
+# The event results of every season.
+HISTORY_GLOB = '[0-9][0-9][0-9][0-9]/*.json'
+
+# Names sharing fewer trigrams than this (as a Dice coefficient) are
+# not compared at all.
+MIN_GRAM_OVERLAP = 0.4
+
+# Names scoring at least this are reported as possible duplicates.
+DUPLICATE_THRESHOLD = 0.85
+
+NON_NAME_RE = re.compile(r"[^a-z0-9' -]+")
+SPACES_RE = re.compile(r'\s+')
+
+
+# ------------------------------------------------------------
+# Names
+
+def dealias_name(name, aliases):
+    lower_name = name.lower()
+    if lower_name in aliases:
+        return aliases[lower_name]
+    return name
+
+
+# Returns the name in a form for comparing: lower case, "first last"
+# rather than "last, first", without punctuation or extra spaces.
+def name_key(name):
+    parts = name.split(',')
+    if len(parts) == 2:
+        name = parts[1] + ' ' + parts[0]
+    name = NON_NAME_RE.sub(' ', name.lower().replace('.', ''))
+    return SPACES_RE.sub(' ', name).strip()
+
+
+def driver_id(name):
+    return name_key(name).replace(' ', '-')
+
+
+def name_grams(key):
+    grams = set()
+    for word in key.split():
+        padded = ' %s ' % word
+        for num in range(len(padded) - 2):
+            grams.add(padded[num:num + 3])
+    return grams
+
+
+# Scores how likely two names are to be the same driver, from 0 to 1.
+def name_similarity(name1, name2):
+    key1 = name_key(name1)
+    key2 = name_key(name2)
+    if key1 == key2:
+        return 1.0
+    if not key1 or not key2:
+        return 0.0
+    score = difflib.SequenceMatcher(None, key1, key2).ratio()
+    words1 = key1.split()
+    words2 = key2.split()
+    if sorted(words1) == sorted(words2):
+        # First and last names swapped.
+        score = max(score, 0.95)
+    elif len(words1) > 1 and len(words2) > 1 and words1[-1] == words2[-1] \
+         and (words1[0].startswith(words2[0]) or
+              words2[0].startswith(words1[0])):
+        # The same last name, and one first name is short for the
+        # other, e.g., Jeff and Jeffrey.
+        score = max(score, 0.9)
+    return score
+
+
+# ------------------------------------------------------------
+# Candidate lookup
+
+class NameGrams:
+
+    def __init__(self):
+        # {name key: trigrams}
+        self.grams = {}
+        # {trigram: set(name keys)}
+        self.postings = {}
+
+    def add(self, key):
+        if key in self.grams:
+            return
+        grams = name_grams(key)
+        self.grams[key] = grams
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(key)
+
+    # Returns the keys sharing enough trigrams with key to be worth
+    # comparing.
+    def candidates(self, key, min_overlap=MIN_GRAM_OVERLAP):
+        grams = self.grams.get(key) or name_grams(key)
+        counts = {}
+        for gram in grams:
+            for other_key in self.postings.get(gram, ()):
+                counts[other_key] = counts.get(other_key, 0) + 1
+        return [other_key for other_key, count in counts.items()
+                if other_key != key and
+                2.0 * count / (len(grams) + len(self.grams[other_key])) >=
+                min_overlap]
+
+
+# Returns [(score, name1, name2)] for the names that are probably the
+# same driver, best first.
+def find_similar_names(names, threshold=DUPLICATE_THRESHOLD):
+    by_key = {}
+    name_grams_index = NameGrams()
+    for name in names:
+        key = name_key(name)
+        by_key.setdefault(key, []).append(name)
+        name_grams_index.add(key)
+
+    pairs = []
+    for key, key_names in by_key.items():
+        # Names that only differ in case or punctuation.
+        for num, name1 in enumerate(key_names):
+            for name2 in key_names[num + 1:]:
+                pairs.append((1.0, name1, name2))
+        for other_key in name_grams_index.candidates(key):
+            if other_key < key:
+                continue
+            score = name_similarity(key, other_key)
+            if score >= threshold:
+                for name1 in key_names:
+                    for name2 in by_key[other_key]:
+                        pairs.append((score, name1, name2))
+    pairs.sort(key=lambda pair: (-pair[0], pair[1], pair[2]))
+    return pairs
+
+
+# ------------------------------------------------------------
+# The driver index
+
+class DriverIndex:
+
+    def __init__(self, aliases, drivers=None):
+        self.aliases = aliases
+        # {driver ID: {'name': ..., 'names': [...], 'seasons': [...]}}
+        self.drivers = drivers or {}
+        # {lower case name: driver ID}
+        self.ids = {}
+        self.name_grams = NameGrams()
+        for canonical_id, driver in self.drivers.items():
+            for name in [driver['name']] + driver['names']:
+                self.ids[name.lower()] = canonical_id
+            self.name_grams.add(name_key(driver['name']))
+
+    def add_name(self, name, season=None):
+        name = dealias_name(name, self.aliases)
+        canonical_id = self.ids.get(name.lower()) or driver_id(name)
+        if not canonical_id:
+            return None
+        driver = self.drivers.get(canonical_id)
+        if driver is None:
+            driver = {'name': name, 'names': [], 'seasons': []}
+            self.drivers[canonical_id] = driver
+            self.name_grams.add(name_key(name))
+        if name != driver['name'] and name not in driver['names']:
+            driver['names'].append(name)
+        if season and season not in driver['seasons']:
+            driver['seasons'].append(season)
+            driver['seasons'].sort()
+        self.ids[name.lower()] = canonical_id
+        return canonical_id
+
+    # Returns the canonical ID for a name, or None if we have never
+    # seen it.
+    def canonical_id(self, name):
+        for lookup_name in (name, name_key(name)):
+            canonical_id = \
+              self.ids.get(dealias_name(lookup_name, self.aliases).lower())
+            if canonical_id:
+                return canonical_id
+        return None
+
+    def canonical_name(self, canonical_id):
+        return self.drivers[canonical_id]['name']
+
+    # Returns [(score, driver ID)] for the drivers whose names are close
+    # to this one, best first.
+    def similar(self, name, threshold=DUPLICATE_THRESHOLD):
+        key = name_key(dealias_name(name, self.aliases))
+        matches = []
+        for other_key in self.name_grams.candidates(key):
+            score = name_similarity(key, other_key)
+            if score >= threshold:
+                matches.append((score, driver_id(other_key)))
+        matches.sort(key=lambda match: (-match[0], match[1]))
+        return [(score, canonical_id) for score, canonical_id in matches
+                if canonical_id in self.drivers]
+
+
+# Season directories also hold the series configs, the PAX factors and
+# the .meta.json sidecars fin_to_base_html.py reads.
+def is_results_filename(filename):
+    return not filename.endswith(('-conf.json', '.meta.json')) and \
+      os.path.basename(filename) != PAX_FACTORS_FILENAME
+
+
+def history_filenames():
+    return sorted(filename for filename in glob.glob(HISTORY_GLOB)
+                  if is_results_filename(filename))
+
+
+def build_driver_index(aliases, results_filenames):
+    index = DriverIndex(aliases)
+    for canonical_name in sorted(set(aliases.values())):
+        index.add_name(canonical_name)
+    for results_filename in results_filenames:
+        season = os.path.dirname(results_filename)
+        try:
+            records = read_records(results_filename)
+        except (OSError, ValueError) as e:
+            print('WARNING: Could not read drivers from %s: %s' %
+                  (results_filename, e))
+            continue
+        for record in records:
+            name = '%s %s' % (record.get('FirstName') or '',
+                              record.get('LastName') or '')
+            name = name.strip()
+            if name:
+                index.add_name(name, season)
+    return index
+
+
+# Returns the driver index for aliases.json and every season, from
+# .driver-index.json if that is up to date.
+def load_driver_index():
+    filenames = [ALIASES_FILENAME] + history_filenames()
+    stamps = [list(stamp) for stamp in file_stamps(filenames)]
+    try:
+        with open(DRIVER_INDEX_FILENAME, 'rt', encoding='utf-8') as json_data:
+            saved = json.load(json_data)
+        if saved['version'] == FORMAT_VERSION and saved['stamps'] == stamps:
+            with open(ALIASES_FILENAME, 'rt', encoding='utf-8') as json_data:
+                aliases = json.load(json_data)
+            return DriverIndex(aliases, saved['drivers'])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    with open(ALIASES_FILENAME, 'rt', encoding='utf-8') as json_data:
+        aliases = json.load(json_data)
+    index = build_driver_index(aliases, filenames[1:])
+    try:
+        temp_filename = '%s.%d.tmp' % (DRIVER_INDEX_FILENAME, os.getpid())
+        with open(temp_filename, 'wt', encoding='utf-8') as out_file:
+            json.dump({'version': FORMAT_VERSION, 'stamps': stamps,
+                       'drivers': index.drivers}, out_file)
+        os.replace(temp_filename, DRIVER_INDEX_FILENAME)
+    except OSError as e:
+        # The saved index is only a shortcut.
+        print('WARNING: Could not write %s: %s' % (DRIVER_INDEX_FILENAME, e))
+    return index
+
+
+# ------------------------------------------------------------
+# The names in a season
+
+class SeasonNames:
+
+    # Where two names differ only in case, the one that sorts last
+    # wins, except after the first event, where it is the last one in
+    # the results. This is what publish_series.py got when it read the
+    # names off the season table so far.
+    def __init__(self):
+        self.num_events = 0
+        # {lower case name: name}
+        self.sorted_names = {}
+        self.first_event_names = {}
+
+    def add_event(self, names):
+        for name in names:
+            lower_name = name.lower()
+            if self.num_events == 0:
+                self.first_event_names[lower_name] = name
+            if name > self.sorted_names.get(lower_name, ''):
+                self.sorted_names[lower_name] = name
+        self.num_events += 1
+
+    def known_names(self):
+        if self.num_events == 1:
+            return self.first_event_names
+        return self.sorted_names
+
+    def lookup(self, orig_name):
+        if isinstance(orig_name, str):
+            # If this is "last, first", make it "first last"
+            parts = orig_name.split(',')
+            if len(parts) == 2:
+                orig_name = parts[1].strip() + ' ' + parts[0].strip()
+
+            known_names = self.known_names()
+            lower_name = orig_name.lower()
+            if lower_name in known_names:
+                return known_names[lower_name]
+        return orig_name
@@ -0,0 +1,125 @@
+#
+# pylint: disable=missing-docstring
+#
+# A binary sidecar for the JSON results written by compute_results.py.
+# Every publishing script re-reads the JSON results (often many of
+# them, for season standings), and decoding the JSON is the slow part.
+# So, alongside 2026/mowog1.json, compute_results.py also writes
+# 2026/mowog1.cache.pkl holding exactly what the publishing scripts
+# would have decoded from the JSON.
+#
+# The file is a stream of three pickles:
+#  1. A header dict with the format version, the SHA-256 of the JSON
+#     results, and the SHA-256 of each source file (the event CSV and
+#     pax-factors.json) keyed by path.
+#  2. The results DataFrame, as pd.read_json(orient='records',
+#     lines=True) would return it.
+#  3. The results as a list of dicts, as json.loads would return them
+#     line by line.
+#
+# The cache is only used when it is fresh: the JSON must be the one it
+# was made from, and the source files must not have changed since. In
+# any other case we fall back to the JSON. These are local build
+# artifacts (they are pickles, so only load ones you made yourself) and
+# are not checked in.
+#
+
+import hashlib
+import io
+import json
+import os
+import pickle
+
+import pandas as pd
+
+
+FORMAT_VERSION = 1
+
+
+def cache_filename(results_filename):
+    base, _ = os.path.splitext(results_filename)
+    return base + '.cache.pkl'
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(filename):
+    with open(filename, 'rb') as in_file:
+        return hash_bytes(in_file.read())
+
+
+def write_event_cache(results_filename, json_string, source_filenames):
+    header = {
+        'format_version': FORMAT_VERSION,
+        'json_hash': hash_bytes(json_string.encode('utf-8')),
+        'sources': dict((filename, hash_file(filename))
+                        for filename in source_filenames),
+    }
+    results = pd.read_json(io.StringIO(json_string),
+                           orient='records', lines=True)
+    records = [json.loads(line) for line in json_string.splitlines() if line]
+
+    filename = cache_filename(results_filename)
+    print('  %s' % filename)
+    with open(filename, 'wb') as out_file:
+        for obj in (header, results, records):
+            pickle.dump(obj, out_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def read_results(results_filename):
+    cached = read_cache(results_filename, 2)
+    if cached:
+        return cached[1]
+    return pd.read_json(results_filename, orient='records', lines=True)
+
+
+def read_records(results_filename):
+    cached = read_cache(results_filename, 3)
+    if cached:
+        return cached[2]
+    records = []
+    with open(results_filename) as in_file:
+        for line in in_file:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    return records
+
+
+# Returns the first num_objs objects from the cache, or None if there
+# is no fresh cache for these results.
+def read_cache(results_filename, num_objs):
+    filename = cache_filename(results_filename)
+    if not os.path.exists(filename):
+        return None
+
+    try:
+        with open(filename, 'rb') as in_file:
+            header = pickle.load(in_file)
+            if not is_fresh(header, results_filename):
+                return None
+            objs = [header]
+            while len(objs) < num_objs:
+                objs.append(pickle.load(in_file))
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError,
+            ImportError, ValueError):
+        # Cut short, or written by another version of pandas: use the JSON.
+        return None
+    return objs
+
+
+def is_fresh(header, results_filename):
+    if header.get('format_version') != FORMAT_VERSION:
+        return False
+    if header['json_hash'] != hash_file(results_filename):
+        return False
+    for source_filename, source_hash in header['sources'].items():
+        if os.path.exists(source_filename) and \
+           hash_file(source_filename) != source_hash:
+            print('WARNING: %s changed since %s was computed, ' %
+                  (source_filename, results_filename) +
+                  'you may want to re-run compute_results.py.')
+            return False
+    return True
@@ -7,19 +7,39 @@
 # "-fin.html" with ".json" in the input filename.  You can also supply
 # it explicitly with --json.
 #
+# The event name, date and counts come from the .meta.json sidecar that
+# publish_event.py writes next to the fin.html (2026-mowog1-fin.html
+# gets 2026-mowog1-fin.meta.json).  Only if that is missing, or the
+# fin.html has changed since it was written, is the fin.html parsed
+# for them.
+#
+# With --season, every *-fin.html in a season directory is converted
+# in one go, to the same name without "-fin".  The CSS is only looked
+# up once per process.
+#
+# With --simple, the simplified page (the overall results only, sorted
+# by driver, as transform_results.py makes) is written too, to the
+# output name with "-simple" (2026/2026-mowog1-simple.html).  It comes
+# from the same results as the base HTML, so there is no HTML to parse.
+#
 # Usage:
 #   poetry run ./fin_to_base_html.py 2026/2026-mowog1-fin.html 2026/2026-mowog1.html
 #   poetry run ./fin_to_base_html.py --json 2026/2026-mowog1.json \
 #       2026/2026-mowog1-fin.html 2026/2026-mowog1-out.html
+#   poetry run ./fin_to_base_html.py --season 2026
+#   poetry run ./fin_to_base_html.py --simple --season 2026
 
 import argparse
+import functools
 import glob
 import json
 import re
 import sys
 from pathlib import Path
 
-from bs4 import BeautifulSoup
+from event_cache import read_records
+from run_matrix import PEN_RERUN, RunMatrix, load_run_matrix
+from template_cache import file_stamps
 
 
 INVALID_TIME = 9999.999
@@ -31,87 +51,185 @@ INVALID_TIME = 9999.999
 def main(args=None):
     parser = argparse.ArgumentParser(
         description='Convert a MAC fin.html to AXti.me-style base HTML.')
-    parser.add_argument('fin_html',
+    parser.add_argument('fin_html', nargs='?',
                         help='Input fin.html file (publish_event.py output).')
-    parser.add_argument('output_html',
+    parser.add_argument('output_html', nargs='?',
                         help='Output .html file to write.')
     parser.add_argument('--json', dest='json_path',
                         help='JSONL results file. Auto-detected if omitted.')
+    parser.add_argument('--simple', action='store_true',
+                        help='Also write the simplified page, alongside '
+                             'the output with "-simple" added.')
+    parser.add_argument('--season', dest='season_dir',
+                        help='Convert every *-fin.html in this season '
+                             'directory instead.')
     config = parser.parse_args(args)
 
+    if config.season_dir:
+        if config.fin_html or config.json_path:
+            parser.error('--season converts a whole season; '
+                         'give no files with it')
+        convert_season(config.season_dir, config.simple)
+        return
+    if not config.output_html:
+        parser.error('give a fin.html and the output .html, or --season')
+
     # Locate the JSONL file.
-    if config.json_path:
-        json_path = Path(config.json_path)
-    else:
-        fin_path = Path(config.fin_html)
-        json_path = fin_path.parent / (fin_path.stem.replace('-fin', '') + '.json')
+    json_path = find_json_path(config.fin_html, config.json_path)
     if not json_path.exists():
         sys.exit(f'ERROR: JSONL file not found: {json_path}\n'
                  f'Provide it explicitly with --json.')
+    convert_file(config.fin_html, config.output_html, json_path, config.simple)
+
 
+def find_json_path(fin_html, json_path=None):
+    if json_path:
+        return Path(json_path)
+    fin_path = Path(fin_html)
+    return fin_path.parent / (fin_path.stem.replace('-fin', '') + '.json')
+
+
+def simple_filename(output_html):
+    """2026/2026-mowog1.html -> 2026/2026-mowog1-simple.html"""
+    output_path = Path(output_html)
+    return str(output_path.with_name(f'{output_path.stem}-simple.html'))
+
+
+def convert_file(fin_html, output_html, json_path, simple=False):
     # Load driver records.
-    results = []
-    with open(json_path) as fh:
-        for line in fh:
-            line = line.strip()
-            if line:
-                results.append(json.loads(line))
+    results = read_records(json_path)
     print(f'Loaded {len(results)} results from {json_path}')
+    run_matrix = load_run_matrix(json_path, results)
+    times_htmls = run_times_htmls(results, run_matrix)
 
-    # Parse event metadata from fin.html.
-    with open(config.fin_html) as fh:
-        soup = BeautifulSoup(fh.read(), 'html.parser')
-    metadata = extract_metadata(soup)
+    # Event metadata, from the sidecar or else the fin.html.
+    metadata = read_metadata(fin_html)
     print(f'Event: {metadata.get("event_name")}  '
           f'Date: {metadata.get("date")}')
 
     # Produce the output HTML.
-    html = generate_base_html(results, metadata)
-    with open(config.output_html, 'w') as fh:
-        fh.write(html)
-    print(f'Written to {config.output_html}')
+    with open(output_html, 'w') as fh:
+        fh.writelines(iter_base_html(results, metadata, times_htmls=times_htmls))
+    print(f'Written to {output_html}')
+
+    if simple:
+        simple_html = simple_filename(output_html)
+        with open(simple_html, 'w') as fh:
+            fh.writelines(iter_simple_html(results, metadata,
+                                           times_htmls=times_htmls))
+        print(f'Written to {simple_html}')
+
+
+def convert_season(season_dir, simple=False):
+    """Convert every *-fin.html in season_dir that has its JSON results."""
+    fin_htmls = sorted(glob.glob(str(Path(glob.escape(season_dir)) / '*-fin.html')))
+    if not fin_htmls:
+        sys.exit(f'ERROR: No *-fin.html files in {season_dir}')
+    for fin_html in fin_htmls:
+        json_path = find_json_path(fin_html)
+        if not json_path.exists():
+            print(f'Skipping {fin_html}: no {json_path}')
+            continue
+        output_html = fin_html[:-len('-fin.html')] + '.html'
+        convert_file(fin_html, output_html, json_path, simple)
 
 
 # ---------------------------------------------------------------------------
-# Metadata extraction from fin.html
+# Metadata: the sidecar written by publish_event.py, or else the fin.html
 
-def extract_metadata(soup):
-    meta = {}
+def metadata_filename(fin_html):
+    """2026/2026-mowog1-fin.html -> 2026/2026-mowog1-fin.meta.json"""
+    return str(Path(fin_html).with_suffix('.meta.json'))
 
-    title_el = soup.find('title')
-    if title_el:
-        meta['title'] = title_el.get_text()
 
+def fin_stamp(fin_html):
+    """The modification time and size of the fin.html."""
+    _, mtime_ns, size = file_stamps([fin_html])[0]
+    return [mtime_ns, size]
+
+
+def write_metadata(fin_html, metadata):
+    """
+    Write the sidecar for a fin.html that has just been written, stamped
+    with its modification time and size.
+    """
+    sidecar = {
+        'stamp': fin_stamp(fin_html),
+        'metadata': metadata,
+    }
+    with open(metadata_filename(fin_html), 'w') as fh:
+        json.dump(sidecar, fh, indent=2)
+
+
+def read_metadata(fin_html):
+    """
+    Return the event metadata from the sidecar, if it is there and the
+    fin.html has not changed since, otherwise parse the fin.html.
+    """
+    try:
+        with open(metadata_filename(fin_html)) as fh:
+            sidecar = json.load(fh)
+        if sidecar['stamp'] == fin_stamp(fin_html):
+            return sidecar['metadata']
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    from bs4 import BeautifulSoup   # only needed without a sidecar
+    with open(fin_html) as fh:
+        soup = BeautifulSoup(fh.read(), 'html.parser')
+    return extract_metadata(soup)
+
+
+def extract_metadata(soup):
+    title_el = soup.find('title')
     event_name_el = soup.find('div', class_='event-name')
-    if event_name_el:
-        meta['event_name'] = (
-            event_name_el.get_text(strip=True).replace(' Results', '').strip()
-        )
 
-    # Scan every leaf <div> inside event-details.
+    # Every leaf <div> inside event-details.
+    detail_texts = []
     event_details = soup.find('div', class_='event-details')
-    date_found = False
     if event_details:
         for div in event_details.find_all('div'):
             if div.find('div'):          # skip non-leaf containers
                 continue
-            text = div.get_text(strip=True)
-            if not text:
-                continue
-            lower = text.lower()
-            if 'participants:' in lower:
-                m = re.search(r'\d+', text)
-                if m:
-                    meta['participants'] = int(m.group())
-            elif 'runs:' in lower:
-                m = re.search(r'\d+', text)
-                if m:
-                    meta['runs'] = int(m.group())
-            elif not date_found:
-                meta['date'] = text
-                date_found = True
-            elif 'location' not in meta:
-                meta['location'] = text
+            detail_texts.append(div.get_text(strip=True))
+
+    return metadata_from_text(
+        title_el.get_text() if title_el else None,
+        event_name_el.get_text(strip=True) if event_name_el else None,
+        detail_texts)
+
+
+def metadata_from_text(title, event_name, detail_texts):
+    """
+    Return the metadata from the text of the fin.html's title, its
+    event-name div and its event-details divs.
+    """
+    meta = {}
+
+    if title is not None:
+        meta['title'] = title
+
+    if event_name is not None:
+        meta['event_name'] = event_name.replace(' Results', '').strip()
+
+    date_found = False
+    for text in detail_texts:
+        if not text:
+            continue
+        lower = text.lower()
+        if 'participants:' in lower:
+            m = re.search(r'\d+', text)
+            if m:
+                meta['participants'] = int(m.group())
+        elif 'runs:' in lower:
+            m = re.search(r'\d+', text)
+            if m:
+                meta['runs'] = int(m.group())
+        elif not date_found:
+            meta['date'] = text
+            date_found = True
+        elif 'location' not in meta:
+            meta['location'] = text
 
     # Fallback counts from results data (populated later if still absent).
     return meta
@@ -170,19 +288,19 @@ def _best_run_index(driver):
         return best_idx
 
 
-def run_times_html(driver):
+def run_times_html(run_matrix, row_num):
     """Return all run time divs concatenated (plus clear-left footer)."""
-    best_nums = set(driver.get('best_time_nums', []))
+    best_nums = set(run_matrix.best_time_nums(row_num))
     parts = []
     scored_idx = 0
-    run_num = 1
-    while f'Run {run_num}' in driver:
-        run_time = driver[f'Run {run_num}']
-        penalty = driver.get(f'Run {run_num} Pen')
-        run_num += 1
-        if run_time is None:
+    for present, run_time, code, penalty in zip(
+            run_matrix.present[row_num].tolist(),
+            run_matrix.scratch[row_num].tolist(),
+            run_matrix.codes[row_num].tolist(),
+            run_matrix.penalties[row_num].tolist()):
+        if not present:
             continue
-        if isinstance(penalty, str) and penalty.startswith('RERUN'):
+        if code == PEN_RERUN:
             div = fmt_time(run_time, penalty, False)
         else:
             scored_idx += 1
@@ -244,16 +362,16 @@ def best_display_time(driver):
     return driver.get('best_raw_time', INVALID_TIME)
 
 
-def generate_class_rows(results):
-    """Generate <tr> rows for the class tab, grouped by divider label."""
+def generate_class_rows(results, times_htmls):
+    """Yield <tr> rows for the class tab, grouped by divider label."""
     # Collect groups, preserving a stable order: indexed groups first
     # (P, Z, C1, C2, Consolidated), then open classes alphabetically.
     INDEX_ORDER = ['P', 'Z', 'C1', 'C2', 'Consolidated']
 
-    groups = {}   # label → [driver, …]
-    for d in results:
+    groups = {}   # label → [(row_num, driver), …]
+    for row_num, d in enumerate(results):
         key = class_divider_key(d)
-        groups.setdefault(key, []).append(d)
+        groups.setdefault(key, []).append((row_num, d))
 
     # Build ordered list of group labels.
     ordered_labels = [lbl for lbl in INDEX_ORDER if lbl in groups]
@@ -262,17 +380,14 @@ def generate_class_rows(results):
     )
     ordered_labels.extend(open_labels)
 
-    rows = []
     for label in ordered_labels:
-        drivers = sorted(groups[label], key=class_sort_key)
+        drivers = sorted(groups[label], key=lambda item: class_sort_key(item[1]))
 
-        rows.append(
-            f'<tr class="divider"><td colspan="7">{label}</td></tr>'
-        )
+        yield f'<tr class="divider"><td colspan="7">{label}</td></tr>'
 
         first_time = None
         prev_time  = None
-        for pos, drv in enumerate(drivers, start=1):
+        for pos, (row_num, drv) in enumerate(drivers, start=1):
             score = best_display_time(drv)
             name  = (f'{drv["FirstName"]} {drv["LastName"]}'
                      f' #{drv["CarNumber"]}')
@@ -290,10 +405,10 @@ def generate_class_rows(results):
                 d_prev  = fmt_diff(score - prev_time)
             prev_time = score
 
-            times_html = run_times_html(drv)
+            times_html = times_htmls[row_num]
             score_str  = f'{score:.3f}' if score < INVALID_TIME else 'DNF'
 
-            rows.append(
+            yield (
                 f'<tr class="row">'
                 f'<td align="center">{pos}</td>'
                 f'<td nowrap>{name}</td>'
@@ -305,25 +420,25 @@ def generate_class_rows(results):
                 f'</tr>'
             )
 
-    return '\n'.join(rows)
-
 
 # ---------------------------------------------------------------------------
 # Overall tab (sorted by best raw time)
 
-def generate_overall_rows(results):
+def best_raw_time(driver):
+    return driver.get('best_raw_time',
+                      safe_float(driver.get('Best'), INVALID_TIME))
+
+
+def generate_overall_rows(results, times_htmls):
     sorted_drivers = sorted(
-        results,
-        key=lambda d: d.get('best_raw_time',
-                            safe_float(d.get('Best'), INVALID_TIME))
+        enumerate(results),
+        key=lambda item: best_raw_time(item[1])
     )
 
-    rows = []
     first_time = None
     prev_time  = None
-    for rank, drv in enumerate(sorted_drivers, start=1):
-        raw = drv.get('best_raw_time',
-                      safe_float(drv.get('Best'), INVALID_TIME))
+    for rank, (row_num, drv) in enumerate(sorted_drivers, start=1):
+        raw = best_raw_time(drv)
         name = (f'{drv["FirstName"]} {drv["LastName"]}'
                 f' #{drv["CarNumber"]}')
         car  = drv.get('Car', '')
@@ -341,10 +456,10 @@ def generate_overall_rows(results):
             d_prev  = fmt_diff(raw - prev_time)
         prev_time = raw
 
-        times_html = run_times_html(drv)
+        times_html = times_htmls[row_num]
         raw_str    = f'{raw:.3f}' if raw < INVALID_TIME else 'DNF'
 
-        rows.append(
+        yield (
             f'<tr class="row">'
             f'<td>{rank}</td>'
             f'<td>{cls}'                    # intentionally no </td> – matches AXti.me quirk
@@ -356,22 +471,20 @@ def generate_overall_rows(results):
             f'<td>{times_html}</td>'
             f'</tr>'
         )
-    return '\n'.join(rows)
 
 
 # ---------------------------------------------------------------------------
 # PAX tab (sorted by best PAX time)
 
-def generate_pax_rows(results):
+def generate_pax_rows(results, times_htmls):
     sorted_drivers = sorted(
-        results,
-        key=lambda d: d.get('best_pax_time', INVALID_TIME)
+        enumerate(results),
+        key=lambda item: item[1].get('best_pax_time', INVALID_TIME)
     )
 
-    rows = []
     first_time = None
     prev_time  = None
-    for rank, drv in enumerate(sorted_drivers, start=1):
+    for rank, (row_num, drv) in enumerate(sorted_drivers, start=1):
         pax = drv.get('best_pax_time', INVALID_TIME)
         name = (f'{drv["FirstName"]} {drv["LastName"]}'
                 f' #{drv["CarNumber"]}')
@@ -390,10 +503,10 @@ def generate_pax_rows(results):
             d_prev  = fmt_diff(pax - prev_time)
         prev_time = pax
 
-        times_html = run_times_html(drv)
+        times_html = times_htmls[row_num]
         pax_str    = f'{pax:.3f}' if pax < INVALID_TIME else 'DNF'
 
-        rows.append(
+        yield (
             f'<tr class="row">'
             f'<td>{rank}</td>'
             f'<td>{cls}'                    # no </td> – AXti.me quirk
@@ -405,16 +518,45 @@ def generate_pax_rows(results):
             f'<td>{times_html}</td>'
             f'</tr>'
         )
-    return '\n'.join(rows)
+
+
+# ---------------------------------------------------------------------------
+# Simplified page (overall results only, sorted by driver)
+
+def generate_simple_rows(results, times_htmls):
+    sorted_drivers = sorted(
+        enumerate(results),
+        key=lambda item: driver_name(item[1]).lower()
+    )
+
+    for row_num, drv in sorted_drivers:
+        raw     = best_raw_time(drv)
+        raw_str = f'{raw:.3f}' if raw < INVALID_TIME else 'DNF'
+
+        yield (
+            f'<tr class="row">'
+            f'<td nowrap>{driver_name(drv)}</td>'
+            f'<td nowrap>{drv.get("Car", "")}</td>'
+            f'<td><strong>{raw_str}</strong></td>'
+            f'<td>{times_htmls[row_num]}</td>'
+            f'</tr>'
+        )
+
+
+def driver_name(driver):
+    return (f'{driver["FirstName"]} {driver["LastName"]}'
+            f' #{driver["CarNumber"]}')
 
 
 # ---------------------------------------------------------------------------
 # CSS extraction
 
+@functools.lru_cache(maxsize=None)
 def extract_css():
     """
     Borrow the inline CSS from the nearest existing base HTML in the repo.
-    Searches the year directories newest-first.
+    Searches the year directories newest-first.  Only done once per
+    process, as every page gets the same CSS.
     """
     for year in range(2030, 2017, -1):
         for path in glob.glob(f'{year}/*.html'):
@@ -431,20 +573,44 @@ def extract_css():
 # ---------------------------------------------------------------------------
 # Top-level HTML assembly
 
-def generate_base_html(results, metadata):
-    event_name   = metadata.get('event_name', 'Event')
-    date_str     = metadata.get('date', '')
-    participants = metadata.get('participants', len(results))
-    runs         = metadata.get('runs',
-                                sum(d.get('num_runs', 0) for d in results))
+def generate_base_html(results, metadata, run_matrix=None):
+    return ''.join(iter_base_html(results, metadata, run_matrix))
+
+
+def run_times_htmls(results, run_matrix=None):
+    """
+    Return the run time divs of every driver, by row number.  Every tab
+    (and the simplified page) shows them, so they are only made once.
+    """
+    if run_matrix is None:
+        run_matrix = RunMatrix.from_results(results)
+    return [run_times_html(run_matrix, row_num)
+            for row_num in range(len(results))]
+
+
+def page_details(results, metadata):
+    """Return the event name, date, participants and runs for the header."""
+    return (metadata.get('event_name', 'Event'),
+            metadata.get('date', ''),
+            metadata.get('participants', len(results)),
+            metadata.get('runs',
+                         sum(d.get('num_runs', 0) for d in results)))
+
+
+def iter_base_html(results, metadata, run_matrix=None, times_htmls=None):
+    """
+    Yield the base HTML a piece at a time: the page header, then each
+    table row, so it can be written out as it is generated.
+    """
+    event_name, date_str, participants, runs = page_details(results, metadata)
 
-    css           = extract_css()
-    class_rows    = generate_class_rows(results)
-    overall_rows  = generate_overall_rows(results)
-    pax_rows      = generate_pax_rows(results)
+    if times_htmls is None:
+        times_htmls = run_times_htmls(results, run_matrix)
 
-    # Build as a single-line string (matching the AXti.me export style).
-    return (
+    css = extract_css()
+
+    # No newlines outside the table rows (matching the AXti.me export style).
+    yield (
         f'<html><head><title>AXti.me Event Results:  {event_name}</title>'
         f'<style>{css}</style></head>'
         f'<body>'
@@ -468,7 +634,11 @@ def generate_base_html(results, metadata):
         f'<th>Best</th><th>Diff.</th><th>Diff. Prev.</th><th>Raw Times</th>'
         f'</tr>'
         f'</thead>'
-        f'<tbody>{class_rows}</tbody>'
+        f'<tbody>'
+    )
+    yield from join_rows(generate_class_rows(results, times_htmls))
+    yield (
+        f'</tbody>'
         f'</table>'
 
         # Overall tab (hidden by default)
@@ -480,7 +650,11 @@ def generate_base_html(results, metadata):
         f'<th>Best</th><th>Diff.</th><th>Diff. Prev.</th><th>Raw Times</th>'
         f'</tr>'
         f'</thead>'
-        f'<tbody>{overall_rows}</tbody>'
+        f'<tbody>'
+    )
+    yield from join_rows(generate_overall_rows(results, times_htmls))
+    yield (
+        f'</tbody>'
         f'</table>'
 
         # PAX tab (hidden by default)
@@ -492,7 +666,11 @@ def generate_base_html(results, metadata):
         f'<th>Best</th><th>Diff.</th><th>Diff. Prev.</th><th>Raw Times</th>'
         f'</tr>'
         f'</thead>'
-        f'<tbody>{pax_rows}</tbody>'
+        f'<tbody>'
+    )
+    yield from join_rows(generate_pax_rows(results, times_htmls))
+    yield (
+        f'</tbody>'
         f'</table>'
 
 
@@ -508,5 +686,58 @@ def generate_base_html(results, metadata):
     )
 
 
+def iter_simple_html(results, metadata, run_matrix=None, times_htmls=None):
+    """
+    Yield the simplified page: only the overall table, without the rank,
+    class and diff columns, sorted alphabetically by driver.  This is the
+    page transform_results.py makes from the base HTML, but written
+    straight from the results.
+    """
+    event_name, date_str, participants, runs = page_details(results, metadata)
+
+    if times_htmls is None:
+        times_htmls = run_times_htmls(results, run_matrix)
+
+    css = extract_css()
+
+    yield (
+        f'<html>\n'
+        f'  <head>\n'
+        f'<title>AXti.me Event Results:  {event_name}</title>'
+        f'<style>{css}</style>\n'
+        f'  </head>\n'
+        f'  <body>\n'
+        f'    <div style="float: right">Participants: {participants}<br />Runs: {runs}</div>\n'
+        f'    <h1>Minnesota Autosports Club</h1>\n'
+        f'    <h2 style="margin-bottom: 4px">{event_name}</h2>\n'
+        f'    <h4 style="margin-top: 0px">{date_str}</h4>\n'
+        f'    <div class="clearfix"></div>\n'
+        f'    <table id="result-overall">'
+        f'<thead>'
+        f'<tr><th colspan="4">Overall</th></tr>'
+        f'<tr>'
+        f'<th>Driver</th><th>Car</th><th>Best</th><th>Raw Times</th>'
+        f'</tr>'
+        f'</thead>'
+        f'<tbody>'
+    )
+    yield from join_rows(generate_simple_rows(results, times_htmls))
+    yield (
+        f'</tbody>'
+        f'</table>\n'
+        f'    <div>Created by <a href="http://www.axti.me">AXti.me</a></div>\n'
+        f'  </body>\n'
+        f'</html>'
+    )
+
+
+def join_rows(rows):
+    """Yield the rows with a newline between each."""
+    for num, row in enumerate(rows):
+        if num:
+            yield '\n'
+        yield row
+
+
 if __name__ == '__main__':
     main()
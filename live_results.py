@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+#
+# pylint: disable=missing-docstring
+#
+# This script keeps an event's results page up to date while the event
+# is running. It watches the CSV exported from the timing software and,
+# every time it is re-exported, updates the page. It produces the same
+# page as running compute_results.py and then publish_event.py, but:
+#  - Only drivers whose runs (or name, car, or class) changed since the
+#    last export are scored again. Everybody else keeps the results we
+#    already have for them.
+#  - The DOTY points are recomputed for everybody, as a new fastest
+#    time changes them all.
+#  - Only the class tables with a changed driver are rendered again.
+#    The rest of the page is assembled from the tables we already
+#    rendered. If the widest table gains a run column, every class
+#    table is rendered again.
+#
+# This is meant for the grid, on event day. Once the event is over,
+# run compute_results.py and publish_event.py as usual to produce the
+# JSON and the final page.
+#
+# Invoke this as:
+# pylint: disable=line-too-long
+#
+# ./live_results.py -m 3 -n 'MOWOG 1' -d 'Saturday, 25 April, 2026' -l 'DCTC' 2026/2026-mowog1.csv 2026/2026-mowog1-live.html
+#
+# pylint: enable=line-too-long
+#
+
+import argparse
+import os
+import re
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from assets import get_image_data_uri
+from compute_results import (add_doty_points, identify_run_cols,
+                             load_event_csv, load_pax_factors, score_event)
+from publish_event import (EVENT_PARTIALS, make_renderer,
+                           prepare_all_best_times, prepare_class_results,
+                           prepare_event_summary, select_class_results)
+from run_matrix import JSON_PRECISION, RunMatrix
+from template_cache import parse_template, read_template
+
+
+# The columns that identify a driver from one export to the next.
+DRIVER_KEY_COLS = ['FirstName', 'LastName', 'CarNumber']
+
+# The columns, other than the runs, that show up in a driver's row.
+DRIVER_INFO_COLS = DRIVER_KEY_COLS + ['Car', 'Class']
+
+# The class tables are one section of the event results template. We
+# render that section on its own for each class.
+CLASSES_SECTION_RE = re.compile(r'^\{\{#classes\}\}\n(.*?)^\{\{/classes\}\}\n',
+                                re.MULTILINE | re.DOTALL)
+
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-m',
+                        dest='num_morning_times',
+                        default=3,
+                        type=int,
+                        help='The number of morning runs. Used for ' +
+                        'computing pro split timing.')
+    parser.add_argument('--no-pro-split',
+                        dest='compute_split_pro_times',
+                        default=True,
+                        action='store_false',
+                        help='If set, do not compute split times for ' +
+                        'the pro class.')
+    parser.add_argument('-n',
+                        dest='event_name',
+                        default='',
+                        help='The name of this event, e.g., ' +
+                        '"MOWOG 1".')
+    parser.add_argument('-d',
+                        dest='event_date',
+                        default='',
+                        help='The date of this event, e.g., ' +
+                        '"Saturday, 28 April, 2018".')
+    parser.add_argument('-l',
+                        dest='event_location',
+                        default='',
+                        help='The location of this event, e.g., '+
+                        '"Canterbury Park, MN"')
+    parser.add_argument('-i',
+                        dest='interval',
+                        default=1.0,
+                        type=float,
+                        help='How often to check the CSV for changes, in ' +
+                        'seconds.')
+    parser.add_argument('results_filename',
+                        help='The CSV exported from the timing software.')
+    parser.add_argument('output_filename',
+                        help='The output file. Will keep the HTML results ' +
+                        'in this file up to date.')
+    config = parser.parse_args(args)
+
+    load_pax_factors(config)
+    event = LiveEvent(config)
+
+    print('Watching %s, Ctrl-C to stop' % config.results_filename)
+    last_stat = None
+    try:
+        while True:
+            stat = file_stat(config.results_filename)
+            if stat and stat != last_stat:
+                last_stat = stat
+                update_page(event, config)
+            time.sleep(config.interval)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def file_stat(filename):
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def update_page(event, config):
+    start = time.perf_counter()
+    try:
+        event_results = load_event_csv(config.results_filename)
+        num_changed = event.update(event_results)
+    except (ValueError, KeyError, pd.errors.ParserError) as e:
+        # Most likely we caught the export half written. We will try
+        # again when it changes.
+        print('WARNING: Could not update from %s: %s' %
+              (config.results_filename, e))
+        return
+    if not num_changed:
+        return
+    html = event.render()
+    write_atomically(config.output_filename, html)
+    print('%s  %d drivers changed, rendered %d of %d classes in %.1fms' %
+          (time.strftime('%H:%M:%S'), num_changed, event.num_rendered,
+           len(event.class_html), (time.perf_counter() - start) * 1000.0))
+
+
+# Write to a temporary file first, so that nobody loads half a page.
+def write_atomically(filename, text):
+    temp_filename = filename + '.tmp'
+    with open(temp_filename, 'wt') as out_file:
+        out_file.write(text)
+    os.replace(temp_filename, filename)
+
+
+# ------------------------------------------------------------
+# The event, as we know it so far
+
+class LiveEvent:
+
+    def __init__(self, config):
+        self.config = config
+        self.stache = make_renderer()
+        self.class_template, self.page_template = \
+          [parse_template(source, EVENT_PARTIALS)
+           for source in split_classes_section(
+               read_template('templates/event-results.html'))]
+        self.logo_data_uri = get_image_data_uri('templates/mac-logo-small.png')
+        self.reset()
+
+    def reset(self):
+        # The scored results and run matrix for every driver with a
+        # valid time, in the order of the CSV.
+        self.results = None
+        self.runs = None
+        # A hash of each driver's row in the CSV, keyed by the driver.
+        self.row_hashes = {}
+        # The rendered class tables, keyed as in select_class_results.
+        self.class_html = {}
+        self.changed_classes = set()
+        self.num_rendered = 0
+
+    # Takes the freshly exported results, and scores the drivers that
+    # changed. Returns the number of drivers that changed.
+    def update(self, event_results):
+        run_cols = identify_run_cols(event_results)
+        keys = driver_keys(event_results)
+        if run_cols != getattr(self.config, 'run_cols', None):
+            # A new run column. Start over.
+            self.reset()
+        self.config.run_cols = run_cols
+
+        hash_cols = DRIVER_INFO_COLS + \
+          [col for run_col in run_cols for col in run_col]
+        row_hashes = dict(zip(keys, pd.util.hash_pandas_object(
+            event_results[hash_cols], index=False).tolist()))
+        changed = np.array([self.row_hashes.get(key) != row_hash
+                            for key, row_hash in row_hashes.items()],
+                           dtype=bool)
+        removed = set(self.row_hashes) - set(row_hashes)
+        self.row_hashes = row_hashes
+        if not changed.any() and not removed:
+            return 0
+
+        # Score just the drivers that changed.
+        scored, runs = score_event(event_results.loc[changed].copy(),
+                                   self.config)
+
+        # And merge them in with everybody else.
+        results = [scored]
+        matrices = [runs]
+        old_classes = []
+        if self.results is not None:
+            changed_keys = set(key for key, is_changed in zip(keys, changed)
+                               if is_changed)
+            stale = np.array([key in changed_keys or key in removed
+                              for key in driver_keys(self.results)],
+                             dtype=bool)
+            old_classes = class_keys(self.results.loc[stale])
+            results.insert(0, self.results.loc[~stale])
+            matrices.insert(0, self.runs.select(~stale))
+        # Leave out anything empty, so that it doesn't muddle the
+        # column types. Columns that are empty in one part but not the
+        # other (e.g., MemberNumber) take the type of the other, which
+        # is what we want, so don't warn about that.
+        parts = [(part, matrix) for part, matrix in zip(results, matrices)
+                 if len(part)] or [(scored, runs)]
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', FutureWarning)
+            results = pd.concat([part for part, _ in parts])
+        runs = RunMatrix.concat([matrix for _, matrix in parts])
+
+        # Put everybody back in the order of the CSV, which is the
+        # order compute_results.py would have kept them in.
+        positions = dict((key, num) for num, key in enumerate(keys))
+        order = np.argsort([positions[key] for key in driver_keys(results)],
+                           kind='stable')
+        results = results.iloc[order].reset_index(drop=True)
+        runs = runs.select(order)
+
+        # The DOTY points depend on the whole field.
+        results = add_doty_points(results)
+
+        # Round the way the JSON results would have, so that the times
+        # show up exactly as they would in the published page.
+        float_cols = results.columns[results.dtypes == float]
+        results[float_cols] = results[float_cols].round(JSON_PRECISION)
+
+        if self.runs is not None and runs.max_scored != self.runs.max_scored:
+            # Every class table grows (or loses) a column.
+            self.class_html = {}
+        self.changed_classes.update(old_classes)
+        self.changed_classes.update(class_keys(scored))
+        self.results = results
+        self.runs = runs
+        return int(changed.sum()) + len(removed)
+
+    def render(self):
+        config = self.config
+        results = self.results
+        config.run_matrix = self.runs
+        config.num_scored_times = self.runs.max_scored
+
+        options = prepare_event_summary(results, config)
+        options['logoDataUri'] = self.logo_data_uri
+
+        # Only render the class tables that changed.
+        class_html = {}
+        self.num_rendered = 0
+        for key, selected_results, class_name, label, time_type in \
+            select_class_results(results, config.pax_factors):
+            if key in self.changed_classes or key not in self.class_html:
+                class_results = prepare_class_results(
+                    selected_results, class_name, label, time_type, config)
+                self.class_html[key] = self.stache.render(
+                    self.class_template, options, class_results)
+                self.num_rendered += 1
+            class_html[key] = self.class_html[key]
+        self.class_html = class_html
+        self.changed_classes = set()
+
+        options['classes'] = [{'html': html} for html in class_html.values()]
+        options['rawTimes'] = prepare_all_best_times(results, 'best_raw_time')
+        options['paxTimes'] = prepare_all_best_times(results, 'best_pax_time')
+        return self.stache.render(self.page_template, options)
+
+
+# ------------------------------------------------------------
+# Helper functions
+
+# Returns a key for each driver. If the same driver shows up more than
+# once, each row gets its own key.
+def driver_keys(results):
+    keys = []
+    seen = {}
+    for key in zip(*[results[col].tolist() for col in DRIVER_KEY_COLS]):
+        seen[key] = seen.get(key, -1) + 1
+        keys.append(key + (seen[key],))
+    return keys
+
+
+# The same keys select_class_results() uses for the class tables.
+def class_keys(results):
+    return set(class_index if class_index else class_name
+               for class_index, class_name
+               in zip(results['class_index'], results['class_name']))
+
+
+# Splits the event results template into the template for one class
+# table, and the template for the page with the class tables already
+# rendered.
+def split_classes_section(template):
+    match = CLASSES_SECTION_RE.search(template)
+    if not match:
+        raise ValueError('Could not find the classes section in the ' +
+                         'event results template')
+    page_template = template[:match.start()] + \
+      '{{#classes}}{{{html}}}{{/classes}}' + template[match.end():]
+    return match.group(1), page_template
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,104 @@
+#
+# pylint: disable=missing-docstring
+#
+# The PAX factors, by season and class. The factors in pax-factors.json
+# at the top of the repository are the current ones. A season directory
+# may have its own pax-factors.json (e.g., 2024/pax-factors.json) with
+# the factors used that year, which take precedence for that season.
+# Classes only listed at the top (e.g., N and X, which are not in the
+# published factors) are still found for every season.
+#
+# Each season's table is kept as a dict so that every lookup is a single
+# hash. It is only read again when one of its files changes (by
+# modification time or size), so that a long-running process (e.g.,
+# watch_season.py or serve_results.py) sees the new factors.
+#
+# The season of a results file is the directory it is in, e.g.,
+# 2026/2026-mowog1.json is in 2026. Files outside a season directory
+# just use the current factors.
+#
+
+import json
+import os
+import re
+
+
+PAX_FACTORS_FILENAME = 'pax-factors.json'
+
+SEASON_DIR_RE = re.compile(r'(?:19|20)[0-9]{2}')
+
+# {year: (stamps, PaxTable)}
+_tables = {}
+
+
+class PaxTable:
+
+    def __init__(self, factors, filenames):
+        self.factors = factors
+        self.filenames = filenames
+
+    def __len__(self):
+        return len(self.factors)
+
+    def __contains__(self, class_name):
+        return class_name in self.factors
+
+    def factor(self, class_name):
+        try:
+            return self.factors[class_name]
+        except KeyError:
+            raise KeyError('No PAX factor for class "%s" in %s' %
+                           (class_name, ', '.join(self.filenames))) from None
+
+    def get(self, class_name, default=None):
+        return self.factors.get(class_name, default)
+
+
+def year_of(filename):
+    season_dir = os.path.basename(os.path.dirname(os.path.abspath(filename)))
+    if SEASON_DIR_RE.fullmatch(season_dir):
+        return int(season_dir)
+    return None
+
+
+def pax_factor_filenames(year=None):
+    filenames = [PAX_FACTORS_FILENAME]
+    if year is not None:
+        year_filename = os.path.join(str(year), PAX_FACTORS_FILENAME)
+        if os.path.exists(year_filename):
+            filenames.append(year_filename)
+    return filenames
+
+
+def load_pax_table(year=None):
+    filenames = pax_factor_filenames(year)
+    stamps = pax_file_stamps(filenames)
+    cached = _tables.get(year)
+    if cached and cached[0] == stamps:
+        return cached[1]
+
+    factors = {}
+    for filename in filenames:
+        with open(filename) as json_file:
+            for obj in json.load(json_file):
+                factors[obj['name']] = obj['factor']
+    table = PaxTable(factors, filenames)
+    _tables[year] = (stamps, table)
+    return table
+
+
+# As template_cache.file_stamps, which we do not import, as that would
+# bring pystache into every script that only needs the factors.
+def pax_file_stamps(filenames):
+    stamps = []
+    for filename in filenames:
+        stat = os.stat(filename)
+        # The names are relative, so the same ones may be other files
+        # once we change directory.
+        stamps.append((os.path.abspath(filename), stat.st_mtime_ns,
+                       stat.st_size))
+    return tuple(stamps)
+
+
+def pax_table_for(filename):
+    return load_pax_table(year_of(filename))
@@ -5,27 +5,79 @@
 # This script reads a series of event results files, computes the DOTY
 # points, and creates an HTML file with the results neatly formatted.
 #
+# The standings can be for any points column in the event results:
+# doty_points (PAX) by default, or doty_raw_points with -p (which is
+# all publish_doty_raw.py does). To write more than one set of
+# standings, add -s for each of the others. The event results are only
+# read once for all of them.
+#
 # Invoke this as:
 # pylint: disable=line-too-long
 #
 # ./publish_doty.py -t 'MAC DOTY 2018' -n 9 -b 5 -o 2018/doty.html gen/mowog1.json gen/mowog2.json gen/mowog3.json
+# ./publish_doty.py -t 'MAC DOTY 2026' -n 10 -b 6 -o 2026/doty.html -s doty_raw_points 'MAC DOTY RAW 2026' 2026/doty_raw.html 2026/2026-mowog1.json 2026/2026-mowog2.json
 #
 # pylint: enable=line-too-long
 #
 
 import argparse
-import base64
 import json
 import math
 import sys
 
-import numpy as np
-import pandas as pd
-
 import pystache
 
+from assets import page_assets
+from driver_history import record_standings
+from driver_identity import dealias_name
+from event_cache import read_results
+from results_warehouse import read_results as read_warehouse_results
+from season_points import SeasonTable, add_season_points
+from template_cache import iter_render, load_template
+
 
 def main(args):
+    config = get_config(args)
+    standings = get_standings(config)
+
+    # Read the event results files.
+    results_by_col = load_results(config,
+                                  [points_col for points_col, _, _ in standings])
+
+    # Set up the templating.
+    stache = pystache.Renderer(file_extension=False,
+                               partials={})
+    doty_results_template = \
+      load_template('templates/doty-results.html',
+                    {'style': 'templates/style.css'})
+
+    for points_col, title, output_filename in standings:
+        # Prepare the data do go in the template.
+        options = {
+            'title': title,
+            'events': ['M%d' % event_num for event_num in range(1, config.num_events + 1)]
+        }
+        # print(options)
+        options['results'] = \
+          prepare_results_for_template(results_by_col[points_col], config)
+        options.update(page_assets(output_filename, config.assets_dir))
+
+        # Apply the template and write the result.
+        chunks = iter_render(stache, doty_results_template, options)
+        if output_filename:
+            print('Writing DOTY results to: %s' % output_filename)
+            with open(output_filename, 'wt') as output_file:
+                output_file.writelines(chunks)
+        else:
+            sys.stdout.writelines(chunks)
+            print()
+
+    if config.history_filename:
+        # Keep the standings for the drivers' history across seasons.
+        record_history(standings, results_by_col, config.history_filename)
+
+
+def get_config(args):
     parser = argparse.ArgumentParser()
     parser.add_argument('results_filenames',
                         nargs='+',
@@ -50,46 +102,64 @@ def main(args):
                         type=int,
                         help='The number of events contributing to the ' +
                         'final DOTY score.')
+    parser.add_argument('-p',
+                        dest='points_col',
+                        default='doty_points',
+                        help='The points column in the event results to ' +
+                        'rank the drivers by.')
+    parser.add_argument('-s',
+                        dest='more_standings',
+                        nargs=3,
+                        action='append',
+                        default=[],
+                        metavar=('POINTS_COL', 'TITLE', 'OUTPUT'),
+                        help='Also write the standings for another points ' +
+                        'column, with this title, to this file. May be ' +
+                        'given more than once.')
+    parser.add_argument('-a',
+                        dest='assets_dir',
+                        default=None,
+                        help='Write the logo and style sheet to this ' +
+                        'directory, and link to them, rather than ' +
+                        'inlining them in the page.')
+    parser.add_argument('--db',
+                        dest='db_filename',
+                        default=None,
+                        help='Read the event results from this results ' +
+                        'warehouse (see results_warehouse.py), rather than ' +
+                        'from the results files.')
+    parser.add_argument('--history',
+                        dest='history_filename',
+                        default=None,
+                        metavar='DB',
+                        help='Also record the standings in this driver ' +
+                        'history database (see driver_history.py), e.g., ' +
+                        'driver-history.sqlite.')
     config = parser.parse_args(args)
 
     # Load the alias information.
     with open('aliases.json', 'rt', encoding='utf-8') as json_data:
         config.aliases = json.load(json_data)
 
-    # Read the event results files.
-    results = load_results(config)
+    return config
 
-    # Set up the templating.
-    stache = pystache.Renderer(file_extension=False,
-                               partials={})
-    stache.partials['style'] = stache.load_template('templates/style.css')
-
-    # Prepare the data do go in the template.
-    options = {
-        'title': config.title,
-        'events': ['M%d' % event_num for event_num in range(1, config.num_events + 1)]
-    }
-    # print(options)
-    options['results'] = prepare_results_for_template(results, config)
-    options['logoDataUri'] = get_image_data_uri('templates/mac-logo-small.png')
-
-    # Apply the template and write the result.
-    doty_results_template = \
-      stache.load_template('templates/doty-results.html')
-    html = stache.render(doty_results_template, options)
-    if config.output_filename:
-        print('Writing DOTY results to: %s' % config.output_filename)
-        with open(config.output_filename, 'wt') as output_file:
-            output_file.write(html)
-    else:
-        print(html)
+
+# Returns [(points column, title, output file)] for each set of
+# standings to write.
+def get_standings(config):
+    standings = [(config.points_col, config.title, config.output_filename)]
+    standings.extend(tuple(more) for more in config.more_standings)
+    return standings
 
 
 # ------------------------------------------------------------
 # Helper functions
 
-def load_results(config):
-    results = pd.DataFrame(columns=['driver'])
+# Returns {points column: season results} for each of the points
+# columns.
+def load_results(config, points_cols):
+    season_tables = dict((points_col, SeasonTable(['driver']))
+                         for points_col in points_cols)
     event_num = 1
     event_names = []
     for results_filename in config.results_filenames:
@@ -98,8 +168,12 @@ def load_results(config):
         print('Reading results for %s:' % event_name)
         print('  %s' % results_filename)
 
-        event_results = pd.read_json(results_filename,
-                                     orient='records', lines=True)
+        if config.db_filename:
+            event_results = read_warehouse_results(config.db_filename,
+                                                   results_filename,
+                                                   config.aliases)
+        else:
+            event_results = read_results(results_filename)
 
         # FIXME This little bit of name fixing is duplicated from
         # publish_series.py.
@@ -113,79 +187,21 @@ def load_results(config):
         event_results['driver'] = \
             event_results['driver'].apply(dealias_name, args=[config.aliases])
 
-        event_results[event_name] = event_results['doty_points']
-
-        results = results.merge(event_results.loc[:, ['driver', event_name]],
-                                on='driver',
-                                how='outer')
+        for points_col, season_table in season_tables.items():
+            season_table.add_event(event_name, event_results, points_col)
         event_num = event_num + 1
 
     # Compute the season points (and related summary values). These
     # are what we're really trying to get to.
-    results = results.apply(add_season_points,
-                            axis=1,
-                            args=[event_names, config])
-
-    # Compute the BTP points.
-    results = results.apply(add_btp_scores, axis=1, args=[event_names, config])
+    # The BTP points come along with them.
+    results_by_col = {}
+    for points_col, season_table in season_tables.items():
+        results_by_col[points_col] = add_season_points(
+            season_table.to_frame(), event_names, config.num_events,
+            config.num_btp_events, with_kept_events=True)
 
     # print(results)
-    return results
-
-
-def add_season_points(row, event_names, config):
-    # FIXME Write down exactly which events we are keeping, so that we
-    # can highlight these in the results.
-
-    # Decide how many of these scores to keep.
-    num_actual_events = row[event_names].count()
-    num_scores_to_keep = min(num_actual_events, config.num_btp_events)
-
-    # Get the keeper scores.
-    scores = zip([0.0 if math.isnan(score) else score for score in row[event_names]],
-                 event_names)
-    scores = sorted(scores, reverse=True, key=lambda x: x[0])
-    kept_scores = scores[:num_scores_to_keep]
-
-    # Record the season values.
-    row['num_actual_events'] = num_actual_events
-    row['num_kept_events'] = num_scores_to_keep
-    row['total_points'] = sum([score for score, _event_name in kept_scores])
-    row['avg_points'] = np.mean([score for score, _event_name in kept_scores])
-    row['kept_events'] = set([event_name for _score, event_name in kept_scores])
-
-    return row
-
-
-def add_btp_scores(row, event_names, config):
-    actual_event_count = len(event_names)
-
-    # Assume 100.0 points for each remaining event.
-    num_remaining_events = config.num_events - actual_event_count
-    if num_remaining_events > config.num_btp_events:
-        num_remaining_events = config.num_btp_events
-    best_remaining_score = 100.0 * num_remaining_events
-
-    # Get the keeper scores.
-    scores = [0.0 if math.isnan(score) else score for score in row[event_names]]
-    scores = sorted(scores, reverse=True)
-
-    num_scores_to_keep = config.num_btp_events - num_remaining_events
-    kept_scores = scores[:num_scores_to_keep]
-
-    kept_score = sum(kept_scores)
-
-    # Record the result
-    row['btp'] = kept_score + best_remaining_score
-    return row
-
-
-# FIXME This is duplicated with the one in publish_series.py.
-def dealias_name(name, aliases):
-    lower_name = name.lower()
-    if lower_name in aliases:
-        return aliases[lower_name]
-    return name
+    return results_by_col
 
 
 def prepare_results_for_template(results_df, config):
@@ -243,14 +259,18 @@ def prepare_results_for_template(results_df, config):
     return results
 
 
-# FIXME This is duplicated with the publish_results.py script, we
-# should put them in a common place.
-def get_image_data_uri(filename):
-    with open(filename, 'rb') as in_file:
-        raw_data = in_file.read()
-        base64_data = base64.b64encode(raw_data)
-        data_uri = 'data:image/png;base64,' + base64_data.decode('utf-8')
-        return data_uri
+def record_history(standings, results_by_col, db_filename):
+    for points_col, _, output_filename in standings:
+        if not output_filename:
+            continue
+        # In the same order as on the page.
+        sorted_results = results_by_col[points_col].sort_values(
+            by=['total_points'], ascending=False)
+        place_rows = []
+        for place, (_, row) in enumerate(sorted_results.iterrows(), 1):
+            place_rows.append((place, row['driver'], row['num_actual_events'],
+                               row['num_kept_events'], row['total_points']))
+        record_standings(output_filename, place_rows, db_filename)
 
 
 def format_score(score):
@@ -16,17 +16,30 @@
 #
 
 import argparse
-import base64
 import sys
 import math
 
-import pandas as pd
+import numpy as np
 
 import pystache
 
+from assets import page_assets
+from event_cache import read_results
+from fin_to_base_html import metadata_from_text, write_metadata
+from pax_factors import pax_table_for
+from run_matrix import JSON_PRECISION, load_run_matrix
+from template_cache import iter_render, load_template
+
 
 INVALID_TIME = 9999.999
 
+EVENT_PARTIALS = {
+    'style': 'templates/style.css',
+    'classResult': 'templates/event-class-result.html',
+    'rawResult': 'templates/raw-result.html',
+    'paxResult': 'templates/pax-result.html',
+}
+
 
 def main(args):
     parser = argparse.ArgumentParser()
@@ -52,87 +65,120 @@ def main(args):
                         default='',
                         help='The location of this event, e.g., '+
                         '"Canterbury Park, MN"')
+    parser.add_argument('-a',
+                        dest='assets_dir',
+                        default=None,
+                        help='Write the logo and style sheet to this ' +
+                        'directory, and link to them, rather than ' +
+                        'inlining them in the page.')
     config = parser.parse_args(args)
 
-    results = pd.read_json(config.results_filename,
-                           orient='records', lines=True)
+    results = read_results(config.results_filename)
     print('Read results from: %s' % config.results_filename)
     # print(results.head())
 
-    config.num_scored_times = determine_max_scored_times(results)
+    config.run_matrix = load_run_matrix(config.results_filename, results)
+    config.pax_factors = pax_table_for(config.results_filename)
+    config.num_scored_times = determine_max_scored_times(config.run_matrix)
     print('  number of scored_runs:   %d' % config.num_scored_times)
 
     # Set up the templating.
-    stache = pystache.Renderer(file_extension=False,
-                               partials={})
-    stache.partials['style'] = stache.load_template('templates/style.css')
-    stache.partials['classResult'] = \
-      stache.load_template('templates/event-class-result.html')
-    stache.partials['rawResult'] = \
-      stache.load_template('templates/raw-result.html')
-    stache.partials['paxResult'] = \
-      stache.load_template('templates/pax-result.html')
+    stache = make_renderer()
 
     # Prepare the data do go in the template.
-    options = {
-        'eventName': config.event_name,
-        'date': config.event_date,
-        'location': config.event_location,
-        'numScoredTimes': config.num_scored_times,
-        'numParticipants': len(results),
-        'numRuns': results['num_runs'].sum(),
-        'numDnfs': results['num_dnfs'].sum(),
-        'numCones': results['num_cones'].sum(),
-        'numDirtyRuns': results['num_dirty_runs'].sum()
-    }
+    options = prepare_event_summary(results, config)
 
     # Print the information for the user to verify.
     for key, value in options.items():
         print('  %-25s%s' % (key + ':', value))
 
-    options['logoDataUri'] = get_image_data_uri('templates/mac-logo-small.png')
+    options.update(page_assets(config.output_filename, config.assets_dir))
 
-    # Prepare class results
+    # Prepare class results. Each class table is prepared as it is
+    # written out.
     options['classes'] = prepare_all_class_results(results, config)
-    verify_class_results_counts(options)
 
     options['rawTimes'] = prepare_all_best_times(results, 'best_raw_time')
     options['paxTimes'] = prepare_all_best_times(results, 'best_pax_time')
 
     # Apply the template and write the result.
-    event_results_template = \
-      stache.load_template('templates/event-results.html')
-    html = stache.render(event_results_template, options)
+    event_results_template = load_template('templates/event-results.html',
+                                           EVENT_PARTIALS)
+    chunks = iter_render(stache, event_results_template, options)
     if config.output_filename:
         print('Writing results to: %s' % config.output_filename)
         with open(config.output_filename, 'wt') as output_file:
-            output_file.write(html)
+            output_file.writelines(chunks)
+        # So fin_to_base_html.py need not parse the page for these.
+        write_metadata(config.output_filename,
+                       event_metadata(config.event_name, options))
     else:
-        print(html)
+        sys.stdout.writelines(chunks)
+        print()
+    verify_class_results_counts(config, options)
 
 
 # ------------------------------------------------------------
 # Main functionality
 
-def determine_max_scored_times(results):
-    max_times = 0
-    for times in results['times']:
-        if len(times) > max_times:
-            max_times = len(times)
-    return max_times
+def determine_max_scored_times(run_matrix):
+    return run_matrix.max_scored
 
 
-def get_image_data_uri(filename):
-    with open(filename, 'rb') as in_file:
-        raw_data = in_file.read()
-        base64_data = base64.b64encode(raw_data)
-        data_uri = 'data:image/png;base64,' + base64_data.decode('utf-8')
-        return data_uri
+# The partials are parsed into the templates by load_template().
+def make_renderer():
+    return pystache.Renderer(file_extension=False, partials={})
 
 
-def prepare_all_class_results(results, config):
-    classes = []
+def prepare_event_summary(results, config):
+    return {
+        'eventName': config.event_name,
+        'date': config.event_date,
+        'location': config.event_location,
+        'numScoredTimes': config.num_scored_times,
+        'numParticipants': len(results),
+        'numRuns': results['num_runs'].sum(),
+        'numDnfs': results['num_dnfs'].sum(),
+        'numCones': results['num_cones'].sum(),
+        'numDirtyRuns': results['num_dirty_runs'].sum()
+    }
+
 
+# Returns the event metadata fin_to_base_html.py would find in the
+# page: the title, the event name and the event details, as they are
+# in templates/event-results.html.
+def event_metadata(event_name, options):
+    detail_texts = [
+        options['date'],
+        options['location'],
+        'participants: %s' % options['numParticipants'],
+        'runs: %s' % options['numRuns'],
+        'DNFs: %s' % options['numDnfs'],
+        'cones: %s' % options['numCones'],
+        'dirty runs: %s' % options['numDirtyRuns'],
+    ]
+    return metadata_from_text('%s Results' % event_name,
+                              ('%s Results' % event_name).strip(),
+                              [str(text or '').strip()
+                               for text in detail_texts])
+
+
+# Yields the class results for each class table. Counts the drivers in
+# them as it goes, for verify_class_results_counts().
+def prepare_all_class_results(results, config):
+    config.num_class_results = 0
+    for _, selected_results, class_name, label, time_type \
+        in select_class_results(results, config.pax_factors):
+        class_results = prepare_class_results(selected_results, class_name,
+                                              label, time_type, config)
+        config.num_class_results += len(class_results['results'])
+        yield class_results
+
+
+# Yields (key, results, class name, label, time type) for each class
+# table, in the order they appear on the page. The key is the
+# class_index for the index classes, and the class_name otherwise.
+def select_class_results(results, pax_table):
     # First accumulate the index classes.
     index_classes = [
         ('P', 'Pro'),
@@ -146,10 +192,7 @@ def prepare_all_class_results(results, config):
         # If we didn't have any drivers in this class, skip it.
         if selected_results.empty:
             continue
-        class_results = \
-          prepare_class_results(selected_results, \
-                                class_index, label, 'PAX', config)
-        classes.append(class_results)
+        yield class_index, selected_results, class_index, label, 'PAX'
 
     # Then accumulate the open classes. We split them by class_name
     # and sort them by pax_factor so that the fastest classes come
@@ -157,26 +200,18 @@ def prepare_all_class_results(results, config):
     open_results = results.loc[results['class_index'].isnull()]
     open_class_names = open_results['class_name'].unique()
 
-    # Here we look at the pax_factors for the actual results so that
-    # we don't need to load the factors into the config.
-    open_class_names = sorted(open_class_names,
-                              key=lambda x: get_pax_factor(open_results, x))
+    # A class that isn't in the PAX table for the season still has its
+    # factor in the results.
+    result_factors = dict(zip(open_results['class_name'],
+                              open_results['pax_factor']))
+    open_class_names = sorted(
+        open_class_names,
+        key=lambda x: pax_table.get(x, result_factors[x]))
 
     for class_name in open_class_names:
         selected_results = \
           open_results.loc[open_results['class_name'] == class_name]
-        class_results = \
-          prepare_class_results(selected_results, \
-                                class_name, 'Open', 'Raw', config)
-        classes.append(class_results)
-
-    return classes
-
-
-def get_pax_factor(results, class_name):
-    selected_results = \
-      results.loc[results['class_name'] == class_name]
-    return selected_results['pax_factor'].mean()
+        yield class_name, selected_results, class_name, 'Open', 'Raw'
 
 
 def prepare_class_results(results, class_name, label, time_type, config):
@@ -256,14 +291,21 @@ def get_times_for_template(row, time_type, config):
     # in each cell.
     times = [{} for _ in range(config.num_scored_times)]
 
-    # Loop over the times, formatting the times.
+    # Loop over the times, formatting the times. The row label is the
+    # row's position in the run matrix. Round to the precision of the
+    # JSON results so that a time landing right on a half thousandth
+    # is shown the same way whichever file it came from.
+    run_matrix = config.run_matrix
+    row_num = row.name
+    num_scored = run_matrix.num_scored[row_num]
     scored_times = []
     if time_type == 'PAX':
-        scored_times = row['pax_times']
+        scored_times = run_matrix.scored_pax[row_num, :num_scored]
     else:
-        scored_times = [raw_time for _, _, raw_time in row['times']]
-    penalties = [penalty for _, penalty, _ in row['times']]
-    best_time_nums = row['best_time_nums']
+        scored_times = run_matrix.scored_raw[row_num, :num_scored]
+    scored_times = np.round(scored_times, JSON_PRECISION).tolist()
+    penalties = run_matrix.scored_penalties[row_num, :num_scored].tolist()
+    best_time_nums = run_matrix.best_time_nums(row_num)
 
     for index, (scored_time, penalty) in enumerate(zip(scored_times, penalties)):
         time = {}
@@ -289,11 +331,8 @@ def format_time(time, penalty=None):
     return formatted_time
 
 
-def verify_class_results_counts(options):
-    total_count = 0
-    for class_results in options['classes']:
-        class_count = len(class_results['results'])
-        total_count = total_count + class_count
+def verify_class_results_counts(config, options):
+    total_count = config.num_class_results
     if total_count != options['numParticipants']:
         print('WARNING: Class results cover %d participants, but we had results for %d.' %
               (total_count, options['numParticipants']))
@@ -15,19 +15,24 @@
 #
 
 import argparse
-import base64
 import json
 import math
 import os
 import sys
 
-from collections import deque
-
-import numpy as np
 import pandas as pd
 
 import pystache
 
+from assets import page_assets
+from driver_identity import (SeasonNames, dealias_name, find_similar_names,
+                             load_driver_index)
+from event_cache import read_results
+from pax_factors import pax_table_for
+from results_warehouse import read_results as read_warehouse_results
+from season_points import SeasonTable, add_season_points
+from template_cache import iter_render, load_template
+
 
 def main(args):
     parser = argparse.ArgumentParser()
@@ -63,6 +68,18 @@ def main(args):
                         default=True,
                         type=bool,
                         help='If set, omit the MAC logo.')
+    parser.add_argument('-a',
+                        dest='assets_dir',
+                        default=None,
+                        help='Write the logo and style sheet to this ' +
+                        'directory, and link to them, rather than ' +
+                        'inlining them in the page.')
+    parser.add_argument('--db',
+                        dest='db_filename',
+                        default=None,
+                        help='Read the JSON event results from this results ' +
+                        'warehouse (see results_warehouse.py), rather than ' +
+                        'from the results files.')
     config = parser.parse_args(args)
     # Make the config a dictionary.
     config = vars(config)
@@ -73,28 +90,28 @@ def main(args):
             json_config = json.load(json_data)
             config.update(json_config)
 
+    # Load the PAX factors for the season, for ordering the classes.
+    config['pax_factors'] = pax_table_for(config['results_filenames'][0])
+
     # Load the alias information.
     with open('aliases.json', 'rt', encoding='utf-8') as json_data:
         config['aliases'] = json.load(json_data)
 
     # Read the event results files.
     results = load_results(config)
-    check_for_possible_duplicates(results)
+    check_for_possible_duplicates(results, config)
 
     # Set up the templating.
     stache = pystache.Renderer(file_extension=False,
                                partials={})
-    stache.partials['style'] = stache.load_template('templates/style.css')
-    stache.partials['classResult'] = \
-      stache.load_template('templates/series-class-result.html')
 
     # Prepare the data do go in the template.
     options = {
         'title': config['title'],
     }
     options['eventLabels'] = get_event_labels(config)
-    if config['use_mac_logo']:
-        options['logoDataUri'] = get_image_data_uri('templates/mac-logo-small.png')
+    options.update(page_assets(config['output_filename'],
+                               config['assets_dir'], config['use_mac_logo']))
 
     # This is the big one, where we organize all the data for the
     # template.
@@ -102,22 +119,30 @@ def main(args):
 
     # Apply the template and write the result.
     series_results_template = \
-      stache.load_template('templates/series-results.html')
-    html = stache.render(series_results_template, options)
+      load_template('templates/series-results.html', {
+          'style': 'templates/style.css',
+          'classResult': 'templates/series-class-result.html',
+      })
+    chunks = iter_render(stache, series_results_template, options)
     if config['output_filename']:
         print('Writing series results to: %s' % config['output_filename'])
         with open(config['output_filename'], 'wt') as output_file:
-            output_file.write(html)
+            output_file.writelines(chunks)
     else:
-        print(html)
+        sys.stdout.writelines(chunks)
+        print()
 
 
 # ------------------------------------------------------------
 # Helper functions
 
 def load_results(config):
-    # results = pd.DataFrame(index=['driver', 'series_class'])
-    results = None
+    # The scores for each event are collected here, and laid out into
+    # one table once they have all been read.
+    season_table = SeasonTable(['driver', 'series_class'],
+                               sort_single_event=False)
+    # The names so far, for matching up the names in later events.
+    season_names = SeasonNames()
 
     event_num = 1
     event_names = []
@@ -127,9 +152,12 @@ def load_results(config):
 
         print('Reading results for %s:' % event_name)
         print('  %s' % results_filename)
-        if results_filename.endswith('.json'):
-            event_results = pd.read_json(results_filename,
-                                         orient='records', lines=True)
+        if results_filename.endswith('.json') and config['db_filename']:
+            event_results = read_warehouse_results(config['db_filename'],
+                                                   results_filename,
+                                                   config['aliases'])
+        elif results_filename.endswith('.json'):
+            event_results = read_results(results_filename)
         elif results_filename.endswith('.xlsx'):
             event_results = pd.read_excel(results_filename)
         else:
@@ -150,11 +178,9 @@ def load_results(config):
                 event_results['FirstName'] + ' ' + event_results['LastName']
             event_results['driver'] = event_results['driver'].str.strip()
 
-        if results is not None:
-            known_names = \
-                dict((name.lower(), name) for name in results['driver'])
+        if season_names.num_events:
             event_results['driver'] = \
-                event_results['driver'].apply(lookup_name, args=[known_names])
+                event_results['driver'].apply(season_names.lookup)
 
         # Drop rows without names.
         event_results = event_results.dropna(subset=['driver'])
@@ -182,27 +208,19 @@ def load_results(config):
                                             axis=1,
                                             args=[event_class_groups, event_name, config])
 
-        # Merge these results into the main results. We are merging on
-        # the shared columns, so be careful what goes into the
-        # sub-dataframe.
-        results_to_merge = event_results[['driver', 'series_class', event_name]]
-        # print(results_to_merge)
-        if results is None:
-            results = results_to_merge
-        else:
-            results = results.merge(results_to_merge,
-                                    how='outer')
+        # Add these results to the main results. They are matched up
+        # on the driver and series class.
+        season_table.add_event(event_name, event_results)
+        season_names.add_event(event_results['driver'].tolist())
 
         event_num = event_num + 1
+    results = season_table.to_frame()
 
     # Compute the season points (and related summary values). These
     # are what we're really trying to get to.
-    results = results.apply(add_season_points,
-                            axis=1,
-                            args=[event_names, config])
-
-    # Compute the BTP points.
-    results = results.apply(add_btp_scores, axis=1, args=[event_names, config])
+    # The BTP points come along with them.
+    results = add_season_points(results, event_names, config['num_events'],
+                                config['num_btp_events'])
 
     # Record the event names on the config for later use.
     config['event_names'] = event_names
@@ -212,26 +230,6 @@ def load_results(config):
     return results
 
 
-def lookup_name(orig_name, known_names):
-    if isinstance(orig_name, str):
-        # If this is "last, first", make it "first last"
-        parts = orig_name.split(',')
-        if len(parts) == 2:
-            orig_name = parts[1].strip() + ' ' + parts[0].strip()
-
-        lower_name = orig_name.lower()
-        if lower_name in known_names:
-            return known_names[lower_name]
-    return orig_name
-
-
-def dealias_name(name, aliases):
-    lower_name = name.lower()
-    if lower_name in aliases:
-        return aliases[lower_name]
-    return name
-
-
 def clean_up_time(orig_time):
     if isinstance(orig_time, str):
         # First try to handle cases where the time is in min:second.frac_second.
@@ -295,89 +293,38 @@ def add_series_points(row, event_class_groups, event_name, _):
     return row
 
 
-def add_season_points(row, event_names, config):
-    # FIXME Write down exactly which events we are keeping, so that we
-    # can highlight these in the results.
-
-    # Decide how many of these scores to keep.
-    num_actual_events = row[event_names].count()
-    num_scores_to_keep = min(num_actual_events, config['num_btp_events'])
-
-    # Get the keeper scores.
-    scores = [0.0 if math.isnan(score) else score for score in row[event_names]]
-    scores = sorted(scores, reverse=True)
-    kept_scores = scores[:num_scores_to_keep]
-
-    # Record the season values.
-    row['num_actual_events'] = num_actual_events
-    row['num_kept_events'] = num_scores_to_keep
-    row['total_points'] = sum(kept_scores)
-    row['avg_points'] = np.mean(kept_scores)
-
-    return row
-
-
-def add_btp_scores(row, event_names, config):
-    actual_event_count = len(event_names)
-
-    # Assume 100.0 points for each remaining event.
-    num_remaining_events = config['num_events'] - actual_event_count
-    if num_remaining_events > config['num_btp_events']:
-        num_remaining_events = config['num_btp_events']
-    best_remaining_score = 100.0 * num_remaining_events
-
-    # Get the keeper scores.
-    scores = [0.0 if math.isnan(score) else score for score in row[event_names]]
-    scores = sorted(scores, reverse=True)
-
-    num_scores_to_keep = config['num_btp_events'] - num_remaining_events
-    kept_scores = scores[:num_scores_to_keep]
-
-    kept_score = sum(kept_scores)
-
-    # Record the result
-    row['btp'] = kept_score + best_remaining_score
-    return row
-
-
-def check_for_possible_duplicates(results):
+# Reports the drivers in more than one class, and the names that are
+# probably the same driver, with how alike they are (from 0 to 1).
+# Drivers new this season are also checked against the drivers of past
+# seasons.
+def check_for_possible_duplicates(results, config):
     print('Looking for possible duplicates')
-    results['partial_name'] = results['driver'].apply(get_partial_name)
-    sorted_results = results.sort_values('partial_name')
-    for ((_, row1), (_, row2)) in window(sorted_results.iterrows()):
-        name1 = row1['partial_name']
-        name2 = row2['partial_name']
-        common = os.path.commonprefix([name1, name2])
-        # print('%s == %s?  %s' % (str(name1), str(name2), common))
-        threshold = 1.0 * min(len(name1), len(name2))
-        if len(common) >= threshold:
-            # print('Possible duplicates:')
-            # print('  %s' % str(row1))
-            # print('  %s' % str(row2))
-            if row1['series_class'] != row2['series_class']:
-                # The driver probably drove in multiple classes.
-                print('     Multiple classes:  %s (%s vs. %s)' %
-                      (row1['driver'], row1['series_class'],
-                       row2['series_class']))
-            else:
-                print('  => DUPLICATE?         %s, %s' %
-                      (row1['driver'], row2['driver']))
-
-
-def get_partial_name(name):
-    parts = deque(name.split())
-    parts.rotate()
-    return ''.join(parts).lower()
-
-
-# From: https://stackoverflow.com/a/6822761
-def window(seq, length=2):
-    iterator = iter(seq)
-    win = deque((next(iterator, None) for _ in range(length)), maxlen=length)
-    yield win
-    for element in iterator:
-        win.append(element)
-        yield win
+    driver_classes = results.groupby('driver', sort=True)['series_class']
+    for driver, classes in driver_classes:
+        if len(classes) > 1:
+            # The driver probably drove in multiple classes.
+            print('     Multiple classes:  %s (%s)' %
+                  (driver, ' vs. '.join(sorted(classes))))
+
+    drivers = list(driver_classes.groups)
+    for score, name1, name2 in find_similar_names(drivers):
+        print('  => DUPLICATE? (%0.2f)  %s, %s' % (score, name1, name2))
+
+    driver_index = load_driver_index()
+    season = os.path.dirname(config['results_filenames'][0])
+    for driver in drivers:
+        driver_id = driver_index.canonical_id(driver)
+        if driver_id and \
+           set(driver_index.drivers[driver_id]['seasons']) - set([season]):
+            # We have seen them before.
+            continue
+        for score, canonical_id in driver_index.similar(driver)[:3]:
+            if canonical_id == driver_id:
+                continue
+            print('  => NEW DRIVER? (%0.2f) %s, seen as %s in %s' %
+                  (score, driver, driver_index.canonical_name(canonical_id),
+                   ', '.join(driver_index.drivers[canonical_id]['seasons'])
+                   or 'aliases.json'))
 
 
 def prepare_all_class_results(results_df, config):
@@ -387,8 +334,9 @@ def prepare_all_class_results(results_df, config):
     # class.
     class_groups = results_df.groupby('series_class')
 
+    pax_table = config['pax_factors']
     sorted_class_names = sorted(class_groups.groups.keys(),
-                                key=cmp_class,
+                                key=lambda x: cmp_class(x, pax_table),
                                 reverse=True)
     # print(sorted_class_names)
     classes = []
@@ -403,14 +351,15 @@ def prepare_all_class_results(results_df, config):
     return classes
 
 
-def cmp_class(class_name):
+def cmp_class(class_name, pax_table):
     if class_name == 'P':
         return 999.0
     if class_name == 'Z':
         return 998.0
-    # FIXME We would like to look up the PAX factor for the class_name
-    # and return it here.
-    return 0.0
+    # The classes are sorted in reverse, and we want the fastest
+    # classes (the lowest PAX factors) first, just like in the event
+    # results. Classes we don't know go last.
+    return -pax_table.get(class_name, math.inf)
 
 
 def prepare_class_results(class_name, class_group, config):
@@ -510,16 +459,6 @@ def get_event_labels(config):
     return event_labels
 
 
-# FIXME This is duplicated with the publish_results.py script, we
-# should put them in a common place.
-def get_image_data_uri(filename):
-    with open(filename, 'rb') as in_file:
-        raw_data = in_file.read()
-        base64_data = base64.b64encode(raw_data)
-        data_uri = 'data:image/png;base64,' + base64_data.decode('utf-8')
-        return data_uri
-
-
 # ------------------------------------------------------------
 # This is the magic that runs the main function when this is invoked
 # as a script.
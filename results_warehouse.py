@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+#
+# pylint: disable=missing-docstring
+#
+# Every season's event results, loaded into one SQLite database
+# (results-warehouse.sqlite) so that questions like "every result for
+# this driver in CS since 2019" are a query rather than a script
+# reading every JSON in every season directory.
+#
+# The tables are:
+#
+#   events   One row per event: the season, the results file it was
+#            loaded from (e.g., 2026/2026-mowog1.json), and the name,
+#            date and location from the season's commands.txt, where
+#            it has one.
+#   drivers  One row per driver, by canonical ID (see
+#            driver_identity.py), with their canonical name.
+#   entries  One row per driver per event: their class, car, times and
+#            DOTY points, and the line of the JSON results it came from.
+#   runs     One row per run: the time and penalty as timed.
+#
+# The entries are indexed by driver and class, and the events by date
+# and season.
+#
+# Loading only reads the results files that have changed since they
+# were last loaded (by SHA-256), so it is quick to run again after
+# every event. Like the other caches, the database is a local build
+# artifact and is not checked in.
+#
+# publish_doty.py and publish_series.py can read the event results from
+# the database, rather than from the JSON files, with --db. The results
+# files are then the names they were loaded under. If a results file
+# has changed since it was loaded (or was never loaded), it is loaded
+# again first, so the standings are never made from old results.
+#
+# Invoke this as:
+# pylint: disable=line-too-long
+#
+# ./results_warehouse.py -l                 # Load every season.
+# ./results_warehouse.py -l 2026            # Load one season.
+# ./results_warehouse.py -r 'Jeffrey Rye' -c CS -f 2019
+# ./results_warehouse.py -q "SELECT season, COUNT(*) FROM events GROUP BY season"
+#
+# pylint: enable=line-too-long
+#
+
+import argparse
+import contextlib
+import datetime
+import glob
+import hashlib
+import io
+import json
+import os
+import re
+import sqlite3
+import sys
+
+import pandas as pd
+
+from driver_identity import (dealias_name, driver_id, history_filenames,
+                             is_results_filename)
+from pax_factors import year_of
+
+
+WAREHOUSE_FILENAME = 'results-warehouse.sqlite'
+
+SCHEMA = '''
+PRAGMA foreign_keys = ON;
+
+CREATE TABLE IF NOT EXISTS events (
+    event_id INTEGER PRIMARY KEY,
+    season INTEGER,
+    results_filename TEXT NOT NULL UNIQUE,
+    source_hash TEXT NOT NULL,
+    name TEXT,
+    date TEXT,
+    date_text TEXT,
+    location TEXT
+);
+CREATE INDEX IF NOT EXISTS events_by_season ON events (season);
+CREATE INDEX IF NOT EXISTS events_by_date ON events (date);
+
+CREATE TABLE IF NOT EXISTS drivers (
+    driver_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS entries (
+    entry_id INTEGER PRIMARY KEY,
+    event_id INTEGER NOT NULL REFERENCES events ON DELETE CASCADE,
+    line_num INTEGER NOT NULL,
+    driver_id TEXT REFERENCES drivers,
+    driver TEXT,
+    class_name TEXT,
+    car_number TEXT,
+    car TEXT,
+    final_time REAL,
+    best_raw_time REAL,
+    best_pax_time REAL,
+    doty_points REAL,
+    doty_raw_points REAL,
+    record TEXT NOT NULL,
+    UNIQUE (event_id, line_num)
+);
+CREATE INDEX IF NOT EXISTS entries_by_driver ON entries (driver_id);
+CREATE INDEX IF NOT EXISTS entries_by_class ON entries (class_name);
+
+CREATE TABLE IF NOT EXISTS runs (
+    entry_id INTEGER NOT NULL REFERENCES entries ON DELETE CASCADE,
+    run_num INTEGER NOT NULL,
+    time REAL,
+    penalty TEXT,
+    PRIMARY KEY (entry_id, run_num)
+);
+'''
+
+RUN_COL_RE = re.compile(r'^Run (\d+)$')
+
+# How the dates are written in commands.txt, e.g., 'Sunday, 14 June,
+# 2026'.
+DATE_FORMATS = ['%A, %d %B, %Y', '%A, %B %d, %Y', '%d %B, %Y', '%B %d, %Y',
+                '%Y-%m-%d']
+
+RESULTS_COLUMNS = ['Season', 'Date', 'Event', 'Driver', 'Class', 'Car',
+                   'Raw', 'PAX', 'DOTY']
+
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-w',
+                        dest='db_filename',
+                        default=WAREHOUSE_FILENAME,
+                        help='The warehouse database.')
+    parser.add_argument('-l',
+                        dest='load',
+                        nargs='*',
+                        metavar='SEASON_OR_RESULTS',
+                        help='Load the results of these season directories ' +
+                        'or results files, or every season if none are ' +
+                        'given.')
+    parser.add_argument('-r',
+                        dest='driver',
+                        help='Show every result for this driver.')
+    parser.add_argument('-c',
+                        dest='class_name',
+                        help='Only show the results in this class.')
+    parser.add_argument('-f',
+                        dest='from_season',
+                        type=int,
+                        help='Only show the results from this season on.')
+    parser.add_argument('-q',
+                        dest='sql',
+                        help='Run this SQL query, and show the results.')
+    config = parser.parse_args(args)
+
+    aliases = load_aliases()
+
+    if config.load is not None:
+        load_results_files(config.db_filename, aliases,
+                           results_filenames_for(config.load))
+
+    if config.sql:
+        with contextlib.closing(connect(config.db_filename)) as connection:
+            cursor = connection.execute(config.sql)
+            columns = [column[0] for column in cursor.description or []]
+            print_rows(columns, cursor.fetchall())
+    elif config.driver or config.class_name or config.from_season:
+        with contextlib.closing(connect(config.db_filename)) as connection:
+            rows = find_results(connection, aliases, config.driver,
+                                config.class_name, config.from_season)
+        print_rows(RESULTS_COLUMNS, rows)
+
+
+# ------------------------------------------------------------
+# Loading
+
+def connect(db_filename=WAREHOUSE_FILENAME):
+    connection = sqlite3.connect(db_filename, timeout=30.0)
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def load_aliases():
+    with open('aliases.json', 'rt', encoding='utf-8') as json_data:
+        return json.load(json_data)
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+# Returns the results files of season directories (or the results files
+# themselves), or of every season.
+def results_filenames_for(names):
+    if not names:
+        return history_filenames()
+    filenames = []
+    for name in names:
+        if os.path.isdir(name):
+            pattern = os.path.join(glob.escape(os.path.normpath(name)),
+                                   '*.json')
+            filenames.extend(sorted(filename
+                                    for filename in glob.glob(pattern)
+                                    if is_results_filename(filename)))
+        else:
+            filenames.append(os.path.normpath(name))
+    return filenames
+
+
+def load_results_files(db_filename, aliases, results_filenames):
+    event_details = season_event_details(results_filenames)
+    with contextlib.closing(connect(db_filename)) as connection:
+        for results_filename in results_filenames:
+            with connection:
+                load_results_file(connection, aliases, results_filename,
+                                  event_details.get(results_filename, {}))
+
+
+# Loads one results file, unless it is already loaded as it is.
+def load_results_file(connection, aliases, results_filename, details):
+    with open(results_filename, 'rb') as in_file:
+        data = in_file.read()
+    source_hash = hash_bytes(data)
+    row = connection.execute(
+        'SELECT source_hash FROM events WHERE results_filename = ?',
+        (results_filename,)).fetchone()
+    if row and row[0] == source_hash:
+        return
+
+    try:
+        lines = [line for line in data.decode('utf-8').split('\n') if line]
+        records = [json.loads(line) for line in lines]
+    except ValueError as e:
+        print('WARNING: Could not load %s: %s' % (results_filename, e))
+        return
+    if not all(isinstance(record, dict) and
+               ('FirstName' in record or 'NAME' in record)
+               for record in records):
+        print('WARNING: %s is not event results' % results_filename)
+        return
+
+    print('Loading %s' % results_filename)
+    connection.execute('DELETE FROM events WHERE results_filename = ?',
+                       (results_filename,))
+    date_text = details.get('date')
+    cursor = connection.execute(
+        'INSERT INTO events (season, results_filename, source_hash, name, ' +
+        'date, date_text, location) VALUES (?, ?, ?, ?, ?, ?, ?)',
+        (year_of(results_filename), results_filename, source_hash,
+         details.get('name'), parse_date(date_text), date_text,
+         details.get('location')))
+    event_id = cursor.lastrowid
+
+    for line_num, (line, record) in enumerate(zip(lines, records)):
+        name = record_driver(record, aliases)
+        canonical_id = driver_id(name) if name else None
+        if canonical_id:
+            connection.execute(
+                'INSERT OR IGNORE INTO drivers VALUES (?, ?)',
+                (canonical_id, name))
+        cursor = connection.execute(
+            'INSERT INTO entries (event_id, line_num, driver_id, driver, ' +
+            'class_name, car_number, car, final_time, best_raw_time, ' +
+            'best_pax_time, doty_points, doty_raw_points, record) ' +
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (event_id, line_num, canonical_id, name,
+             record.get('class_name') or record.get('Class'),
+             as_text(record.get('CarNumber')), record.get('Car'),
+             record.get('final_time'), record.get('best_raw_time'),
+             record.get('best_pax_time'), record.get('doty_points'),
+             record.get('doty_raw_points'), line))
+        connection.executemany(
+            'INSERT INTO runs VALUES (?, ?, ?, ?)',
+            [(cursor.lastrowid, run_num, time, as_text(penalty))
+             for run_num, time, penalty in record_runs(record)])
+
+
+def record_driver(record, aliases):
+    if isinstance(record.get('NAME'), str):
+        name = record['NAME']
+    else:
+        names = [record.get(col) for col in ('FirstName', 'LastName')]
+        name = ' '.join(name if isinstance(name, str) else ''
+                        for name in names)
+    name = name.strip()
+    return dealias_name(name, aliases) if name else None
+
+
+# Returns [(run number, time, penalty)] for the runs that were taken.
+def record_runs(record):
+    runs = []
+    for col, time in record.items():
+        match = RUN_COL_RE.match(col)
+        if not match:
+            continue
+        penalty = record.get('%s Pen' % col)
+        if time is None and penalty is None:
+            continue
+        runs.append((int(match.group(1)), time, penalty))
+    runs.sort()
+    return runs
+
+
+def as_text(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def parse_date(date_text):
+    if not date_text:
+        return None
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(date_text,
+                                              date_format).date().isoformat()
+        except ValueError:
+            pass
+    return None
+
+
+# Returns {results filename: {'name':, 'date':, 'location':}} from the
+# publish_event.py commands of the seasons of the results files.
+def season_event_details(results_filenames):
+    # pylint: disable=import-outside-toplevel
+    from build_season import load_steps, option_value, path_args
+
+    details = {}
+    season_dirs = sorted(set(os.path.dirname(filename)
+                             for filename in results_filenames))
+    for season_dir in season_dirs:
+        commands_filename = os.path.join(season_dir, 'commands.txt')
+        if not os.path.exists(commands_filename):
+            continue
+        for step in load_steps(commands_filename):
+            if step.script != 'publish_event.py':
+                continue
+            for results_filename in path_args(step.args, ('.json',)):
+                details[os.path.normpath(results_filename)] = {
+                    'name': option_value(step.args, '-n'),
+                    'date': option_value(step.args, '-d'),
+                    'location': option_value(step.args, '-l'),
+                }
+    return details
+
+
+# ------------------------------------------------------------
+# Reading
+
+# Returns the results loaded from results_filename, just as
+# event_cache.read_results() would return them from the file. If the
+# file is there and has changed since it was loaded, it is loaded again
+# first. Raises ValueError if it cannot be.
+def read_results(db_filename, results_filename, aliases=None):
+    results_filename = os.path.normpath(results_filename)
+    with contextlib.closing(connect(db_filename)) as connection:
+        loaded_hash = source_hash_of(connection, results_filename)
+        if os.path.exists(results_filename):
+            with open(results_filename, 'rb') as in_file:
+                source_hash = hash_bytes(in_file.read())
+            if loaded_hash != source_hash:
+                print('%s %s into %s' %
+                      (results_filename,
+                       'was not loaded' if loaded_hash is None else
+                       'changed since it was loaded', db_filename))
+                with connection:
+                    load_results_file(
+                        connection,
+                        load_aliases() if aliases is None else aliases,
+                        results_filename,
+                        season_event_details([results_filename]).get(
+                            results_filename, {}))
+                loaded_hash = source_hash_of(connection, results_filename)
+                if loaded_hash != source_hash:
+                    raise ValueError('Could not load %s into %s' %
+                                     (results_filename, db_filename))
+        elif loaded_hash is None:
+            raise ValueError('%s has not been loaded into %s' %
+                             (results_filename, db_filename))
+        lines = [row[0] for row in connection.execute(
+            'SELECT record FROM entries JOIN events USING (event_id) ' +
+            'WHERE results_filename = ? ORDER BY line_num',
+            (results_filename,))]
+    return pd.read_json(io.StringIO('\n'.join(lines)), orient='records',
+                        lines=True)
+
+
+def source_hash_of(connection, results_filename):
+    row = connection.execute(
+        'SELECT source_hash FROM events WHERE results_filename = ?',
+        (results_filename,)).fetchone()
+    return row[0] if row else None
+
+
+# ------------------------------------------------------------
+# Queries
+
+def find_results(connection, aliases, driver=None, class_name=None,
+                 from_season=None):
+    conditions = []
+    params = []
+    if driver:
+        conditions.append('entries.driver_id = ?')
+        params.append(driver_id(dealias_name(driver, aliases)))
+    if class_name:
+        conditions.append('entries.class_name = ?')
+        params.append(class_name)
+    if from_season:
+        conditions.append('events.season >= ?')
+        params.append(from_season)
+    return connection.execute('''
+        SELECT events.season, events.date,
+               COALESCE(events.name, events.results_filename),
+               entries.driver, entries.class_name, entries.car,
+               entries.best_raw_time, entries.best_pax_time,
+               entries.doty_points
+        FROM entries JOIN events USING (event_id)
+        WHERE ''' + (' AND '.join(conditions) or '1') + '''
+        ORDER BY events.season, events.date, events.results_filename,
+                 entries.line_num''', params).fetchall()
+
+
+def print_rows(columns, rows):
+    texts = [[format_value(value) for value in row] for row in rows]
+    widths = [max([len(column)] + [len(row[num]) for row in texts])
+              for num, column in enumerate(columns)]
+    print('  '.join(column.ljust(width)
+                    for column, width in zip(columns, widths)).rstrip())
+    for row in texts:
+        print('  '.join(value.ljust(width)
+                        for value, width in zip(row, widths)).rstrip())
+    print('(%d rows)' % len(rows))
+
+
+def format_value(value):
+    if value is None:
+        return '-'
+    if isinstance(value, float):
+        return '%0.3f' % value
+    return str(value)
+
+
+# ------------------------------------------------------------
+# This is the magic that runs the main function when this is invoked
+# as a script.
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
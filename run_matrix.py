@@ -0,0 +1,299 @@
+#
+# pylint: disable=missing-docstring
+#
+# A compact representation of every run in an event, shared by
+# compute_results.py and the publishing scripts. Rather than holding
+# each driver's runs as Python lists of (scratch, penalty, raw)
+# tuples, an event with D drivers and R run columns is held as
+# fixed-width typed arrays:
+#
+#   scratch    float64 (D x R)  The scratch time. NaN where there was
+#                               no run.
+#   codes      int8    (D x R)  The penalty code, one of the PEN_*
+#                               values below.
+#   cones      int8    (D x R)  The number of cones.
+#   pax_factor float64 (D,)     The PAX factor for each driver.
+#   best_runs  int8    (D x 2)  The 0-based index (into the scored
+#                               runs) of the best run, and of the best
+#                               afternoon run for split Pro scoring.
+#                               -1 where unused.
+#
+# The scored runs are all of the runs that were not rerun, in run
+# order. Raw and PAX times are derived from the arrays above, they are
+# never stored.
+#
+# On disk, compute_results.py writes these arrays to an uncompressed
+# .npz file next to the JSON results (2026/mowog1.json gets
+# 2026/mowog1.runs.npz), along with a format_version scalar. The rows
+# are in the same order as the lines of the JSON file. Every array is
+# plain numeric data, so loading it never unpickles anything.
+#
+
+import os
+import re
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+
+INVALID_TIME = 9999.999
+
+FORMAT_VERSION = 1
+
+# The number of decimal places pandas writes to the JSON results.
+JSON_PRECISION = 10
+
+RUN_COL_RE = re.compile(r'^run\s+(\d+)$', re.IGNORECASE)
+
+# What a penalty cell means for its run.
+PEN_CLEAN = 0
+PEN_CONES = 1
+PEN_DNF = 2
+PEN_OFF = 3
+PEN_DQ = 4
+PEN_RERUN = 5
+
+INVALID_PENALTIES = {'DNF': PEN_DNF, 'OFF': PEN_OFF, 'DQ': PEN_DQ}
+
+PENALTY_NAMES = {
+    PEN_DNF: 'DNF',
+    PEN_OFF: 'OFF',
+    PEN_DQ: 'DQ',
+    PEN_RERUN: 'RERUN',
+}
+
+
+class RunMatrix:
+
+    def __init__(self, scratch, codes, cones, pax_factor=None, best_runs=None):
+        self.scratch = scratch
+        self.codes = codes
+        self.cones = cones
+        num_drivers = len(scratch)
+        if pax_factor is None:
+            pax_factor = np.ones(num_drivers)
+        self.pax_factor = pax_factor
+        if best_runs is None:
+            best_runs = np.full((num_drivers, 2), -1, dtype=np.int8)
+        self.best_runs = best_runs
+
+    # --------------------------------------------------------
+    # Construction
+
+    @classmethod
+    def from_columns(cls, results, run_cols=None):
+        if run_cols is None:
+            run_cols = identify_run_cols(results)
+        run_names = [run_col for run_col, _ in run_cols]
+        pen_names = [pen_col for _, pen_col in run_cols]
+
+        scratch = results[run_names].to_numpy(dtype=float)
+        # A zero time is not a run either.
+        scratch[scratch == 0.0] = np.nan
+        present = ~np.isnan(scratch)
+
+        codes = np.zeros(scratch.shape, dtype=np.int8)
+        cones = np.zeros(scratch.shape, dtype=np.int8)
+
+        # Each column only holds a handful of distinct penalty values,
+        # so interpret each of those once and scatter the answers back
+        # out. compute_results.py reads them as categoricals, which
+        # have already done the factorizing for us.
+        for col_num, pen_name in enumerate(pen_names):
+            rows = np.flatnonzero(present[:, col_num])
+            column = results[pen_name]
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                # A missing value has code -1, which picks the None on
+                # the end.
+                value_codes = column.cat.codes.to_numpy()[rows]
+                uniques = list(column.cat.categories) + [None]
+            else:
+                values = column.to_numpy(dtype=object)[rows]
+                value_codes, uniques = pd.factorize(values,
+                                                    use_na_sentinel=False)
+            parsed = [parse_penalty(value) for value in uniques]
+            codes[rows, col_num] = \
+              np.array([code for code, _ in parsed], dtype=np.int8)[value_codes]
+            cones[rows, col_num] = \
+              np.array([count for _, count in parsed], dtype=np.int8)[value_codes]
+
+        return cls(scratch, codes, cones)
+
+    @classmethod
+    def from_results(cls, results):
+        # Rebuild the matrix from the columns of a JSON results file,
+        # for results written before the .npz files existed.
+        if not isinstance(results, pd.DataFrame):
+            results = pd.DataFrame.from_records(results)
+        matrix = cls.from_columns(results)
+        if 'pax_factor' in results:
+            matrix.pax_factor = results['pax_factor'].to_numpy(dtype=float)
+        if 'best_time_nums' in results:
+            for row_num, best_time_nums in enumerate(results['best_time_nums']):
+                for slot, best_time_num in enumerate(best_time_nums[:2]):
+                    matrix.best_runs[row_num, slot] = best_time_num - 1
+        return matrix
+
+    @classmethod
+    def load(cls, filename):
+        with np.load(filename, allow_pickle=False) as data:
+            if int(data['format_version']) != FORMAT_VERSION:
+                raise ValueError('Unsupported run matrix format %d in %s' %
+                                 (int(data['format_version']), filename))
+            return cls(data['scratch'], data['codes'], data['cones'],
+                       data['pax_factor'], data['best_runs'])
+
+    def save(self, filename):
+        # Pass a file object so that numpy doesn't tack on another
+        # .npz extension.
+        with open(filename, 'wb') as out_file:
+            np.savez(out_file,
+                     format_version=np.array(FORMAT_VERSION),
+                     scratch=self.scratch,
+                     codes=self.codes,
+                     cones=self.cones,
+                     pax_factor=np.asarray(self.pax_factor, dtype=float),
+                     best_runs=self.best_runs)
+
+    def select(self, mask):
+        return RunMatrix(self.scratch[mask], self.codes[mask], self.cones[mask],
+                         self.pax_factor[mask], self.best_runs[mask])
+
+    @classmethod
+    def concat(cls, matrices):
+        # The matrices must all have the same run columns.
+        return cls(*[np.concatenate([getattr(matrix, name)
+                                     for matrix in matrices])
+                     for name in ('scratch', 'codes', 'cones', 'pax_factor',
+                                  'best_runs')])
+
+    # --------------------------------------------------------
+    # All runs (drivers x run columns)
+
+    def __len__(self):
+        return len(self.scratch)
+
+    @property
+    def num_run_cols(self):
+        return self.scratch.shape[1]
+
+    @cached_property
+    def present(self):
+        return ~np.isnan(self.scratch)
+
+    @cached_property
+    def raw(self):
+        # Add two seconds for each cone, and nullify the time for DNFs
+        # and such.
+        raw = self.scratch + 2.0 * self.cones
+        raw[is_invalid(self.codes)] = INVALID_TIME
+        return raw
+
+    @cached_property
+    def scored(self):
+        return self.present & (self.codes != PEN_RERUN)
+
+    @cached_property
+    def penalties(self):
+        # The penalty as we have always written it: the cone count, or
+        # the name of the penalty that voided the run.
+        penalties = self.cones.astype(object)
+        for code, name in PENALTY_NAMES.items():
+            penalties[self.codes == code] = name
+        return penalties
+
+    # --------------------------------------------------------
+    # Scored runs, left-packed so that column N is the driver's
+    # (N+1)th scored run. These are padded out to max_scored columns.
+
+    @cached_property
+    def num_scored(self):
+        return self.scored.sum(axis=1)
+
+    @cached_property
+    def max_scored(self):
+        return int(self.num_scored.max(initial=0))
+
+    @cached_property
+    def scored_cols(self):
+        width = max(self.max_scored, 1)
+        return np.argsort(~self.scored, axis=1, kind='stable')[:, :width]
+
+    @cached_property
+    def scored_valid(self):
+        return np.arange(self.scored_cols.shape[1]) < self.num_scored[:, None]
+
+    def pack_scored(self, values, fill=np.nan):
+        packed = np.take_along_axis(values, self.scored_cols, axis=1)
+        return np.where(self.scored_valid, packed, fill)
+
+    @cached_property
+    def scored_raw(self):
+        return self.pack_scored(self.raw)
+
+    @cached_property
+    def scored_pax(self):
+        scored_raw = self.scored_raw
+        return np.where(scored_raw < INVALID_TIME,
+                        scored_raw * np.asarray(self.pax_factor)[:, None],
+                        scored_raw)
+
+    @cached_property
+    def scored_penalties(self):
+        return self.pack_scored(self.penalties, None)
+
+    def best_time_nums(self, row_num):
+        # 1-based, to match best_time_nums in the JSON results.
+        return [int(best_run) + 1 for best_run in self.best_runs[row_num]
+                if best_run >= 0]
+
+
+# ------------------------------------------------------------
+# Helper functions
+
+def identify_run_cols(results):
+    run_cols = []
+    for col in results.columns:
+        match = RUN_COL_RE.match(col)
+        if match:
+            pen_col = '%s Pen' % match.group(0)
+            run_cols.append((col, pen_col))
+    return run_cols
+
+
+# Returns (code, cone count) for a single penalty cell.
+def parse_penalty(penalty):
+    if not penalty or (isinstance(penalty, float) and np.isnan(penalty)):
+        return PEN_CLEAN, 0
+    if penalty in INVALID_PENALTIES:
+        # This is a valid run, but a useless time.
+        return INVALID_PENALTIES[penalty], 0
+    if str(penalty).startswith('RERUN'):
+        # This is not a valid time.
+        return PEN_RERUN, 0
+    # Has cones.
+    cones = int(penalty)
+    return (PEN_CONES if cones > 0 else PEN_CLEAN), cones
+
+
+def is_invalid(codes):
+    return (codes >= PEN_DNF) & (codes <= PEN_DQ)
+
+
+def sidecar_filename(results_filename):
+    base, _ = os.path.splitext(results_filename)
+    return base + '.runs.npz'
+
+
+# Prefer the .npz written by compute_results.py. Fall back to the
+# columns of the results themselves if it is missing, older than the
+# results, or doesn't line up with them.
+def load_run_matrix(results_filename, results):
+    npz_filename = sidecar_filename(results_filename)
+    if os.path.exists(npz_filename) and \
+       os.path.getmtime(npz_filename) >= os.path.getmtime(results_filename):
+        matrix = RunMatrix.load(npz_filename)
+        if len(matrix) == len(results):
+            return matrix
+    return RunMatrix.from_results(results)
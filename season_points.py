@@ -0,0 +1,167 @@
+#
+# pylint: disable=missing-docstring
+#
+# The season totals shared by publish_doty.py, publish_doty_raw.py and
+# publish_series.py. Every driver scores points at each event they
+# attend, and their season score is the total of their best
+# num_btp_events scores. BTP (best theoretical points) is what they
+# would total if they scored 100 points at every event still to come.
+#
+# Rather than working through the drivers one row at a time, the
+# scores are taken as one (drivers x events) matrix, NaN where a driver
+# missed an event, and sorted once. Everything else is read off the
+# sorted matrix:
+#
+#   num_actual_events  The events the driver attended.
+#   num_kept_events    How many of those count towards the season.
+#   total_points       The total of the kept scores.
+#   avg_points         The average of the kept scores.
+#   kept_events        The names of the kept events (optional).
+#   btp                The best theoretical points.
+#
+# The sort is stable, so when two events have the same score the
+# earlier one is kept, as it always has been. The totals are summed
+# best score first, one event at a time, so they come out to exactly
+# the same floating point values as summing each driver's list did
+# (and the averages likewise).
+#
+# SeasonTable builds the (drivers x events) table in the first place.
+# It collects each event's scores as it is read, keyed by driver (and
+# class, for the series), and lays them out in one go at the end. This
+# gives the same table as outer merging each event into the table so
+# far, without copying the table for every event:
+#  - The rows are sorted by key.
+#  - A driver listed twice in an event gets a row for each combination
+#    of their scores, as a merge would give them.
+#  - A score column with nothing missing keeps the type it had in the
+#    event results.
+#
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+
+# Returns results with the season values added as columns.
+def add_season_points(results, event_names, num_events, num_btp_events,
+                      with_kept_events=False):
+    results = results.copy()
+    scores = results[event_names].to_numpy(dtype=float)
+    num_drivers, num_events_so_far = scores.shape
+
+    # Missed events count as zero points.
+    present = ~np.isnan(scores)
+    filled = np.where(present, scores, 0.0)
+    order = np.argsort(-filled, axis=1, kind='stable')
+    sorted_scores = np.take_along_axis(filled, order, axis=1)
+
+    # Keep the best num_btp_events scores.
+    num_actual_events = present.sum(axis=1)
+    num_kept_events = np.minimum(num_actual_events, num_btp_events)
+    kept_sorted = np.arange(num_events_so_far) < num_kept_events[:, None]
+    total_points = sum_columns(np.where(kept_sorted, sorted_scores, 0.0),
+                               num_events_so_far)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        avg_points = np.where(num_kept_events > 0,
+                              total_points / num_kept_events, np.nan)
+    # numpy sums eight or more values pairwise, rather than left to
+    # right, so average those the way we always have.
+    for row_num in np.flatnonzero(num_kept_events >= 8):
+        avg_points[row_num] = \
+          np.mean(sorted_scores[row_num, :num_kept_events[row_num]])
+
+    results['num_actual_events'] = num_actual_events.astype(np.int64)
+    results['num_kept_events'] = num_kept_events.astype(np.int64)
+    results['total_points'] = total_points
+    results['avg_points'] = avg_points
+
+    if with_kept_events:
+        kept = np.zeros(scores.shape, dtype=bool)
+        np.put_along_axis(kept, order, kept_sorted, axis=1)
+        names = np.array(event_names, dtype=object)
+        results['kept_events'] = [set(names[kept[row_num]])
+                                  for row_num in range(num_drivers)]
+
+    # Assume 100.0 points for each remaining event.
+    num_remaining_events = min(num_events - num_events_so_far, num_btp_events)
+    best_remaining_score = 100.0 * num_remaining_events
+    num_scores_to_keep = min(num_btp_events - num_remaining_events,
+                             num_events_so_far)
+    results['btp'] = sum_columns(sorted_scores, num_scores_to_keep) + \
+      best_remaining_score
+
+    return results
+
+
+# Sums the first num_cols columns of each row, left to right.
+def sum_columns(matrix, num_cols):
+    total = np.zeros(len(matrix))
+    for col_num in range(num_cols):
+        total = total + matrix[:, col_num]
+    return total
+
+
+# ------------------------------------------------------------
+# The season table
+
+class SeasonTable:
+
+    # key_cols are the columns identifying a row, e.g., ['driver']. If
+    # there is only one event and sort_single_event is False, the table
+    # is just that event's results, unsorted, as publish_series.py has
+    # always had it.
+    def __init__(self, key_cols, sort_single_event=True):
+        self.key_cols = key_cols
+        self.sort_single_event = sort_single_event
+        self.event_names = []
+        self.event_dtypes = []
+        self.first_event = None
+        # {key: {event number: [score, ...]}}
+        self.scores = {}
+
+    # Adds the scores in the points_col column of the event results
+    # (by default, the one named for the event).
+    def add_event(self, event_name, event_results, points_col=None):
+        points = event_results[points_col or event_name]
+        event_num = len(self.event_names)
+        self.event_names.append(event_name)
+        self.event_dtypes.append(points.dtype)
+        if self.first_event is None:
+            self.first_event = event_results[self.key_cols].assign(
+                **{event_name: points})
+        keys = zip(*[event_results[col].tolist() for col in self.key_cols])
+        for key, score in zip(keys, points.tolist()):
+            self.scores.setdefault(key, {}).setdefault(event_num,
+                                                       []).append(score)
+
+    def is_unsorted(self):
+        return len(self.event_names) == 1 and not self.sort_single_event
+
+    # The drivers in the table, in the order of its rows.
+    def drivers(self):
+        if self.is_unsorted():
+            return self.first_event[self.key_cols[0]].tolist()
+        return [key[0] for key in sorted(self.scores)]
+
+    def to_frame(self):
+        if self.is_unsorted():
+            return self.first_event
+        missing = [np.nan]
+        rows = []
+        for key in sorted(self.scores):
+            event_scores = self.scores[key]
+            for scores in itertools.product(
+                    *[event_scores.get(event_num, missing)
+                      for event_num in range(len(self.event_names))]):
+                rows.append(key + scores)
+        results = pd.DataFrame.from_records(
+            rows, columns=self.key_cols + self.event_names)
+        for col in self.key_cols:
+            results[col] = results[col].astype(object)
+        for event_name, dtype in zip(self.event_names, self.event_dtypes):
+            if results[event_name].notna().all():
+                results[event_name] = results[event_name].astype(dtype)
+            else:
+                results[event_name] = results[event_name].astype(float)
+        return results
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+#
+# pylint: disable=missing-docstring
+#
+# This script serves a season's results pages over HTTP, straight from
+# the season's JSON results, without writing the pages out. It is meant
+# for a laptop at the grid, with everybody's phones refreshing the
+# results.
+#
+# It reads the season's commands.txt, as build_season.py does, and
+# serves the page of each publish_event.py, publish_doty.py and
+# publish_series.py command at its path, e.g.,
+# http://laptop:8000/2026/2026-mowog1-fin.html. The index (/) links to
+# them all.
+#
+# A page is only rendered when it is asked for, by calling the script
+# in this process, and is then kept, minified (as compress_pages.py
+# does) and already gzipped, along with an ETag. Until any of its
+# inputs (the results, the series config, the scripts, the templates,
+# aliases.json or pax-factors.json) changes, every request is answered
+# from memory: with a 304 if the phone already has it, and the gzipped
+# page otherwise. Inputs are checked at most once a second (-r) per
+# page. Only the most recently used pages (-c) are kept.
+#
+# The pages are made from the JSON results, so run compute_results.py
+# (or leave watch_season.py running) as each event's CSV comes in.
+#
+# Invoke this as:
+#
+# ./serve_results.py 2026
+# ./serve_results.py -p 8080 -c 16 2026
+#
+
+import argparse
+import collections
+import contextlib
+import gzip
+import hashlib
+import html
+import http.server
+import importlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import urllib.parse
+
+from build_season import (chdir_to_repo, load_steps, option_value,
+                          season_filenames, step_inputs)
+from compress_pages import minify_html
+from template_cache import file_stamps
+from watch_season import local_module_mtimes, reload_changed_modules
+
+
+# The scripts whose pages we serve.
+PAGE_SCRIPTS = ['publish_event.py', 'publish_doty.py', 'publish_doty_raw.py',
+                'publish_series.py']
+
+RenderedPage = collections.namedtuple(
+    'RenderedPage', ['stamps', 'checked', 'body', 'gzip_body', 'etag'])
+
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-b',
+                        dest='bind',
+                        default='',
+                        help='The address to listen on. Defaults to all ' +
+                        'of them, so that phones on the same network can ' +
+                        'connect.')
+    parser.add_argument('-p',
+                        dest='port',
+                        default=8000,
+                        type=int,
+                        help='The port to listen on.')
+    parser.add_argument('-c',
+                        dest='max_pages',
+                        default=32,
+                        type=int,
+                        help='How many rendered pages to keep.')
+    parser.add_argument('-r',
+                        dest='recheck_interval',
+                        default=1.0,
+                        type=float,
+                        help='How often to check whether a page\'s inputs ' +
+                        'changed, in seconds.')
+    parser.add_argument('season_dir',
+                        help='The season directory, e.g., 2026.')
+    config = parser.parse_args(args)
+
+    commands_filename, _ = season_filenames(config.season_dir)
+    chdir_to_repo()
+
+    pages = PageCache(commands_filename, config.max_pages,
+                      config.recheck_interval)
+    server = http.server.ThreadingHTTPServer((config.bind, config.port),
+                                             ResultsHandler)
+    server.daemon_threads = True
+    server.pages = pages
+    print('Serving %d pages from %s on http://%s:%d/, Ctrl-C to stop' %
+          (len(pages.routes()), commands_filename, config.bind or 'localhost',
+           config.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pages.close()
+    return 0
+
+
+# ------------------------------------------------------------
+# The pages
+
+class PageCache:
+
+    def __init__(self, commands_filename, max_pages, recheck_interval):
+        self.commands_filename = commands_filename
+        self.max_pages = max_pages
+        self.recheck_interval = recheck_interval
+        # Only one page is rendered at a time: the scripts share the
+        # module state, and stdout.
+        self.lock = threading.Lock()
+        # {path: RenderedPage}, least recently used first.
+        self.pages = collections.OrderedDict()
+        self.commands_stamps = None
+        # {path: step}
+        self.steps = {}
+        self.module_mtimes = local_module_mtimes()
+        self.render_dir = make_render_dir()
+
+    def close(self):
+        shutil.rmtree(self.render_dir, ignore_errors=True)
+
+    # Returns {path: step} for the pages, reading the commands again if
+    # they changed.
+    def routes(self):
+        with self.lock:
+            stamps = file_stamps([self.commands_filename])
+            if stamps != self.commands_stamps:
+                steps = {}
+                for step in load_steps(self.commands_filename):
+                    if step.script not in PAGE_SCRIPTS:
+                        continue
+                    for output in step.outputs:
+                        if output:
+                            steps[page_path(output)] = step
+                self.steps = steps
+                self.commands_stamps = stamps
+                self.pages.clear()
+            return dict(self.steps)
+
+    # Returns the RenderedPage for path, or None if there is no such
+    # page. Raises PageError if it cannot be rendered.
+    def get(self, path):
+        step = self.routes().get(path)
+        if step is None:
+            return None
+
+        page = self.pages.get(path)
+        now = time.monotonic()
+        if page and now - page.checked < self.recheck_interval:
+            return page
+
+        with self.lock:
+            stamps = input_stamps(step)
+            page = self.pages.get(path)
+            if page and page.stamps == stamps:
+                page = page._replace(checked=now)
+            else:
+                # The page is new or out of date. Render it, and any
+                # other pages from the same command.
+                for output_path, body in self.render(step).items():
+                    self.pages[output_path] = rendered_page(stamps, now, body)
+                page = self.pages[path]
+            self.pages[path] = page
+            self.pages.move_to_end(path)
+            while len(self.pages) > self.max_pages:
+                self.pages.popitem(last=False)
+            return page
+
+    # Runs the step, with its pages written to the render directory, and
+    # returns {path: page}.
+    def render(self, step):
+        if not reload_changed_modules(self.module_mtimes):
+            raise PageError('Could not reload the scripts')
+
+        outputs = dict((output,
+                        os.path.join(self.render_dir, os.path.basename(output)))
+                       for output in step.outputs if output)
+        args = render_args(step, outputs, self.render_dir)
+        start = time.perf_counter()
+        log = io.StringIO()
+        module = importlib.import_module(os.path.splitext(step.script)[0])
+        try:
+            with contextlib.redirect_stdout(log):
+                result = module.main(args)
+        except SystemExit as e:
+            result = e.code
+        except Exception: # pylint: disable=broad-except
+            result = traceback.format_exc()
+        # Including any modules the script loaded for the first time.
+        self.module_mtimes = local_module_mtimes()
+        if result:
+            print(log.getvalue())
+            raise PageError('%s failed: %s' % (step.script, result))
+
+        bodies = {}
+        for output, render_filename in outputs.items():
+            with open(render_filename, 'rb') as in_file:
+                bodies[page_path(output)] = in_file.read()
+            os.remove(render_filename)
+        print('Rendered %s in %.2fs' %
+              (', '.join(sorted(bodies)), time.perf_counter() - start))
+        return bodies
+
+
+class PageError(Exception):
+    pass
+
+
+def page_path(output):
+    return '/' + os.path.normpath(output).replace(os.sep, '/')
+
+
+def input_stamps(step):
+    try:
+        return file_stamps(step_inputs(step))
+    except OSError as e:
+        raise PageError('Not built yet: %s' % e) from None
+
+
+def rendered_page(stamps, checked, body):
+    body = minify_html(body.decode('utf-8')).encode('utf-8')
+    etag = hashlib.sha256(body).hexdigest()[:20]
+    return RenderedPage(stamps, checked, body, gzip.compress(body, 6), etag)
+
+
+# The pages are written to a directory of our own.
+def make_render_dir():
+    return tempfile.mkdtemp(prefix='serve-results-')
+
+
+# Returns the step's arguments, with its outputs written to the render
+# directory instead.
+def render_args(step, outputs, render_dir):
+    args = [outputs.get(arg, arg) for arg in step.args]
+    config_filename = option_value(step.args, '-c')
+    if step.script == 'publish_series.py' and config_filename:
+        # The series config names the output itself.
+        with open(config_filename) as json_data:
+            json_config = json.load(json_data)
+        if json_config.get('output_filename') in outputs:
+            json_config['output_filename'] = \
+              outputs[json_config['output_filename']]
+            render_config = os.path.join(render_dir,
+                                         os.path.basename(config_filename))
+            with open(render_config, 'wt') as out_file:
+                json.dump(json_config, out_file)
+            args = [render_config if arg == config_filename else arg
+                    for arg in args]
+    return args
+
+
+# ------------------------------------------------------------
+# Serving
+
+class ResultsHandler(http.server.BaseHTTPRequestHandler):
+
+    server_version = 'MACResults/1.0'
+
+    def do_GET(self):
+        self.respond(True)
+
+    def do_HEAD(self):
+        self.respond(False)
+
+    def respond(self, send_body):
+        path = urllib.parse.urlsplit(self.path).path
+        if path == '/':
+            self.send_body(200, index_page(self.server.pages.routes()),
+                           send_body)
+            return
+        try:
+            page = self.server.pages.get(path)
+        except PageError as e:
+            self.send_body(503, error_page(str(e)), send_body)
+            return
+        if page is None:
+            self.send_body(404, error_page('No such page: %s' % path),
+                           send_body)
+            return
+
+        use_gzip = accepts_gzip(self.headers.get('Accept-Encoding', ''))
+        etag = '"%s%s"' % (page.etag, '-gz' if use_gzip else '')
+        if etag_matches(self.headers.get('If-None-Match', ''), page.etag):
+            self.send_response(304)
+            self.send_page_headers(etag)
+            self.end_headers()
+            return
+
+        body = page.gzip_body if use_gzip else page.body
+        self.send_response(200)
+        self.send_page_headers(etag)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def send_page_headers(self, etag):
+        self.send_header('ETag', etag)
+        # Always check back, as the results may have changed.
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+
+    def send_body(self, status, text, send_body):
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+
+def accepts_gzip(accept_encoding):
+    for coding in accept_encoding.split(','):
+        name, _, params = coding.strip().partition(';')
+        if name.strip().lower() in ('gzip', '*'):
+            return params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00',
+                                                   'q=0.000')
+    return False
+
+
+# Either representation of the page matches, as they only differ in
+# how they are sent.
+def etag_matches(if_none_match, etag):
+    if if_none_match.strip() == '*':
+        return True
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag.strip('"') in (etag, etag + '-gz'):
+            return True
+    return False
+
+
+def index_page(routes):
+    links = ''.join('<li><a href="%s">%s</a></li>\n' %
+                    (html.escape(path), html.escape(path.lstrip('/')))
+                    for path in sorted(routes))
+    return ('<!DOCTYPE html>\n<html lang="en">\n<head>\n'
+            '<meta charset="utf-8">\n'
+            '<meta name="viewport" content="width=device-width">\n'
+            '<title>Results</title>\n</head>\n<body>\n'
+            '<ul>\n%s</ul>\n</body>\n</html>\n' % links)
+
+
+def error_page(message):
+    return ('<!DOCTYPE html>\n<html lang="en">\n<head>\n'
+            '<meta charset="utf-8">\n<title>Results</title>\n</head>\n'
+            '<body>\n<p>%s</p>\n</body>\n</html>\n' % html.escape(message))
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+#
+# pylint: disable=missing-docstring
+#
+# This script uploads the results to the web site, but only the files
+# that changed since they were last uploaded. It keeps a SHA-256 of
+# every file it uploaded, to each site, in .upload-manifest.json. That
+# is a local file (it is not checked in); if it is lost, the next sync
+# just uploads everything again.
+#
+# The published files in each directory given are the pages (and their
+# .gz and .br copies), the CSVs, and the style sheets and images of an
+# assets directory. Each keeps its path, so 2026/doty.html goes to
+# <site>/2026/doty.html.
+#
+# The files are uploaded over a few connections at once (-j), each of
+# which uploads a share of the files, biggest first, without
+# reconnecting. The site is one of:
+#
+#   sftp://user@host:port/path  Using the sftp command, so the host needs
+#                               to take your SSH key.
+#   ftp://user@host/path        Using the password in ~/.netrc, or one
+#                               you type in.
+#   /some/directory             A local directory, for trying things out.
+#
+# Nothing is ever deleted from the site unless -d is given, and then
+# only files we uploaded that are no longer here, and only once you say
+# so.
+#
+# Invoke this as:
+#
+# ./sync_results.py -n sftp://mnautox@ftp.mnautox.com:2222/public_html/results 2026
+# ./sync_results.py sftp://mnautox@ftp.mnautox.com:2222/public_html/results 2026 assets
+# ./sync_results.py /tmp/site 2026
+#
+
+import argparse
+import concurrent.futures
+import fnmatch
+import ftplib
+import getpass
+import hashlib
+import json
+import netrc
+import os
+import posixpath
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+
+
+MANIFEST_FILENAME = '.upload-manifest.json'
+
+MANIFEST_FORMAT_VERSION = 1
+
+PUBLISHED_PATTERNS = ['*.html', '*.html.gz', '*.html.br', '*.csv', '*.css',
+                      '*.png']
+
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-j',
+                        dest='num_connections',
+                        default=4,
+                        type=int,
+                        help='How many connections to upload over.')
+    parser.add_argument('-n',
+                        dest='dry_run',
+                        default=False,
+                        action='store_true',
+                        help='If set, only show what would be uploaded.')
+    parser.add_argument('-f',
+                        dest='force',
+                        default=False,
+                        action='store_true',
+                        help='If set, upload everything, changed or not.')
+    parser.add_argument('-d',
+                        dest='delete',
+                        default=False,
+                        action='store_true',
+                        help='If set, offer to delete the files we uploaded ' +
+                        'that are no longer here.')
+    parser.add_argument('-m',
+                        dest='manifest_filename',
+                        default=MANIFEST_FILENAME,
+                        help='The manifest of what was uploaded.')
+    parser.add_argument('site',
+                        help='Where to upload to: sftp://user@host:port/path, ' +
+                        'ftp://user@host/path or a local directory.')
+    parser.add_argument('dirs',
+                        nargs='+',
+                        help='The directories to upload, e.g., 2026.')
+    config = parser.parse_args(args)
+
+    site = make_site(config.site)
+    manifest = load_manifest(config.manifest_filename)
+    uploaded = manifest['sites'].setdefault(site.name, {})
+    if config.force:
+        uploaded.clear()
+
+    try:
+        local_files = published_files(config.dirs)
+    except ValueError as e:
+        print('ERROR: %s' % e)
+        return 1
+    hashes = dict((filename, hash_file(local_filename))
+                  for filename, local_filename in local_files.items())
+    changed = [filename for filename in local_files
+               if uploaded.get(filename) != hashes[filename]]
+    gone = sorted(filename for filename in uploaded
+                  if filename not in hashes and
+                  any(in_dir(filename, dir_name) for dir_name in config.dirs))
+
+    num_bytes = sum(os.path.getsize(local_files[filename])
+                    for filename in changed)
+    print('%s: %d of %d files changed (%s)' %
+          (site.name, len(changed), len(local_files), format_kb(num_bytes)))
+    if config.dry_run:
+        for filename in changed:
+            print('  Would upload %s' % filename)
+        for filename in gone:
+            print('  No longer here: %s' % filename)
+        return 0
+
+    start = time.perf_counter()
+    try:
+        for filename in upload_files(site, [(filename, local_files[filename])
+                                            for filename in changed],
+                                     config.num_connections):
+            uploaded[filename] = hashes[filename]
+    finally:
+        # Whatever got there, even if we were interrupted.
+        save_manifest(manifest, config.manifest_filename)
+    num_failed = len([f for f in changed if uploaded.get(f) != hashes[f]])
+    print('Uploaded %d files in %.1fs, %d failed' %
+          (len(changed) - num_failed, time.perf_counter() - start, num_failed))
+
+    ok = num_failed == 0
+    if gone:
+        print('%d files we uploaded are no longer here:' % len(gone))
+        for filename in gone:
+            print('  %s' % filename)
+        if config.delete and confirm('Delete them from %s?' % site.name):
+            deleted = site.delete(gone)
+            for filename in deleted:
+                uploaded.pop(filename, None)
+            save_manifest(manifest, config.manifest_filename)
+            print('Deleted %d files' % len(deleted))
+            ok = ok and len(deleted) == len(gone)
+        elif not config.delete:
+            print('Use -d to delete them.')
+
+    return 0 if ok else 1
+
+
+def confirm(question):
+    if not sys.stdin.isatty():
+        print('%s Not without a terminal to ask on.' % question)
+        return False
+    return input('%s [y/N] ' % question).strip().lower() in ('y', 'yes')
+
+
+def format_kb(num_bytes):
+    return '%.1fKB' % (num_bytes / 1024.0)
+
+
+# ------------------------------------------------------------
+# The files
+
+# Returns the published files in the directories, as {path on the site:
+# local filename}. The path on the site starts with the directory's own
+# name, however it was given: 2026/doty.html for 2026 or for
+# /root/package/2026.
+def published_files(dirs):
+    filenames = {}
+    for dir_name in dirs:
+        for name in sorted(os.listdir(dir_name)):
+            filename = os.path.join(dir_name, name)
+            if os.path.isfile(filename) and \
+               any(fnmatch.fnmatch(name, pattern)
+                   for pattern in PUBLISHED_PATTERNS):
+                filenames[site_path(filename, dir_name)] = filename
+    return filenames
+
+
+# Raises ValueError if the file would land outside the site.
+def site_path(filename, dir_name):
+    path = os.path.relpath(os.path.abspath(filename),
+                           os.path.dirname(os.path.abspath(dir_name)))
+    if os.path.isabs(path) or path == os.pardir or \
+       path.startswith(os.pardir + os.sep):
+        raise ValueError('%s is not under %s' % (filename, dir_name))
+    return path.replace(os.sep, '/')
+
+
+def in_dir(filename, dir_name):
+    return posixpath.dirname(filename) == \
+      os.path.basename(os.path.abspath(dir_name))
+
+
+def hash_file(filename):
+    with open(filename, 'rb') as in_file:
+        return hashlib.sha256(in_file.read()).hexdigest()
+
+
+def load_manifest(manifest_filename):
+    if os.path.exists(manifest_filename):
+        with open(manifest_filename) as json_data:
+            manifest = json.load(json_data)
+        if manifest.get('format_version') == MANIFEST_FORMAT_VERSION:
+            return manifest
+    return {'format_version': MANIFEST_FORMAT_VERSION, 'sites': {}}
+
+
+def save_manifest(manifest, manifest_filename):
+    temp_filename = '%s.%d.tmp' % (manifest_filename, os.getpid())
+    with open(temp_filename, 'wt') as out_file:
+        json.dump(manifest, out_file, indent=2, sort_keys=True)
+        out_file.write('\n')
+    os.replace(temp_filename, manifest_filename)
+
+
+# ------------------------------------------------------------
+# Uploading
+
+# Uploads the files, as (path on the site, local filename), over
+# num_connections connections, and yields the path of each file once it
+# is uploaded. If a connection fails, the files it had left are sent
+# next time.
+def upload_files(site, files, num_connections):
+    batches = split_batches(files, num_connections)
+    with concurrent.futures.ThreadPoolExecutor(len(batches) or 1) as pool:
+        futures = [pool.submit(site.upload, batch) for batch in batches]
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                uploaded = future.result()
+            except (OSError, ftplib.Error) as e:
+                print('ERROR: Could not upload to %s: %s' % (site.name, e))
+                continue
+            for filename in uploaded:
+                yield filename
+
+
+# Shares the files out between the connections, so that each has about
+# as many bytes to send.
+def split_batches(files, num_batches):
+    batches = [[] for _ in range(min(num_batches, len(files)))]
+    sizes = [0] * len(batches)
+    for file in sorted(files, key=lambda file: os.path.getsize(file[1]),
+                       reverse=True):
+        num = sizes.index(min(sizes))
+        batches[num].append(file)
+        sizes[num] += os.path.getsize(file[1])
+    return batches
+
+
+def make_site(site):
+    parts = urllib.parse.urlsplit(site)
+    if parts.scheme == 'sftp':
+        return SftpSite(parts)
+    if parts.scheme == 'ftp':
+        return FtpSite(parts)
+    if parts.scheme in ('', 'file'):
+        return LocalSite(parts.path)
+    raise ValueError('Cannot upload to %s' % site)
+
+
+def remote_dirs(files):
+    return sorted(set(posixpath.dirname(filename) for filename, _ in files
+                      if posixpath.dirname(filename)))
+
+
+class LocalSite:
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.name = self.root
+
+    # Each upload() and delete() is one connection: it uploads the files
+    # it can, and returns those it did.
+    def upload(self, files):
+        done = []
+        for filename, local_filename in files:
+            remote_filename = os.path.join(self.root, filename)
+            try:
+                os.makedirs(os.path.dirname(remote_filename), exist_ok=True)
+                temp_filename = remote_filename + '.tmp'
+                shutil.copyfile(local_filename, temp_filename)
+                os.replace(temp_filename, remote_filename)
+            except OSError as e:
+                print('ERROR: Could not upload %s: %s' % (filename, e))
+                continue
+            print('  %s' % filename)
+            done.append(filename)
+        return done
+
+    def delete(self, filenames):
+        done = []
+        for filename in filenames:
+            try:
+                os.remove(os.path.join(self.root, filename))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print('ERROR: Could not delete %s: %s' % (filename, e))
+                continue
+            done.append(filename)
+        return done
+
+
+class FtpSite:
+
+    def __init__(self, parts):
+        self.host = parts.hostname
+        self.port = parts.port or ftplib.FTP_PORT
+        self.user = parts.username or 'anonymous'
+        self.root = parts.path or '/'
+        self.name = 'ftp://%s@%s:%d%s' % (self.user, self.host, self.port,
+                                          self.root)
+        # Ask for the password now, rather than on every connection.
+        self.password = parts.password or self.netrc_password()
+        if self.password is None:
+            self.password = getpass.getpass('Password for %s: ' % self.name)
+
+    def netrc_password(self):
+        try:
+            authenticators = netrc.netrc().authenticators(self.host)
+        except (OSError, netrc.NetrcParseError):
+            return None
+        if authenticators and authenticators[0] in (None, self.user):
+            return authenticators[2]
+        return None
+
+    def connect(self):
+        ftp = ftplib.FTP()
+        ftp.connect(self.host, self.port)
+        ftp.login(self.user, self.password)
+        return ftp
+
+    def upload(self, files):
+        done = []
+        with self.connect() as ftp:
+            for dir_name in remote_dirs(files):
+                self.make_dirs(ftp, posixpath.join(self.root, dir_name))
+            for filename, local_filename in files:
+                try:
+                    with open(local_filename, 'rb') as in_file:
+                        ftp.storbinary('STOR %s' %
+                                       posixpath.join(self.root, filename),
+                                       in_file)
+                except ftplib.error_perm as e:
+                    print('ERROR: Could not upload %s: %s' % (filename, e))
+                    continue
+                print('  %s' % filename)
+                done.append(filename)
+        return done
+
+    def make_dirs(self, ftp, dir_name):
+        path = ''
+        for part in dir_name.split('/'):
+            path = path + part + '/'
+            if part:
+                try:
+                    ftp.mkd(path)
+                except ftplib.error_perm:
+                    # It is already there.
+                    pass
+
+    def delete(self, filenames):
+        done = []
+        with self.connect() as ftp:
+            for filename in filenames:
+                try:
+                    ftp.delete(posixpath.join(self.root, filename))
+                except ftplib.error_perm as e:
+                    print('ERROR: Could not delete %s: %s' % (filename, e))
+                    continue
+                done.append(filename)
+        return done
+
+
+# Each connection is an sftp run with a batch of commands. If anything
+# in the batch fails, none of its files count as uploaded, and they are
+# all sent again next time.
+class SftpSite:
+
+    def __init__(self, parts):
+        self.destination = parts.hostname
+        if parts.username:
+            self.destination = '%s@%s' % (parts.username, parts.hostname)
+        self.port = parts.port
+        self.root = parts.path.lstrip('/') or '.'
+        self.name = 'sftp://%s%s/%s' % (
+            self.destination, ':%d' % self.port if self.port else '',
+            self.root)
+
+    def run(self, commands):
+        command = ['sftp', '-q', '-b', '-']
+        if self.port:
+            command += ['-P', str(self.port)]
+        command.append(self.destination)
+        with tempfile.TemporaryFile('w+t') as out_file:
+            result = subprocess.run(command, input='\n'.join(commands) + '\n',
+                                    stdout=out_file, stderr=subprocess.STDOUT,
+                                    text=True, check=False)
+            if result.returncode:
+                out_file.seek(0)
+                print('ERROR: sftp failed: %s' % out_file.read().strip())
+        return result.returncode == 0
+
+    def upload(self, files):
+        commands = []
+        for dir_name in remote_dirs(files):
+            path = self.root
+            for part in dir_name.split('/'):
+                path = posixpath.join(path, part)
+                # - lets it fail, if the directory is already there.
+                commands.append('-mkdir %s' % quote(path))
+        for filename, local_filename in files:
+            commands.append('put %s %s' %
+                            (quote(local_filename),
+                             quote(posixpath.join(self.root, filename))))
+        if not self.run(commands):
+            return []
+        for filename, _ in files:
+            print('  %s' % filename)
+        return [filename for filename, _ in files]
+
+    def delete(self, filenames):
+        commands = ['rm %s' % quote(posixpath.join(self.root, filename))
+                    for filename in filenames]
+        return filenames if self.run(commands) else []
+
+
+# sftp batch files take double quoted arguments.
+def quote(path):
+    return '"%s"' % path.replace('\\', '\\\\').replace('"', '\\"')
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,217 @@
+#
+# pylint: disable=missing-docstring
+#
+# Parsed Mustache templates, shared by the publishing scripts. pystache
+# parses a template every time it is rendered, and parses a partial
+# again every time it is used: once per class for the class tables, and
+# once per driver for the best times tables. Instead, we parse each
+# template once, with its partials parsed and spliced into it (indented
+# just as pystache would indent them), and render that.
+#
+# A parsed template is kept for the life of the process, and is checked
+# against the modification time and size of its files before it is
+# reused. It is also pickled to .template-cache/, named for a SHA-256
+# of the template, its partials and the pystache version, so the next
+# process to render it can skip parsing too. These are local build
+# artifacts (they are pickles, so only load ones you made yourself) and
+# are not checked in.
+#
+# iter_render() renders a parsed template a piece at a time, rather than
+# into one string: each item of a section (a class table, a row of a
+# table) is rendered as it is reached, so the page can be written out as
+# it goes. Section data may be a generator, in which case each item is
+# only made when it is rendered; such a section can only be used once
+# in the template.
+#
+
+import glob
+import hashlib
+import os
+import pickle
+import re
+
+import pystache
+from pystache.parsed import ParsedTemplate
+from pystache.parser import (_InvertedNode, _PartialNode, _SectionNode,
+                             parse)
+
+
+FORMAT_VERSION = 1
+
+TEMPLATE_CACHE_DIR = '.template-cache'
+
+# How pystache indents a partial.
+NON_BLANK_RE = re.compile(r'^(.)', re.M)
+
+# {(filename, partials): (file stamps, parsed template)}
+_templates = {}
+
+
+def read_template(filename):
+    # Read the bytes, as pystache does, so that line endings are left
+    # alone.
+    with open(filename, 'rb') as in_file:
+        return in_file.read().decode('utf-8')
+
+
+def template_filenames(filename, partials):
+    return [filename] + sorted(set(partials.values()))
+
+
+def file_stamps(filenames):
+    stamps = []
+    for filename in filenames:
+        stat = os.stat(filename)
+        stamps.append((filename, stat.st_mtime_ns, stat.st_size))
+    return tuple(stamps)
+
+
+# Returns the parsed template in filename, with the partials (a dict of
+# {partial name: filename}) already in it.
+def load_template(filename, partials=None):
+    partials = partials or {}
+    key = (filename, tuple(sorted(partials.items())))
+    stamps = file_stamps(template_filenames(filename, partials))
+    cached = _templates.get(key)
+    if cached and cached[0] == stamps:
+        return cached[1]
+
+    sources = dict((name, read_template(name))
+                   for name in template_filenames(filename, partials))
+    cache_filename = disk_cache_filename(filename, partials, sources)
+    parsed = read_disk_cache(cache_filename)
+    if parsed is None:
+        parsed = parse_template(sources[filename], partials, sources)
+        write_disk_cache(cache_filename, parsed)
+    _templates[key] = (stamps, parsed)
+    return parsed
+
+
+# Parses a template string, splicing in the partials it uses.
+def parse_template(source, partials=None, sources=None):
+    partials = partials or {}
+    sources = sources if sources is not None else {}
+    parsed = parse(source)
+    splice_partials(parsed, partials, sources, {}, [])
+    return parsed
+
+
+def splice_partials(parsed, partials, sources, parsed_partials, stack):
+    # pylint: disable=protected-access
+    for num, node in enumerate(parsed._parse_tree):
+        if isinstance(node, _PartialNode) and node.key in partials:
+            parsed._parse_tree[num] = parse_partial(
+                node.key, node.indent, partials, sources, parsed_partials,
+                stack)
+        elif isinstance(node, _SectionNode):
+            splice_partials(node.parsed, partials, sources, parsed_partials,
+                            stack)
+        elif isinstance(node, _InvertedNode):
+            splice_partials(node.parsed_section, partials, sources,
+                            parsed_partials, stack)
+
+
+def parse_partial(name, indent, partials, sources, parsed_partials, stack):
+    if name in stack:
+        raise ValueError('The partial "%s" includes itself' % name)
+    key = (name, indent)
+    if key not in parsed_partials:
+        filename = partials[name]
+        if filename not in sources:
+            sources[filename] = read_template(filename)
+        source = re.sub(NON_BLANK_RE, indent + r'\1', sources[filename])
+        parsed = parse(source)
+        splice_partials(parsed, partials, sources, parsed_partials,
+                        stack + [name])
+        parsed_partials[key] = parsed
+    return parsed_partials[key]
+
+
+# ------------------------------------------------------------
+# Rendering
+
+# Renders the parsed template with the given context, as
+# stache.render() would, but yields the page in pieces.
+def iter_render(stache, parsed, *context, **kwargs):
+    # pylint: disable=protected-access
+    return stache._render_final(
+        lambda engine, stack: iter_nodes(parsed, engine, stack),
+        *context, **kwargs)
+
+
+def iter_nodes(parsed, engine, stack):
+    # pylint: disable=protected-access
+    for node in parsed._parse_tree:
+        if isinstance(node, str):
+            yield node
+        elif isinstance(node, ParsedTemplate):
+            # A partial.
+            yield from iter_nodes(node, engine, stack)
+        elif isinstance(node, _SectionNode):
+            yield from iter_section(node, engine, stack)
+        else:
+            yield node.render(engine, stack)
+
+
+# The same as _SectionNode.render(), a piece at a time.
+def iter_section(node, engine, stack):
+    # pylint: disable=protected-access
+    for val in engine.fetch_section_data(stack, node.key):
+        if callable(val):
+            val = val(node.template[node.index_begin:node.index_end])
+            yield engine._render_value(val, stack, delimiters=node.delimiters)
+            continue
+        stack.push(val)
+        yield from iter_nodes(node.parsed, engine, stack)
+        stack.pop()
+
+
+# ------------------------------------------------------------
+# The on-disk cache
+
+def disk_cache_filename(filename, partials, sources):
+    digest = hashlib.sha256()
+    digest.update(('%d %s\n' % (FORMAT_VERSION,
+                                pystache.__version__)).encode('utf-8'))
+    for name, partial_filename in sorted(partials.items()):
+        digest.update(('%s=%s\n' % (name, partial_filename)).encode('utf-8'))
+    for source_filename, source in sorted(sources.items()):
+        digest.update(('%s\n' % source_filename).encode('utf-8'))
+        digest.update(source.encode('utf-8'))
+    base = os.path.basename(filename)
+    return os.path.join(TEMPLATE_CACHE_DIR,
+                        '%s.%s.pkl' % (base, digest.hexdigest()[:16]))
+
+
+def read_disk_cache(cache_filename):
+    try:
+        with open(cache_filename, 'rb') as in_file:
+            parsed = pickle.load(in_file)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError):
+        return None
+    if not isinstance(parsed, ParsedTemplate):
+        return None
+    return parsed
+
+
+def write_disk_cache(cache_filename, parsed):
+    try:
+        os.makedirs(os.path.dirname(cache_filename), exist_ok=True)
+        # Write to a temporary file first, as another process may be
+        # reading (or writing) the same template.
+        temp_filename = '%s.%d.tmp' % (cache_filename, os.getpid())
+        with open(temp_filename, 'wb') as out_file:
+            pickle.dump(parsed, out_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_filename, cache_filename)
+    except OSError as e:
+        # The cache is only a shortcut.
+        print('WARNING: Could not write %s: %s' % (cache_filename, e))
+        return
+    # Clear out what we cached for older versions of this template.
+    base = cache_filename[:-len('.pkl')].rsplit('.', 1)[0]
+    for old_filename in glob.glob(glob.escape(base) + '.*.pkl'):
+        if old_filename != cache_filename:
+            try:
+                os.remove(old_filename)
+            except OSError:
+                pass
@@ -0,0 +1,47 @@
+# pylint: disable=missing-docstring
+
+import os
+
+import batch_build
+from build_season import STATE_FILENAME, Step
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_load_seasons_skips_seasons_without_commands(tmp_path, monkeypatch,
+                                                     capsys):
+    # load_seasons moves to the top of the repository; monkeypatch
+    # moves back afterwards.
+    monkeypatch.chdir(tmp_path)
+    old_season = tmp_path / '2021'
+    old_season.mkdir()
+
+    seasons = batch_build.load_seasons(
+        [str(old_season), os.path.join(REPO_DIR, '2026')], False)
+
+    assert len(seasons) == 1
+    assert seasons[0]['state_filename'] == \
+      os.path.join(REPO_DIR, '2026', STATE_FILENAME)
+    assert seasons[0]['steps']
+    assert 'WARNING: Skipping' in capsys.readouterr().out
+
+
+def test_main_fails_without_any_commands(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / '2018').mkdir()
+
+    assert batch_build.main([str(tmp_path / '2018')]) == 1
+    assert 'ERROR' in capsys.readouterr().out
+
+
+def test_downstream_steps_follows_outputs():
+    steps = [
+        Step('compute_results.py', [], ['a.csv'], ['a.json']),
+        Step('compute_results.py', [], ['b.csv'], ['b.json']),
+        Step('publish_event.py', [], ['a.json'], ['a-fin.html']),
+        Step('publish_doty.py', [], ['a.json', 'b.json'], ['doty.html']),
+    ]
+    selected = batch_build.downstream_steps(steps, ['a.csv'])
+    assert [step.outputs[0] for step in selected] == \
+      ['a.json', 'a-fin.html', 'doty.html']
@@ -0,0 +1,68 @@
+# pylint: disable=missing-docstring
+
+import gzip
+
+import compress_pages
+from compress_pages import minify_css, minify_html
+
+
+def test_minify_html_collapses_spaces_and_drops_comments():
+    html = ('<html>\n  <body>\n    <!-- a comment -->\n'
+            '    <p class="a  b">Two   words</p>\n  </body>\n</html>\n')
+    assert minify_html(html) == \
+      '<html>\n<body>\n<p class="a  b">Two words</p>\n</body>\n</html>\n'
+
+
+def test_minify_html_keeps_conditional_comments_and_nbsp():
+    html = '<!--[if IE]><p>IE</p><![endif]-->\n<td>&nbsp; 1\xa0 2</td>'
+    assert minify_html(html) == html.replace('&nbsp; 1', '&nbsp; 1')
+
+
+def test_minify_html_leaves_raw_text_alone():
+    html = ('<pre>  two\n\n  lines  </pre>  '
+            '<script>if (a  <  b) {}</script>  '
+            '<textarea>  x  </textarea>')
+    assert minify_html(html) == \
+      ('<pre>  two\n\n  lines  </pre> <script>if (a  <  b) {}</script> '
+       '<textarea>  x  </textarea>')
+
+
+def test_minify_css():
+    css = '\n  body {\n    color: red;\n    /* note */\n    margin: 0;\n  }\n'
+    assert minify_css(css) == 'body{color: red;margin: 0}'
+    assert minify_html('<style>\n a { b: c; }\n</style>') == \
+      '<style>a{b: c}</style>'
+
+
+def test_compress_page(tmp_path):
+    page = tmp_path / 'page.html'
+    page.write_text('<p>\n   Hello   </p>\n' * 100)
+
+    sizes = compress_pages.compress_page(str(page))
+
+    with open(str(page) + '.gz', 'rb') as in_file:
+        gzipped = in_file.read()
+    assert gzip.decompress(gzipped) == \
+      minify_html(page.read_text()).encode('utf-8')
+    assert sizes.raw == len(page.read_bytes())
+    assert sizes.gzip == len(gzipped)
+    # The same page always compresses the same.
+    compress_pages.compress_page(str(page))
+    assert (tmp_path / 'page.html.gz').read_bytes() == gzipped
+
+
+def test_main_fails_over_budget(tmp_path, capsys):
+    page = tmp_path / 'page.html'
+    # Random enough not to compress to nothing.
+    page.write_text(''.join('<p>%d</p>\n' % (num * 7919 % 100003)
+                            for num in range(5000)))
+    assert compress_pages.main(['-n', '-b', '1', str(tmp_path)]) == 1
+    assert 'OVER BUDGET' in capsys.readouterr().out
+    assert not (tmp_path / 'page.html.gz').exists()
+    assert compress_pages.main(['-n', str(page)]) == 0
+
+
+def test_minify_html_collapses_spaces_in_tags_but_not_attribute_values():
+    html = '<button\n    class="a  b"\n    title=\'c   d\'>x</button\n  >'
+    assert minify_html(html) == \
+      '<button\nclass="a  b"\ntitle=\'c   d\'>x</button\n>'
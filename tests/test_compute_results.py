@@ -0,0 +1,52 @@
+# pylint: disable=missing-docstring
+
+import os
+import shutil
+
+import pytest
+
+import compute_results
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# These have penalty columns with only cone counts in them, which must
+# still come out as 1.0, not "1".
+@pytest.mark.parametrize('event', ['2026-mowog1', '2026-mowog4', '2026-mowog7'])
+def test_results_match_the_checked_in_json(event, tmp_path, monkeypatch):
+    season_dir = tmp_path / '2026'
+    season_dir.mkdir()
+    csv_filename = str(season_dir / (event + '.csv'))
+    shutil.copyfile(os.path.join(REPO_DIR, '2026', event + '.csv'),
+                    csv_filename)
+    json_filename = str(season_dir / (event + '.json'))
+    # For pax-factors.json.
+    monkeypatch.chdir(REPO_DIR)
+    compute_results.main(['-m', '3', csv_filename, json_filename])
+
+    with open(json_filename, 'rb') as in_file:
+        computed = in_file.read()
+    with open(os.path.join(REPO_DIR, '2026', event + '.json'), 'rb') as in_file:
+        assert computed == in_file.read()
+
+
+def test_load_event_csv_keeps_penalty_types_across_chunks(tmp_path,
+                                                          monkeypatch):
+    csv_filename = str(tmp_path / 'event.csv')
+    with open(csv_filename, 'w') as out_file:
+        out_file.write('Class,Run 1,Run 1 Pen,Run 2,Run 2 Pen,Run 3,Run 3 Pen\n')
+        out_file.write('CS,40.1,1,41.2,,42.0,\n')
+        out_file.write('CS,40.5,,41.0,2,42.5,\n')
+        out_file.write(' STR ,39.9,2,40.0,DNF,41.0,\n')
+    monkeypatch.setattr(compute_results, 'READ_CHUNK_ROWS', 1)
+
+    results = compute_results.load_event_csv(csv_filename)
+
+    assert results['Class'].tolist() == ['CS', 'CS', 'STR']
+    # Only cone counts: numbers, as pandas would have read them.
+    assert results['Run 1 Pen'].dtype == 'float64'
+    assert results['Run 1 Pen'].tolist()[::2] == [1.0, 2.0]
+    assert results['Run 3 Pen'].dtype == 'float64'
+    # A DNF in a later chunk: strings.
+    assert results['Run 2 Pen'].tolist()[1:] == ['2', 'DNF']
@@ -0,0 +1,83 @@
+# pylint: disable=missing-docstring
+
+import contextlib
+import os
+import shutil
+
+import compute_results
+import driver_history
+from pax_factors import year_of
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RECORDS = [
+    {'FirstName': 'Jeffrey', 'LastName': 'Rye', 'class_name': 'CS',
+     'doty_points': 100.0, 'doty_raw_points': 98.5},
+    {'FirstName': 'Ann', 'LastName': 'Other', 'class_name': 'P',
+     'doty_points': 90.0, 'doty_raw_points': 91.0},
+]
+
+
+def entries(db_filename):
+    with contextlib.closing(driver_history.connect(db_filename)) as connection:
+        return connection.execute(
+            'SELECT season, event, driver, class_name FROM entries ' +
+            'ORDER BY driver').fetchall()
+
+
+def test_year_of_takes_only_the_directory_the_file_is_in():
+    assert year_of(os.path.join('2026', '2026-mowog1.json')) == 2026
+    assert year_of(os.path.join('/', 'tmp', '2024', 'doty.html')) == 2024
+    assert year_of(os.path.join('/', 'home', '2024', 'results',
+                                'mowog1.json')) is None
+    assert year_of(os.path.join('/', 'tmp', 'serve-results-2019x',
+                                'doty.html')) is None
+
+
+def test_record_event_replaces_the_event(tmp_path):
+    db_filename = str(tmp_path / 'history.sqlite')
+    results_filename = os.path.join(str(tmp_path), '2026', '2026-mowog1.json')
+    driver_history.record_event(results_filename, RECORDS, {}, db_filename)
+    driver_history.record_event(results_filename, RECORDS[:1], {}, db_filename)
+    assert entries(db_filename) == [(2026, '2026-mowog1', 'Jeffrey Rye', 'CS')]
+
+
+def test_record_event_outside_a_season_records_nothing(tmp_path):
+    db_filename = str(tmp_path / 'history.sqlite')
+    driver_history.record_event(str(tmp_path / 'mowog1.json'), RECORDS, {},
+                                db_filename)
+    assert not os.path.exists(db_filename)
+
+
+def test_history_files_are_at_the_top_of_the_repository():
+    assert driver_history.DRIVER_HISTORY_FILENAME == \
+      os.path.join(REPO_DIR, 'driver-history.sqlite')
+
+
+def compute_event(tmp_path, monkeypatch, args):
+    season_dir = tmp_path / '2026'
+    season_dir.mkdir()
+    csv_filename = str(season_dir / '2026-mowog1.csv')
+    shutil.copyfile(os.path.join(REPO_DIR, '2026', '2026-mowog1.csv'),
+                    csv_filename)
+    # For pax-factors.json.
+    monkeypatch.chdir(REPO_DIR)
+    compute_results.main(args + [csv_filename,
+                                 str(season_dir / '2026-mowog1.json')])
+
+
+def test_compute_results_only_records_history_when_asked(tmp_path,
+                                                         monkeypatch):
+    def fail(*_, **__):
+        raise AssertionError('recorded driver history')
+    monkeypatch.setattr(compute_results, 'record_event', fail)
+    compute_event(tmp_path, monkeypatch, [])
+
+
+def test_compute_results_records_history(tmp_path, monkeypatch):
+    db_filename = str(tmp_path / 'history.sqlite')
+    compute_event(tmp_path, monkeypatch, ['--history', db_filename])
+    rows = entries(db_filename)
+    assert rows
+    assert set(season for season, _, _, _ in rows) == {2026}
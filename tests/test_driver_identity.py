@@ -0,0 +1,91 @@
+# pylint: disable=missing-docstring
+
+import os
+
+from driver_identity import (DriverIndex, SeasonNames, build_driver_index,
+                             dealias_name, driver_id, find_similar_names,
+                             history_filenames, is_results_filename,
+                             name_key, name_similarity)
+from results_warehouse import results_filenames_for
+
+
+ALIASES = {'jeff rye': 'Jeffrey Rye'}
+
+
+def test_name_key():
+    assert name_key('Rye, Jeffrey') == 'jeffrey rye'
+    assert name_key("  J.R.  O'Brien-Smith ") == "jr o'brien-smith"
+    assert driver_id('Jeffrey  Rye') == 'jeffrey-rye'
+
+
+def test_dealias_name_ignores_case():
+    assert dealias_name('Jeff RYE', ALIASES) == 'Jeffrey Rye'
+    assert dealias_name('Ann Other', ALIASES) == 'Ann Other'
+
+
+def test_name_similarity():
+    assert name_similarity('Jeffrey Rye', 'rye, jeffrey') == 1.0
+    assert name_similarity('Rye Jeffrey', 'Jeffrey Rye') >= 0.95
+    assert name_similarity('Jeff Rye', 'Jeffrey Rye') >= 0.9
+    assert name_similarity('Jeffrey Rye', 'Ann Other') < 0.5
+    assert name_similarity('', 'Ann Other') == 0.0
+
+
+def test_find_similar_names():
+    pairs = find_similar_names(['Jeffrey Rye', 'Jeff Rye', 'jeffrey rye',
+                                'Ann Other'])
+    assert pairs[0] == (1.0, 'Jeffrey Rye', 'jeffrey rye')
+    assert {name for _, name1, name2 in pairs for name in (name1, name2)} == \
+      {'Jeffrey Rye', 'Jeff Rye', 'jeffrey rye'}
+
+
+def test_driver_index():
+    index = DriverIndex(ALIASES)
+    assert index.add_name('Jeff Rye', '2025') == 'jeffrey-rye'
+    assert index.add_name('JEFFREY RYE', '2026') == 'jeffrey-rye'
+    index.add_name('Ann Other', '2026')
+
+    assert index.canonical_id('jeffrey rye') == 'jeffrey-rye'
+    assert index.canonical_id('Rye, Jeffrey') == 'jeffrey-rye'
+    assert index.canonical_id('Nobody') is None
+    assert index.canonical_name('jeffrey-rye') == 'Jeffrey Rye'
+    assert index.drivers['jeffrey-rye']['seasons'] == ['2025', '2026']
+    assert [canonical_id for _, canonical_id in index.similar('Jeffery Rye')] \
+      == ['jeffrey-rye']
+
+    # And back from what is saved in .driver-index.json.
+    loaded = DriverIndex(ALIASES, index.drivers)
+    assert loaded.canonical_id('JEFFREY RYE') == 'jeffrey-rye'
+
+
+def test_season_names():
+    names = SeasonNames()
+    names.add_event(['ann other', 'Jeffrey Rye'])
+    assert names.known_names() == {'ann other': 'ann other',
+                                   'jeffrey rye': 'Jeffrey Rye'}
+    names.add_event(['Ann Other'])
+    assert names.known_names()['ann other'] == 'ann other'
+
+
+def test_is_results_filename():
+    assert is_results_filename('2026/2026-mowog1.json')
+    assert not is_results_filename('2026/mowog-series-conf.json')
+    assert not is_results_filename('2026/pax-factors.json')
+    assert not is_results_filename('2026/2026-mowog1-fin.meta.json')
+
+
+def test_sidecars_are_not_event_results(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    season_dir = tmp_path / '2026'
+    season_dir.mkdir()
+    (season_dir / '2026-mowog1.json').write_text(
+        '{"FirstName": "Jeffrey", "LastName": "Rye"}\n')
+    (season_dir / '2026-mowog1-fin.meta.json').write_text(
+        '{"stamp": [0, 0], "metadata": {"event_name": "MOWOG 1"}}')
+
+    assert history_filenames() == [os.path.join('2026', '2026-mowog1.json')]
+    assert results_filenames_for(['2026']) == \
+      [os.path.join('2026', '2026-mowog1.json')]
+    index = build_driver_index({}, history_filenames())
+    assert list(index.drivers) == ['jeffrey-rye']
+    assert 'WARNING' not in capsys.readouterr().out
@@ -0,0 +1,87 @@
+# pylint: disable=missing-docstring
+
+import json
+
+import event_cache
+
+
+RECORDS = [
+    {'driver': 'Ann Able', 'class': 'CS', 'run 1': 45.1},
+    {'driver': 'Bob Baker', 'class': 'N', 'run 1': 47.2},
+]
+
+
+def write_results(tmp_path, records=None):
+    json_string = ''.join(json.dumps(record) + '\n'
+                          for record in (records or RECORDS))
+    results_filename = str(tmp_path / 'mowog1.json')
+    with open(results_filename, 'w') as out_file:
+        out_file.write(json_string)
+    return results_filename, json_string
+
+
+def test_cache_filename():
+    assert event_cache.cache_filename('2026/mowog1.json') == \
+      '2026/mowog1.cache.pkl'
+
+
+def test_read_cache_fresh(tmp_path):
+    results_filename, json_string = write_results(tmp_path)
+    event_cache.write_event_cache(results_filename, json_string, [])
+
+    cached = event_cache.read_cache(results_filename, 3)
+    assert cached is not None
+    assert cached[2] == RECORDS
+    assert list(cached[1]['driver']) == ['Ann Able', 'Bob Baker']
+
+
+def test_read_cache_missing(tmp_path):
+    results_filename, _ = write_results(tmp_path)
+    assert event_cache.read_cache(results_filename, 3) is None
+
+
+def test_read_cache_stale_results(tmp_path):
+    results_filename, json_string = write_results(tmp_path)
+    event_cache.write_event_cache(results_filename, json_string, [])
+    write_results(tmp_path, RECORDS[:1])
+    assert event_cache.read_cache(results_filename, 3) is None
+
+
+def test_read_cache_stale_source(tmp_path, capsys):
+    source_filename = tmp_path / 'mowog1.csv'
+    source_filename.write_text('driver,class\n')
+    results_filename, json_string = write_results(tmp_path)
+    event_cache.write_event_cache(results_filename, json_string,
+                                  [str(source_filename)])
+    assert event_cache.read_cache(results_filename, 3) is not None
+
+    source_filename.write_text('driver,class\nAnn Able,CS\n')
+    assert event_cache.read_cache(results_filename, 3) is None
+    assert 'WARNING: ' in capsys.readouterr().out
+
+
+def test_read_cache_truncated(tmp_path):
+    results_filename, json_string = write_results(tmp_path)
+    event_cache.write_event_cache(results_filename, json_string, [])
+    filename = event_cache.cache_filename(results_filename)
+    with open(filename, 'rb') as in_file:
+        data = in_file.read()
+    with open(filename, 'wb') as out_file:
+        out_file.write(data[:len(data) * 2 // 3])
+    assert event_cache.read_cache(results_filename, 3) is None
+
+
+def test_read_cache_garbage(tmp_path):
+    results_filename, _ = write_results(tmp_path)
+    with open(event_cache.cache_filename(results_filename), 'wb') as out_file:
+        out_file.write(b'not a pickle')
+    assert event_cache.read_cache(results_filename, 3) is None
+
+
+def test_read_records_falls_back_to_json(tmp_path):
+    results_filename, json_string = write_results(tmp_path)
+    event_cache.write_event_cache(results_filename, json_string, [])
+    write_results(tmp_path, RECORDS[:1])
+    assert event_cache.read_records(results_filename) == RECORDS[:1]
+    assert list(event_cache.read_results(results_filename)['driver']) == \
+      ['Ann Able']
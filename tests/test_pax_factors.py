@@ -0,0 +1,54 @@
+# pylint: disable=missing-docstring
+
+import json
+import os
+
+import pax_factors
+
+
+def write_factors(filename, factors, mtime_ns=None):
+    with open(filename, 'w') as out_file:
+        json.dump([{'name': name, 'factor': factor}
+                   for name, factor in factors.items()], out_file)
+    if mtime_ns is not None:
+        os.utime(filename, ns=(mtime_ns, mtime_ns))
+
+
+def test_load_pax_table_season_overrides_current(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_factors('pax-factors.json', {'CS': 0.814, 'N': 1.0})
+    os.mkdir('2026')
+    write_factors(os.path.join('2026', 'pax-factors.json'), {'CS': 0.8})
+
+    table = pax_factors.load_pax_table(2026)
+    assert table.factor('CS') == 0.8
+    assert table.factor('N') == 1.0
+    assert pax_factors.load_pax_table().factor('CS') == 0.814
+
+
+def test_load_pax_table_rereads_changed_factors(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_factors('pax-factors.json', {'CS': 0.814}, 1_000_000_000)
+    os.mkdir('2026')
+    season_filename = os.path.join('2026', 'pax-factors.json')
+    write_factors(season_filename, {'CS': 0.814}, 1_000_000_000)
+    assert pax_factors.load_pax_table(2026).factor('CS') == 0.814
+    assert pax_factors.load_pax_table(2026) is pax_factors.load_pax_table(2026)
+
+    # As a watch_season.py or serve_results.py rebuild would, in the
+    # same process.
+    write_factors('pax-factors.json', {'CS': 0.5}, 2_000_000_000)
+    write_factors(season_filename, {'CS': 0.5}, 2_000_000_000)
+    assert pax_factors.load_pax_table(2026).factor('CS') == 0.5
+    assert pax_factors.load_pax_table().factor('CS') == 0.5
+
+
+def test_pax_table_for_uses_the_season_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_factors('pax-factors.json', {'CS': 0.814})
+    os.mkdir('2024')
+    write_factors(os.path.join('2024', 'pax-factors.json'), {'CS': 0.81})
+
+    assert pax_factors.pax_table_for(
+        os.path.join('2024', '2024-mowog1.json')).factor('CS') == 0.81
+    assert pax_factors.pax_table_for('mowog1.json').factor('CS') == 0.814
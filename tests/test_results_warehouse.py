@@ -0,0 +1,68 @@
+# pylint: disable=missing-docstring
+
+import json
+import os
+
+import pytest
+
+import results_warehouse
+
+
+def write_results(filename, drivers):
+    with open(filename, 'w') as out_file:
+        for first_name, last_name, points in drivers:
+            out_file.write(json.dumps({
+                'FirstName': first_name, 'LastName': last_name,
+                'class_name': 'CS', 'doty_points': points,
+                'Run 1': 40.0, 'Run 1 Pen': 1}) + '\n')
+
+
+@pytest.fixture(name='event')
+def event_fixture(tmp_path):
+    season_dir = tmp_path / '2026'
+    season_dir.mkdir()
+    results_filename = str(season_dir / '2026-mowog1.json')
+    write_results(results_filename, [('Ann', 'Other', 100.0),
+                                     ('Jeffrey', 'Rye', 90.0)])
+    db_filename = str(tmp_path / 'warehouse.sqlite')
+    results_warehouse.load_results_files(db_filename, {}, [results_filename])
+    return db_filename, results_filename
+
+
+def test_read_results_returns_the_loaded_results(event):
+    db_filename, results_filename = event
+    results = results_warehouse.read_results(db_filename, results_filename, {})
+    assert list(results['LastName']) == ['Other', 'Rye']
+    assert list(results['doty_points']) == [100.0, 90.0]
+
+
+def test_read_results_reloads_changed_results(event, capsys):
+    db_filename, results_filename = event
+    write_results(results_filename, [('Ann', 'Other', 95.0),
+                                     ('Jeffrey', 'Rye', 100.0),
+                                     ('New', 'Driver', 80.0)])
+    results = results_warehouse.read_results(db_filename, results_filename, {})
+    assert list(results['doty_points']) == [95.0, 100.0, 80.0]
+    assert 'changed since it was loaded' in capsys.readouterr().out
+
+
+def test_read_results_fails_if_the_changed_results_cannot_be_loaded(event):
+    db_filename, results_filename = event
+    with open(results_filename, 'w') as out_file:
+        out_file.write('not json\n')
+    with pytest.raises(ValueError):
+        results_warehouse.read_results(db_filename, results_filename, {})
+
+
+def test_read_results_without_the_file_uses_what_was_loaded(event):
+    db_filename, results_filename = event
+    os.remove(results_filename)
+    results = results_warehouse.read_results(db_filename, results_filename, {})
+    assert len(results) == 2
+
+
+def test_read_results_of_a_file_never_loaded(tmp_path):
+    with pytest.raises(ValueError):
+        results_warehouse.read_results(str(tmp_path / 'warehouse.sqlite'),
+                                       str(tmp_path / '2026' / 'mowog9.json'),
+                                       {})
@@ -0,0 +1,114 @@
+# pylint: disable=missing-docstring
+
+import os
+
+import numpy as np
+import pandas as pd
+
+import run_matrix
+from run_matrix import PEN_CLEAN, PEN_CONES, PEN_DNF, PEN_RERUN, RunMatrix
+
+
+def make_results():
+    return pd.DataFrame.from_records([
+        {'driver': 'Ann Able', 'run 1': 45.1, 'run 1 Pen': None,
+         'run 2': 44.9, 'run 2 Pen': '2', 'run 3': 44.0, 'run 3 Pen': None,
+         'pax_factor': 0.814, 'best_time_nums': [2]},
+        {'driver': 'Bob Baker', 'run 1': 47.2, 'run 1 Pen': 'DNF',
+         'run 2': 46.5, 'run 2 Pen': 'RERUN', 'run 3': 46.0,
+         'run 3 Pen': None, 'pax_factor': 1.0, 'best_time_nums': [2, 1]},
+    ])
+
+
+def assert_same_matrix(matrix, other):
+    np.testing.assert_array_equal(matrix.scratch, other.scratch)
+    np.testing.assert_array_equal(matrix.codes, other.codes)
+    np.testing.assert_array_equal(matrix.cones, other.cones)
+    np.testing.assert_array_equal(matrix.pax_factor, other.pax_factor)
+    np.testing.assert_array_equal(matrix.best_runs, other.best_runs)
+
+
+def set_mtime(filename, mtime):
+    os.utime(filename, (mtime, mtime))
+
+
+def test_parse_penalty():
+    assert run_matrix.parse_penalty(None) == (PEN_CLEAN, 0)
+    assert run_matrix.parse_penalty(float('nan')) == (PEN_CLEAN, 0)
+    assert run_matrix.parse_penalty('0') == (PEN_CLEAN, 0)
+    assert run_matrix.parse_penalty(2) == (PEN_CONES, 2)
+    assert run_matrix.parse_penalty('DNF') == (PEN_DNF, 0)
+    assert run_matrix.parse_penalty('RERUN') == (PEN_RERUN, 0)
+
+
+def test_from_results():
+    matrix = RunMatrix.from_results(make_results())
+    np.testing.assert_array_equal(matrix.codes,
+                                  [[PEN_CLEAN, PEN_CONES, PEN_CLEAN],
+                                   [PEN_DNF, PEN_RERUN, PEN_CLEAN]])
+    np.testing.assert_array_equal(matrix.cones, [[0, 2, 0], [0, 0, 0]])
+    np.testing.assert_array_equal(matrix.best_runs, [[1, -1], [1, 0]])
+    assert matrix.best_time_nums(1) == [2, 1]
+    # The rerun is not scored.
+    assert list(matrix.num_scored) == [3, 2]
+
+
+def test_save_load_round_trip(tmp_path):
+    matrix = RunMatrix.from_results(make_results())
+    filename = str(tmp_path / 'mowog1.runs.npz')
+    matrix.save(filename)
+    assert os.path.exists(filename)
+
+    loaded = RunMatrix.load(filename)
+    assert_same_matrix(loaded, matrix)
+    assert loaded.codes.dtype == np.int8
+    np.testing.assert_array_equal(loaded.scored_pax, matrix.scored_pax)
+
+
+def test_sidecar_filename():
+    assert run_matrix.sidecar_filename('2026/mowog1.json') == \
+      '2026/mowog1.runs.npz'
+
+
+def test_load_run_matrix_prefers_sidecar(tmp_path):
+    results = make_results()
+    results_filename = str(tmp_path / 'mowog1.json')
+    results.to_json(results_filename, orient='records', lines=True)
+    set_mtime(results_filename, 1000)
+
+    # Tell the sidecar apart from the columns.
+    saved = RunMatrix.from_results(results)
+    saved.pax_factor = np.array([0.5, 0.5])
+    npz_filename = run_matrix.sidecar_filename(results_filename)
+    saved.save(npz_filename)
+    set_mtime(npz_filename, 2000)
+
+    loaded = run_matrix.load_run_matrix(results_filename, results)
+    np.testing.assert_array_equal(loaded.pax_factor, [0.5, 0.5])
+
+
+def test_load_run_matrix_falls_back(tmp_path):
+    results = make_results()
+    results_filename = str(tmp_path / 'mowog1.json')
+    results.to_json(results_filename, orient='records', lines=True)
+    expected = RunMatrix.from_results(results)
+
+    # No sidecar.
+    assert_same_matrix(run_matrix.load_run_matrix(results_filename, results),
+                       expected)
+
+    # A sidecar older than the results.
+    saved = RunMatrix.from_results(results)
+    saved.pax_factor = np.array([0.5, 0.5])
+    npz_filename = run_matrix.sidecar_filename(results_filename)
+    saved.save(npz_filename)
+    set_mtime(npz_filename, 1000)
+    set_mtime(results_filename, 2000)
+    assert_same_matrix(run_matrix.load_run_matrix(results_filename, results),
+                       expected)
+
+    # A sidecar that doesn't line up with the results.
+    saved.select(np.array([True, False])).save(npz_filename)
+    set_mtime(npz_filename, 3000)
+    assert_same_matrix(run_matrix.load_run_matrix(results_filename, results),
+                       expected)
@@ -0,0 +1,87 @@
+# pylint: disable=missing-docstring
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from season_points import SeasonTable, add_season_points
+
+
+EVENTS = ['M1', 'M2', 'M3', 'M4']
+
+
+# The season values one driver at a time, as they used to be worked out.
+def driver_season(scores, num_events, num_btp_events):
+    attended = sorted((score for score in scores if not math.isnan(score)),
+                      reverse=True)
+    kept = attended[:num_btp_events]
+    num_remaining = min(num_events - len(scores), num_btp_events)
+    best = sorted([0.0 if math.isnan(score) else score for score in scores],
+                  reverse=True)
+    return {
+        'num_actual_events': len(attended),
+        'num_kept_events': len(kept),
+        'total_points': sum(kept),
+        'avg_points': sum(kept) / len(kept) if kept else None,
+        'btp': sum(best[:min(num_btp_events - num_remaining, len(scores))]) +
+               100.0 * num_remaining,
+    }
+
+
+def test_add_season_points_matches_each_driver():
+    scores = [
+        [100.0, 90.5, np.nan, 80.25],
+        [np.nan, np.nan, np.nan, np.nan],
+        [70.0, 100.0, 95.0, 99.0],
+        [60.0, np.nan, 60.0, np.nan],
+    ]
+    results = pd.DataFrame(scores, columns=EVENTS)
+    results['driver'] = ['A', 'B', 'C', 'D']
+
+    season = add_season_points(results, EVENTS, 9, 3)
+
+    for row_num, driver_scores in enumerate(scores):
+        expected = driver_season(driver_scores, 9, 3)
+        row = season.iloc[row_num]
+        for col, value in expected.items():
+            if value is None:
+                assert math.isnan(row[col])
+            else:
+                assert row[col] == value, (row_num, col)
+
+
+def test_add_season_points_keeps_the_earlier_of_equal_scores():
+    results = pd.DataFrame([[90.0, 95.0, 90.0]], columns=EVENTS[:3])
+    season = add_season_points(results, EVENTS[:3], 3, 2,
+                               with_kept_events=True)
+    assert season['kept_events'][0] == {'M1', 'M2'}
+    assert season['btp'][0] == 185.0
+
+
+def test_season_table_matches_outer_merges():
+    events = {
+        'M1': pd.DataFrame({'driver': ['B', 'A'], 'points': [90, 100]}),
+        'M2': pd.DataFrame({'driver': ['C', 'A', 'A'],
+                            'points': [80.0, 70.0, 75.0]}),
+    }
+    table = SeasonTable(['driver'])
+    merged = None
+    for event_name, event_results in events.items():
+        table.add_event(event_name, event_results, 'points')
+        event_results = event_results.rename(columns={'points': event_name})
+        merged = event_results if merged is None else \
+          merged.merge(event_results, on='driver', how='outer')
+    merged = merged.sort_values('driver', kind='stable').reset_index(drop=True)
+
+    pd.testing.assert_frame_equal(table.to_frame(), merged,
+                                  check_dtype=False)
+    assert table.drivers() == ['A', 'B', 'C']
+
+
+def test_season_table_single_event_unsorted():
+    event_results = pd.DataFrame({'driver': ['B', 'A'], 'M1': [90, 100]})
+    table = SeasonTable(['driver'], sort_single_event=False)
+    table.add_event('M1', event_results)
+    assert table.drivers() == ['B', 'A']
+    assert table.to_frame()['M1'].tolist() == [90, 100]
@@ -0,0 +1,95 @@
+# pylint: disable=missing-docstring
+
+import json
+import os
+
+import pytest
+
+import sync_results
+
+
+@pytest.fixture(name='season_dir')
+def season_dir_fixture(tmp_path):
+    season_dir = tmp_path / 'repo' / '2026'
+    season_dir.mkdir(parents=True)
+    (season_dir / 'doty.html').write_text('<p>DOTY</p>')
+    (season_dir / 'doty.html.gz').write_bytes(b'gzipped')
+    (season_dir / '2026-mowog1.csv').write_text('a,b\n')
+    (season_dir / '2026-mowog1.json').write_text('{}\n')
+    return season_dir
+
+
+def test_site_path_starts_with_the_directory(season_dir, monkeypatch):
+    filename = str(season_dir / 'doty.html')
+    assert sync_results.site_path(filename, str(season_dir)) == \
+      '2026/doty.html'
+    monkeypatch.chdir(season_dir.parent)
+    assert sync_results.site_path(os.path.join('2026', 'doty.html'),
+                                  '2026') == '2026/doty.html'
+    monkeypatch.chdir(season_dir)
+    assert sync_results.site_path('doty.html', '.') == '2026/doty.html'
+
+
+def test_site_path_refuses_files_outside_the_directory(season_dir):
+    with pytest.raises(ValueError):
+        sync_results.site_path(str(season_dir.parent.parent / 'x.html'),
+                               str(season_dir))
+
+
+def test_published_files(season_dir, monkeypatch):
+    monkeypatch.chdir(season_dir.parent)
+    for dir_name in ('2026', str(season_dir)):
+        files = sync_results.published_files([dir_name])
+        assert sorted(files) == ['2026/2026-mowog1.csv', '2026/doty.html',
+                                 '2026/doty.html.gz']
+        assert os.path.samefile(files['2026/doty.html'],
+                                str(season_dir / 'doty.html'))
+
+
+def test_sync_an_absolute_directory_to_a_local_site(season_dir, tmp_path):
+    site_dir = tmp_path / 'site'
+    manifest_filename = str(tmp_path / 'manifest.json')
+    args = ['-m', manifest_filename, str(site_dir), str(season_dir)]
+
+    assert sync_results.main(args) == 0
+    assert (site_dir / '2026' / 'doty.html').read_text() == '<p>DOTY</p>'
+    assert not (site_dir / '2026' / '2026-mowog1.json').exists()
+    with open(manifest_filename) as json_data:
+        uploaded = json.load(json_data)['sites'][str(site_dir)]
+    assert sorted(uploaded) == ['2026/2026-mowog1.csv', '2026/doty.html',
+                                '2026/doty.html.gz']
+
+    # Only what changed goes again.
+    (season_dir / 'doty.html').write_text('<p>New DOTY</p>')
+    (site_dir / '2026' / 'doty.html.gz').unlink()
+    assert sync_results.main(args) == 0
+    assert (site_dir / '2026' / 'doty.html').read_text() == '<p>New DOTY</p>'
+    assert not (site_dir / '2026' / 'doty.html.gz').exists()
+
+
+def test_split_batches_balances_the_bytes(tmp_path):
+    files = []
+    for num, size in enumerate([100, 60, 50, 10]):
+        filename = tmp_path / ('%d.html' % num)
+        filename.write_bytes(b'x' * size)
+        files.append(('2026/%d.html' % num, str(filename)))
+    batches = sync_results.split_batches(files, 2)
+    assert [[path for path, _ in batch] for batch in batches] == \
+      [['2026/0.html', '2026/3.html'], ['2026/1.html', '2026/2.html']]
+
+
+def test_sftp_upload_commands():
+    site = sync_results.make_site('sftp://me@example.com:2222/public_html/r')
+    commands = []
+    site.run = lambda batch: commands.extend(batch) or True
+    assert site.upload([('2026/doty.html', '/repo/2026/doty.html')]) == \
+      ['2026/doty.html']
+    assert commands == ['-mkdir "public_html/r/2026"',
+                        'put "/repo/2026/doty.html" "public_html/r/2026/doty.html"']
+
+
+def test_make_site():
+    assert isinstance(sync_results.make_site('/tmp/site'),
+                      sync_results.LocalSite)
+    with pytest.raises(ValueError):
+        sync_results.make_site('http://example.com/')
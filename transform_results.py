@@ -3,268 +3,237 @@
 Transform event results HTML files to simplified format.
 Keeps only the Overall results table, removes buttons/controls, and sorts drivers alphabetically.
 
+The page is read in one forward pass.  A single pattern finds just the
+tags that matter (head, h2, h4, and the table, tbody, tr and th of the
+overall table) and the counts, and OverallTableScanner handles each as
+it comes.  Each row is split into its cells as it is reached.  Everything
+is kept as offsets into the page, so that it can be copied out exactly
+as it was written, and the scan stops once everything has been found,
+usually at the end of the overall table.  (html.parser would do the same
+job, but tokenizing every tag of the page in Python makes it several
+times slower than this.)
+
+With --season, every event page in a season directory is transformed in
+one go, to the same name with "-simple" (2026/2026-mowog1.html gets
+2026/2026-mowog1-simple.html).  Pages without an overall table (the
+-fin.html, DOTY and series pages) are skipped.
+
+fin_to_base_html.py --simple writes the simplified page straight from the
+JSON results, along with the base HTML, without parsing any HTML.
+
 Usage: python transform_results.py input.html output.html
+       python transform_results.py --season 2026
 """
 
-import sys
+import argparse
 import re
-from html.parser import HTMLParser
-from io import StringIO
-
-
-class ResultsHTMLParser(HTMLParser):
-    """Parse and extract components from event results HTML."""
-    
-    def __init__(self):
-        super().__init__()
-        self.in_head = False
-        self.in_body = False
-        self.in_overall_table = False
-        self.in_tbody = False
-        self.current_row = []
-        self.current_cell = StringIO()
+import sys
+from pathlib import Path
+
+
+# Columns to remove: 0=Rank, 1=Class, 5=Diff., 6=Diff. Prev.
+COLS_TO_REMOVE = {0, 1, 5, 6}
+
+COUNTS_PATTERN = r'|Participants: (?P<participants>\d+)|Runs: (?P<runs>\d+)'
+# Outside the overall table, and inside it.
+PAGE_TAG_RE = re.compile(
+    r'<(?P<end>/?)(?P<tag>head|h2|h4|table)(?=[\s/>])[^>]*>' + COUNTS_PATTERN)
+TABLE_TAG_RE = re.compile(
+    r'<(?P<end>/?)(?P<tag>head|h2|h4|table|tbody|tr|th)(?=[\s/>])[^>]*>' +
+    COUNTS_PATTERN)
+HEADER_START_RE = re.compile(r'\s*<th>Rank</th>')
+CELL_RE = re.compile(r'<td[^>]*>(.*?)</td>', re.DOTALL)
+TAG_RE = re.compile(r'<[^>]+>')
+DISPLAY_NONE_RE = re.compile(r'\s*style="display: none"')
+
+
+class OverallTableScanner:
+    """Pick the overall table and the page details out of a results page.
+
+    Each is the first of its kind in the page, as (start, end) offsets.
+    """
+
+    def __init__(self, content):
+        self.content = content
+
+        self.head_start = None
+        self.head = None
+        # {'h2': text, 'h4': text} for the first of each with only text in it.
+        self.headings = {}
+        self.participants = None
+        self.runs = None
+
+        self.table_start = None
+        self.table_end = None
+        self.tbody_start = None
+        self.tbodies = []
         self.rows = []
-        self.head_content = StringIO()
-        self.style_content = StringIO()
-        self.metadata = {}
-        self.in_style = False
-        self.depth = 0
-        
-    def handle_starttag(self, tag, attrs):
-        attrs_dict = dict(attrs)
-        
-        if tag == 'head':
-            self.in_head = True
-        elif tag == 'body':
-            self.in_body = True
-        elif tag == 'style':
-            self.in_style = True
-        elif tag == 'table' and self.in_body:
-            table_id = attrs_dict.get('id', '')
-            if table_id == 'result-overall':
-                self.in_overall_table = True
-                self.depth = 1
-            elif table_id in ['result-class', 'result-pax']:
-                # Skip other tables
-                pass
-        elif self.in_overall_table:
-            if tag == 'tbody':
-                self.in_tbody = True
-            elif tag == 'tr' and self.in_tbody:
-                self.current_row = []
-            elif tag == 'td':
-                self.current_cell = StringIO()
-        elif self.in_body and tag == 'div' and 'float' in attrs_dict.get('style', ''):
-            # Extract metadata from float div
-            pass
-        elif self.in_head:
-            if tag == 'title':
-                self.current_cell = StringIO()
-    
-    def handle_endtag(self, tag):
+        self.header_start = None
+        self.header = None
+        self.header_cells = []
+
+    def scan(self):
+        """Scan the page, stopping once everything has been found."""
+        pos = 0
+        while not self.done():
+            # The tags we look for change as we go in and out of the table.
+            in_table = self.in_table()
+            pattern = TABLE_TAG_RE if in_table else PAGE_TAG_RE
+            for match in pattern.finditer(self.content, pos):
+                kind = match.lastgroup
+                if kind == 'tag':
+                    if match.group('end'):
+                        resume = self.handle_endtag(match.group('tag'),
+                                                    match.start(), match.end())
+                    else:
+                        resume = self.handle_starttag(match.group('tag'),
+                                                      match.start(), match.end())
+                    if resume or self.in_table() != in_table:
+                        pos = resume or match.end()
+                        break
+                elif kind == 'participants':
+                    self.participants = self.participants or match.group(kind)
+                else:
+                    self.runs = self.runs or match.group(kind)
+            else:
+                break
+
+    def in_table(self):
+        return self.table_start is not None and self.table_end is None
+
+    def done(self):
+        return self.table_end is not None and self.head is not None and \
+            len(self.headings) == 2 and self.participants is not None and \
+            self.runs is not None
+
+    def text_before_tag(self, start, end_tag):
+        """The text from start up to end_tag, or None if a tag comes first."""
+        pos = self.content.find('<', start)
+        if pos < 0 or not self.content.startswith(end_tag, pos):
+            return None
+        return self.content[start:pos]
+
+    # -- Events --------------------------------------------------------------
+
+    # Each handler may return where to carry on scanning from, if it has
+    # already dealt with what follows the tag.
+
+    def handle_starttag(self, tag, start, end):
+        text = self.content[start:end]
+        if tag in ('h2', 'h4'):
+            if tag not in self.headings:
+                heading = self.text_before_tag(end, f'</{tag}>')
+                if heading:
+                    self.headings[tag] = heading.strip()
+        elif tag == 'head':
+            if self.head_start is None and text == '<head>':
+                self.head_start = end
+        elif tag == 'table':
+            if self.table_start is None and \
+               text.startswith('<table id="result-overall"'):
+                self.table_start = start
+        elif tag == 'tbody':
+            if text == '<tbody>' and self.tbody_start is None:
+                self.tbody_start = start
+        elif tag == 'tr':
+            if text == '<tr class="row">' and self.tbody_start is not None \
+               and not self.tbodies:
+                return self.scan_row(end)
+            if text == '<tr>' and self.header is None and \
+               HEADER_START_RE.match(self.content, end):
+                self.header_start = start
+                self.header_cells = []
+        elif tag == 'th':
+            if self.header_start is not None:
+                # Only headers with nothing but text in them.
+                cell_text = self.text_before_tag(end, '</th>')
+                if cell_text is not None:
+                    self.header_cells.append(
+                        (start, end + len(cell_text) + len('</th>')))
+
+    def handle_endtag(self, tag, start, end):
         if tag == 'head':
-            self.in_head = False
-        elif tag == 'body':
-            self.in_body = False
-        elif tag == 'style':
-            self.in_style = False
-        elif tag == 'table' and self.in_overall_table:
-            self.in_overall_table = False
-        elif self.in_overall_table:
-            if tag == 'tbody':
-                self.in_tbody = False
-            elif tag == 'tr' and self.in_tbody and self.current_row:
-                # Skip header rows and dividers
-                if len(self.current_row) > 0 and self.current_row[0].strip():
-                    self.rows.append(self.current_row)
-                self.current_row = []
-            elif tag == 'td':
-                cell_content = self.current_cell.getvalue().strip()
-                self.current_row.append(cell_content)
-                self.current_cell = StringIO()
-    
-    def handle_data(self, data):
-        if self.in_style:
-            self.style_content.write(data)
-        elif self.in_overall_table and self.current_row is not None:
-            self.current_cell.write(data)
-        elif self.in_head and tag == 'title':
-            self.current_cell.write(data)
+            if self.head_start is not None and self.head is None:
+                self.head = (self.head_start, start)
+        elif not self.in_table():
+            return
+        elif tag == 'tr':
+            if self.header_start is not None:
+                self.header = (self.header_start, end)
+                self.header_start = None
+        elif tag == 'tbody':
+            if self.tbody_start is not None:
+                self.tbodies.append((self.tbody_start, end))
+                self.tbody_start = None
+        elif tag == 'table':
+            self.table_end = end
 
+    def scan_row(self, start):
+        """Split a row into its cells, and carry on after it."""
+        end = self.content.find('</tr>', start)
+        if end < 0:
+            return None
+        cells = list(CELL_RE.finditer(self.content, start, end))
+        if len(cells) >= 3:
+            # The driver's name is in the 3rd column, after Rank and Class.
+            driver = TAG_RE.sub('', cells[2].group(1)).strip()
+            kept = [cell.group(0) for num, cell in enumerate(cells)
+                    if num not in COLS_TO_REMOVE]
+            self.rows.append((driver, kept))
+        return end + len('</tr>')
+
+
+def overall_table_html(scanner):
+    """The overall table, with the rows sorted and the columns removed."""
+    content = scanner.content
+    rows = sorted(scanner.rows, key=lambda row: row[0].lower())
+
+    tbody = ['<tbody>\n']
+    for _, cells in rows:
+        tbody.append('<tr class="row">\n')
+        tbody.extend(f'          {cell}\n' for cell in cells)
+        tbody.append('        </tr>\n')
+    tbody.append('</tbody>')
+    tbody = ''.join(tbody)
+
+    replacements = [(start, end, tbody) for start, end in scanner.tbodies]
+    if scanner.header:
+        header = ['<tr>\n']
+        header.extend(f'          {content[start:end]}\n'
+                      for num, (start, end) in enumerate(scanner.header_cells)
+                      if num not in COLS_TO_REMOVE)
+        header.append('        </tr>')
+        replacements.append(scanner.header + (''.join(header),))
+    replacements.sort()
+
+    pieces = []
+    pos = scanner.table_start
+    for start, end, text in replacements:
+        pieces.append(content[pos:start])
+        pieces.append(text)
+        pos = end
+    pieces.append(content[pos:scanner.table_end])
 
-def transform_html(input_file, output_file):
-    """Transform results HTML file."""
-    
-    # Read input
-    with open(input_file, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # Parse to extract overall table
-    from html.parser import HTMLParser
-    
-    class OverallTableExtractor(HTMLParser):
-        def __init__(self):
-            super().__init__()
-            self.in_overall = False
-            self.table_depth = 0
-            self.table_html = StringIO()
-            self.title = ""
-            self.metadata = {}
-            self.in_title = False
-            self.header_extracted = False
-            
-        def handle_starttag(self, tag, attrs):
-            attrs_dict = dict(attrs)
-            
-            if tag == 'title':
-                self.in_title = True
-            elif tag == 'table' and attrs_dict.get('id') == 'result-overall':
-                self.in_overall = True
-                self.table_depth = 1
-                self.table_html.write(self.get_starttag_text())
-            elif self.in_overall:
-                self.table_html.write(self.get_starttag_text())
-                if tag == 'table':
-                    self.table_depth += 1
-                elif tag == 'thead':
-                    self.header_extracted = False
-            elif tag == 'div' and not self.in_overall:
-                # Try to get metadata
-                style = attrs_dict.get('style', '')
-                if 'float: right' in style:
-                    pass
-            elif tag == 'h2':
-                pass
-            elif tag == 'h4':
-                pass
-            
-        def handle_endtag(self, tag):
-            if self.in_overall:
-                self.table_html.write(f'</{tag}>')
-                if tag == 'table':
-                    self.table_depth -= 1
-                    if self.table_depth == 0:
-                        self.in_overall = False
-            elif tag == 'title':
-                self.in_title = False
-        
-        def handle_data(self, data):
-            if self.in_title:
-                self.title += data
-            elif self.in_overall:
-                self.table_html.write(data)
-    
-    # Extract table using regex for simplicity
-    # Find the result-overall table
-    match = re.search(r'<table id="result-overall".*?</table>', content, re.DOTALL)
-    if not match:
-        print("Error: Could not find result-overall table")
-        sys.exit(1)
-    
-    table_html = match.group(0)
-    
-    # Extract rows from tbody
-    tbody_match = re.search(r'<tbody>(.*?)</tbody>', table_html, re.DOTALL)
-    if not tbody_match:
-        print("Error: Could not find tbody")
-        sys.exit(1)
-    
-    tbody_content = tbody_match.group(1)
-    
-    # Extract individual rows
-    row_pattern = r'<tr class="row">(.*?)</tr>'
-    rows = []
-    
-    def remove_columns_from_row(row_html, cols_to_remove):
-        """Remove specific columns from a row."""
-        # Extract all TDs with their full tags
-        td_pattern = r'<td[^>]*>.*?</td>'
-        tds = list(re.finditer(td_pattern, row_html, re.DOTALL))
-        
-        if not tds:
-            return row_html
-        
-        # Build new row by keeping only non-removed columns
-        new_row = '<tr class="row">\n'
-        for i, td_match in enumerate(tds):
-            if i not in cols_to_remove:
-                new_row += '          ' + td_match.group(0) + '\n'
-        new_row += '        </tr>'
-        return new_row
-    
-    # Columns to remove: 0=Rank, 1=Class, 5=Diff., 6=Diff. Prev.
-    cols_to_remove = {0, 1, 5, 6}
-    
-    for row_match in re.finditer(row_pattern, tbody_content, re.DOTALL):
-        row_html = row_match.group(0)
-        # Extract all TDs to find driver name (column 2 before removal)
-        tds = re.findall(r'<td[^>]*>(.*?)</td>', row_html, re.DOTALL)
-        if len(tds) >= 3:
-            # Driver name is in 3rd column (index 2, after Rank and Class)
-            driver_name = tds[2].strip()
-            # Clean up HTML tags for sorting
-            driver_clean = re.sub(r'<[^>]+>', '', driver_name).strip()
-            # Remove unwanted columns
-            filtered_row = remove_columns_from_row(row_html, cols_to_remove)
-            rows.append((driver_clean, filtered_row))
-    
-    # Sort rows alphabetically by driver name
-    rows.sort(key=lambda x: x[0].lower())
-    
-    # Reconstruct tbody with sorted rows
-    new_tbody = '<tbody>\n'
-    for _, row_html in rows:
-        new_tbody += row_html + '\n'
-    new_tbody += '</tbody>'
-    
-    # Replace tbody in table_html
-    new_table_html = re.sub(r'<tbody>.*?</tbody>', new_tbody, table_html, flags=re.DOTALL)
-    
     # Remove display: none style since we're making this the only visible table
-    new_table_html = re.sub(r'\s*style="display: none"', '', new_table_html)
-    
-    # Remove header columns: Rank, Class, Diff., Diff. Prev.
-    # Replace the header row with columns removed
-    def remove_columns_from_header(table_html, cols_to_remove):
-        """Remove specific columns from table header."""
-        # Find the header row with column names
-        header_match = re.search(r'<tr>\s*<th>Rank</th>.*?</tr>', table_html, re.DOTALL)
-        if not header_match:
-            return table_html
-        
-        old_header = header_match.group(0)
-        # Extract all TH elements
-        ths = list(re.finditer(r'<th[^>]*>[^<]*</th>', old_header))
-        
-        # Build new header with only kept columns
-        new_header = '<tr>\n'
-        for i, th_match in enumerate(ths):
-            if i not in cols_to_remove:
-                new_header += '          ' + th_match.group(0) + '\n'
-        new_header += '        </tr>'
-        
-        return table_html.replace(old_header, new_header)
-    
-    new_table_html = remove_columns_from_header(new_table_html, cols_to_remove)
-    
-    # Extract head
-    head_match = re.search(r'<head>(.*?)</head>', content, re.DOTALL)
-    head_content = head_match.group(1) if head_match else ""
-    
-    # Extract metadata from body
-    title_match = re.search(r'<h2[^>]*>([^<]+)</h2>', content)
-    title = title_match.group(1).strip() if title_match else "Event Results"
-    
-    date_match = re.search(r'<h4[^>]*>([^<]+)</h4>', content)
-    date = date_match.group(1).strip() if date_match else ""
-    
-    participants_match = re.search(r'Participants: (\d+)', content)
-    participants = participants_match.group(1) if participants_match else "0"
-    
-    runs_match = re.search(r'Runs: (\d+)', content)
-    runs = runs_match.group(1) if runs_match else "0"
-    
-    # Build output HTML
+    return DISPLAY_NONE_RE.sub('', ''.join(pieces))
+
+
+def transform_content(content):
+    """Transform a results page.  Returns (HTML, number of drivers)."""
+    scanner = OverallTableScanner(content)
+    scanner.scan()
+    if scanner.table_end is None:
+        raise ValueError('Could not find result-overall table')
+    if not scanner.tbodies:
+        raise ValueError('Could not find tbody')
+
+    table_html = overall_table_html(scanner)
+    head_content = content[scanner.head[0]:scanner.head[1]] if scanner.head else ''
+    title = scanner.headings.get('h2', 'Event Results')
+    date = scanner.headings.get('h4', '')
+    participants = scanner.participants or '0'
+    runs = scanner.runs or '0'
+
     output_html = f"""<html>
   <head>
 {head_content}
@@ -275,25 +244,70 @@ def transform_html(input_file, output_file):
     <h2 style="margin-bottom: 4px">{title}</h2>
     <h4 style="margin-top: 0px">{date}</h4>
     <div class="clearfix"></div>
-    {new_table_html}
+    {table_html}
     <div>Created by <a href="http://www.axti.me">AXti.me</a></div>
   </body>
 </html>"""
-    
-    # Write output
+    return output_html, len(scanner.rows)
+
+
+def transform_html(input_file, output_file):
+    """Transform results HTML file."""
+    with open(input_file, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    output_html, num_drivers = transform_content(content)
+
     with open(output_file, 'w', encoding='utf-8') as f:
         f.write(output_html)
-    
+
     print(f"✓ Transformed {input_file} → {output_file}")
-    print(f"  Drivers: {len(rows)}")
+    print(f"  Drivers: {num_drivers}")
+
+
+def transform_season(season_dir):
+    """Transform every event page in a season directory."""
+    num_pages = 0
+    for input_path in sorted(Path(season_dir).glob('*.html')):
+        if input_path.name.endswith(('-fin.html', '-simple.html')):
+            continue
+        output_path = input_path.with_name(f'{input_path.stem}-simple.html')
+        try:
+            transform_html(input_path, output_path)
+        except ValueError:
+            # Not an event page.
+            continue
+        num_pages += 1
+    print(f"Transformed {num_pages} pages in {season_dir}")
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description='Transform event results HTML to the simplified format.')
+    parser.add_argument('input_html', nargs='?',
+                        help='Input results .html file.')
+    parser.add_argument('output_html', nargs='?',
+                        help='Output .html file to write.')
+    parser.add_argument('--season', dest='season_dir',
+                        help='Transform every event page in this season '
+                             'directory instead.')
+    config = parser.parse_args(args)
+
+    if config.season_dir:
+        if config.input_html:
+            parser.error('--season does not take input or output files')
+        transform_season(config.season_dir)
+        return 0
+    if not config.output_html:
+        parser.error('input_html and output_html are required')
+
+    try:
+        transform_html(config.input_html, config.output_html)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    return 0
 
 
 if __name__ == '__main__':
-    if len(sys.argv) != 3:
-        print("Usage: python transform_results.py input.html output.html")
-        sys.exit(1)
-    
-    input_file = sys.argv[1]
-    output_file = sys.argv[2]
-    
-    transform_html(input_file, output_file)
+    sys.exit(main())
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+#
+# pylint: disable=missing-docstring
+#
+# This script watches a season directory and keeps its results up to
+# date. Whenever an event CSV, a series config, commands.txt,
+# aliases.json, pax-factors.json, a template or one of the scripts
+# changes, it rebuilds whatever depends on it, just as
+# build_season.py would.
+#
+# It stays running, so pandas, pystache and the scripts are only
+# imported once rather than for every step. Changes that arrive close
+# together (e.g., saving several CSVs) are collected into one rebuild:
+# we wait until nothing has changed for a moment before building.
+#
+# We poll for changes rather than asking the OS to tell us, so this
+# works the same everywhere and needs nothing extra installed.
+#
+# Invoke this as:
+#
+# ./watch_season.py 2026
+#
+
+import argparse
+import glob
+import importlib
+import os
+import sys
+import time
+
+from build_season import (build, chdir_to_repo, load_state, load_steps,
+                          save_state, script_files, season_filenames)
+
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-i',
+                        dest='interval',
+                        default=1.0,
+                        type=float,
+                        help='How often to check for changes, in seconds.')
+    parser.add_argument('-w',
+                        dest='settle_time',
+                        default=2.0,
+                        type=float,
+                        help='How long the files must stay unchanged ' +
+                        'before we rebuild, in seconds.')
+    parser.add_argument('season_dir',
+                        help='The season directory, e.g., 2026.')
+    config = parser.parse_args(args)
+
+    commands_filename, state_filename = season_filenames(config.season_dir)
+    chdir_to_repo()
+    season_dir = os.path.relpath(os.path.dirname(commands_filename))
+
+    snapshot = scan_files(season_dir)
+    module_mtimes = {}
+    rebuild(commands_filename, state_filename, module_mtimes)
+
+    print('Watching %s, Ctrl-C to stop' % season_dir)
+    try:
+        while True:
+            time.sleep(config.interval)
+            changed_snapshot = scan_files(season_dir)
+            if changed_snapshot == snapshot:
+                continue
+
+            # Wait for things to settle down.
+            while True:
+                time.sleep(config.settle_time)
+                latest_snapshot = scan_files(season_dir)
+                if latest_snapshot == changed_snapshot:
+                    break
+                changed_snapshot = latest_snapshot
+
+            print('Changed: %s' %
+                  ', '.join(changed_files(snapshot, changed_snapshot)))
+            snapshot = changed_snapshot
+            rebuild(commands_filename, state_filename, module_mtimes)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+# ------------------------------------------------------------
+# Watching
+
+def watched_patterns(season_dir):
+    return [
+        os.path.join(season_dir, '*.csv'),
+        os.path.join(season_dir, '*-conf.json'),
+        os.path.join(season_dir, 'commands.txt'),
+        os.path.join(season_dir, 'pax-factors.json'),
+        'aliases.json',
+        'pax-factors.json',
+        'templates/*',
+        '*.py',
+    ]
+
+
+# Returns {filename: (modification time, size)} for the files we
+# watch.
+def scan_files(season_dir):
+    snapshot = {}
+    for pattern in watched_patterns(season_dir):
+        for filename in glob.glob(pattern):
+            try:
+                stat = os.stat(filename)
+            except FileNotFoundError:
+                continue
+            snapshot[filename] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+def changed_files(old_snapshot, new_snapshot):
+    return sorted(filename
+                  for filename in set(old_snapshot) | set(new_snapshot)
+                  if old_snapshot.get(filename) != new_snapshot.get(filename))
+
+
+# ------------------------------------------------------------
+# Building
+
+def rebuild(commands_filename, state_filename, module_mtimes):
+    start = time.perf_counter()
+    if not reload_changed_modules(module_mtimes):
+        return
+    try:
+        # Read the commands again every time, as they (or the series
+        # configs) may have changed too.
+        steps = load_steps(commands_filename)
+    except (OSError, ValueError) as e:
+        print('ERROR: Could not read %s: %s' % (commands_filename, e))
+        return
+    state = load_state(state_filename)
+    build(steps, state)
+    save_state(state, state_filename)
+    module_mtimes.update(local_module_mtimes())
+    print('Rebuilt in %.2fs' % (time.perf_counter() - start))
+
+
+# Our modules stay loaded between builds, so if any of them changed
+# since the last build, load them all again. A module's own imports are
+# reloaded before it, so that the names it imported from them are up
+# to date too.
+def reload_changed_modules(module_mtimes):
+    current_mtimes = local_module_mtimes()
+    if all(module_mtimes.get(name, mtime) == mtime
+           for name, mtime in current_mtimes.items()):
+        return True
+
+    script_files.cache_clear()
+    names = sorted(current_mtimes,
+                   key=lambda name: len(script_files(name + '.py')))
+    for name in names:
+        print('Reloading %s.py' % name)
+        try:
+            importlib.reload(sys.modules[name])
+        except Exception as e: # pylint: disable=broad-except
+            # Most likely a script is half edited. We will try again
+            # when it changes.
+            print('ERROR: Could not reload %s.py: %s' % (name, e))
+            return False
+    return True
+
+
+# Returns {module name: modification time} for our own modules that
+# are loaded.
+def local_module_mtimes():
+    mtimes = {}
+    for name, module in list(sys.modules.items()):
+        filename = getattr(module, '__file__', None)
+        if name == '__main__' or not filename or \
+           os.path.abspath(filename) != os.path.abspath(name + '.py'):
+            continue
+        mtimes[name] = os.stat(filename).st_mtime_ns
+    return mtimes
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))